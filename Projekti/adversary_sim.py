@@ -10,12 +10,31 @@ This application provides a web interface for:
 - Validating and executing commands in a secure container environment
 - Analyzing command outputs using AI
 - Generating conclusive security analysis reports
-- Saving session data in JSON or Markdown format
+- Saving session data in JSON, NDJSON or Markdown format
 """
 
-from flask import Flask, request, render_template, session, jsonify
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import (
+    Flask,
+    request,
+    render_template,
+    session as client_session,
+    jsonify,
+    send_from_directory,
+    url_for
+)
 from flask_session import Session
-from utils.ai_utils import ask_model, ask_analysis, conclusive_analysis
+from utils.ai_utils import (
+    ask_model,
+    ask_analysis,
+    conclusive_analysis,
+    hedge_stats
+)
+from utils.intent_utils import match_intent
 from utils.file_utils import (
     extract_json,
     validateStructure,
@@ -23,8 +42,13 @@ from utils.file_utils import (
     save_result,
     save_analysis,
     clean_temp,
+    clean_raw_output,
     get_entry,
-    write_md
+    get_last_entry,
+    iter_snapshot_entries,
+    snapshot_session,
+    write_md,
+    write_ndjson
 )
 from utils.cmd_utils import (
     remove_cmd,
@@ -36,6 +60,26 @@ from utils.cmd_utils import (
 EXECUTOR_CONTAINER = "command_executor"
 TEMP_FILE = "TEMP.json"
 OUTPUT_DIR = "output"
+RAW_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "raw")
+# Session snapshots that running exports read from
+SNAPSHOT_DIR = os.path.join(OUTPUT_DIR, "snapshots")
+# Characters of command output kept in the session and sent for analysis,
+# 0 for no limit. Longer outputs are stored in RAW_OUTPUT_DIR, streamed into
+# reports, and the model is told that it only sees the beginning.
+MAX_OUTPUT_CHARS = int(os.environ.get("MAX_OUTPUT_CHARS", 20000)) or None
+
+EXPORT_WRITERS = {
+    "json": write_json,
+    "ndjson": write_ndjson,
+    "md": write_md,
+}
+
+# Report exports run in the background, jobs are tracked by id.
+# A job is dropped once its file is downloaded, or EXPORT_JOB_TTL seconds
+# after it started if the file is never fetched.
+EXPORT_JOB_TTL = 3600
+export_executor = ThreadPoolExecutor(max_workers=2)
+export_jobs = {}  # job id -> (start time, Future)
 
 app = Flask(__name__)
 
@@ -49,8 +93,10 @@ session = Session(app)
 session.executed_commands = []
 session.command_suggestions = []
 
-# Clean temp file on startup
+# Clean temp file, its spooled outputs and stale export snapshots on startup
 clean_temp(TEMP_FILE)
+clean_raw_output(RAW_OUTPUT_DIR)
+shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
 
 
 def render_partial(template_name, **context):
@@ -64,22 +110,74 @@ def render_partial(template_name, **context):
     Returns:
         flask.Response: JSON response containing the rendered HTML
     """
-    analysis = get_entry(TEMP_FILE, "final_analysis")
+    analysis = get_last_entry(TEMP_FILE, "final_analysis")
     latest_analysis = None
     if analysis:
-        latest_analysis = analysis[-1]["final_analysis"]  # Latest final analysis
+        latest_analysis = analysis["final_analysis"]
     html = render_template(template_name, **context, analysis=latest_analysis)
     
     return jsonify({'html': html})
 
 
+def client_key():
+    """
+    Identify the browser session of the current request.
+
+    The id is stored in the Flask session, so it lasts until the browser is
+    closed. Per-session limits such as the hedge budget are kept under it.
+
+    Returns:
+        str: The session id
+    """
+    return client_session.setdefault("client_id", uuid.uuid4().hex)
+
+
+def with_truncation_notice(text, full_file=None):
+    """
+    Append a notice to an output preview whose full text was cut.
+
+    Args:
+        text (str): The stored preview of the output
+        full_file (str, optional): File holding the full output, set only
+            when the preview was cut
+
+    Returns:
+        str: The preview, followed by the notice if it is incomplete
+    """
+    if not full_file or not os.path.exists(full_file):
+        return text
+    return (
+        f"{text}\n\n[Output truncated: only the first {len(text)} characters "
+        f"of {os.path.getsize(full_file)} bytes are shown. Findings in the "
+        "rest of the output are not included.]"
+    )
+
+
+def save_full_output(save, entry_id, stream):
+    """
+    Store the full text of a cut output in RAW_OUTPUT_DIR.
+
+    Args:
+        save: CommandOutput.save_stdout or save_stderr
+        entry_id (str): Id of the session entry
+        stream (str): "stdout" or "stderr"
+
+    Returns:
+        str: Path of the stored file
+    """
+    os.makedirs(RAW_OUTPUT_DIR, exist_ok=True)
+    return save(os.path.join(RAW_OUTPUT_DIR, f"{entry_id}.{stream}.txt"))
+
+
 @app.route('/suggest', methods=['POST'])
 def suggest():
     """
     Handle command suggestion requests.
 
-    Processes natural language instructions and generates command suggestions
-    using an AI model. Validates the JSON structure of AI responses.
+    Processes natural language instructions and generates command suggestions.
+    Common instructions are matched locally by the intent matcher; anything it
+    does not recognize goes to the AI model. Validates the JSON structure of
+    AI responses.
 
     Returns:
         flask.Response: Rendered template with command suggestions or error message
@@ -88,8 +186,19 @@ def suggest():
     cmd_results = get_entry(TEMP_FILE, "command")
 
     if instruction:
+        # Try the local intent matcher before asking the LLM
+        commands = match_intent(instruction)
+        if commands:
+            session.command_suggestions = commands
+            return render_partial(
+                'answer.html',
+                suggestion=commands,
+                results=cmd_results,
+                success="Commands generated!"
+            )
+
         # Request LLM for a command
-        command_suggestions = ask_model(instruction, 400)
+        command_suggestions = ask_model(instruction, 400, session_key=client_key())
         
         # If suggestion is EMPTY
         if command_suggestions == "[]":
@@ -217,19 +326,46 @@ def run():
         )
 
     command_output = run_command(EXECUTOR_CONTAINER, command)
-    prompt_analysis = ask_analysis(command_output.stdout)
+    if command_output is None:
+        return render_partial(
+            'answer.html',
+            suggestion=session.command_suggestions,
+            results=cmd_results,
+            error="Running command failed"
+        )
+
+    try:
+        # Only a bounded preview of the output is loaded into memory
+        stdout, stdout_complete = command_output.read_stdout(MAX_OUTPUT_CHARS)
+        stderr, stderr_complete = command_output.read_stderr(MAX_OUTPUT_CHARS)
+        entry_id = str(uuid.uuid4())
+        stdout_file = stderr_file = None
+        if not stdout_complete:
+            stdout_file = save_full_output(command_output.save_stdout, entry_id, "stdout")
+        if not stderr_complete:
+            stderr_file = save_full_output(command_output.save_stderr, entry_id, "stderr")
+    finally:
+        command_output.close()
+
+    prompt_analysis = ask_analysis(
+        with_truncation_notice(stdout, stdout_file),
+        session_key=client_key()
+    )
     session.executed_commands.append(command)
     
     if suggestions:
         session.command_suggestions = suggestions
 
-    if command_output and prompt_analysis:
+    if prompt_analysis:
         save_result(
             TEMP_FILE,
             command,
-            command_output.stdout,
-            command_output.stderr,
-            prompt_analysis
+            stdout,
+            stderr,
+            prompt_analysis,
+            stdout_file=stdout_file,
+            entry_id=entry_id,
+            stderr_file=stderr_file
         )
         cmd_results = get_entry(TEMP_FILE, "command")
         return render_partial(
@@ -263,13 +399,14 @@ def get_conclusive_analysis():
     try:
         # Extract command outputs from the results
         prompt_text = "\n\n".join(
-            str(result.get('stdout', '')) for result in cmd_results
+            with_truncation_notice(str(result.get('stdout', '')), result.get('stdout_file'))
+            for result in cmd_results
         )
         # Extract commands from the results
         commands = "\n".join(
             str(result.get('command', '')) for result in cmd_results
         )
-        ai_analysis = conclusive_analysis(prompt_text)
+        ai_analysis = conclusive_analysis(prompt_text, session_key=client_key())
         save_analysis(TEMP_FILE, commands, ai_analysis)
         return render_partial(
             'answer.html',
@@ -287,56 +424,175 @@ def get_conclusive_analysis():
         )
 
 
-@app.route('/save_json', methods=['POST'])
-def save_json():
+def start_export(fmt):
     """
-    Save the current session data to a JSON file.
+    Start a background export of the current session data.
+
+    The session is snapshotted at request time. The writer for the
+    requested format streams the snapshot's entries to disk in a worker
+    thread, so a reset while the export runs does not affect it.
+
+    Args:
+        fmt (str): Export format, one of the keys of EXPORT_WRITERS
 
     Returns:
-        flask.Response: Rendered template with success message
+        flask.Response: Rendered template with a download link for the export
     """
-    results = get_entry(TEMP_FILE, "id")
+    purge_export_jobs()
     cmd_results = get_entry(TEMP_FILE, "command")
-    write_json(results, OUTPUT_DIR)
+    compress = request.form.get("compress") == "on"
+
+    job_id = str(uuid.uuid4())
+    snapshot_dir = snapshot_session(
+        TEMP_FILE,
+        RAW_OUTPUT_DIR,
+        os.path.join(SNAPSHOT_DIR, job_id)
+    )
+    export_jobs[job_id] = (time.time(), export_executor.submit(
+        export_snapshot,
+        fmt,
+        snapshot_dir,
+        compress
+    ))
     return render_partial(
         'answer.html',
         suggestion=session.command_suggestions,
         results=cmd_results,
-        success="Output saved!"
+        success="Export started!",
+        download_url=url_for('download', job_id=job_id)
     )
 
 
+def export_snapshot(fmt, snapshot_dir, compress):
+    """
+    Write a session snapshot with the writer for fmt, then delete it.
+
+    Args:
+        fmt (str): Export format, one of the keys of EXPORT_WRITERS
+        snapshot_dir (str): Snapshot taken by snapshot_session
+        compress (bool): Whether the file is gzip-compressed
+
+    Returns:
+        str: The output filename
+    """
+    try:
+        return EXPORT_WRITERS[fmt](
+            iter_snapshot_entries(snapshot_dir, TEMP_FILE, "id"),
+            OUTPUT_DIR,
+            compress
+        )
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def purge_export_jobs():
+    """
+    Drop finished export jobs that were started more than EXPORT_JOB_TTL
+    seconds ago and never downloaded.
+    """
+    now = time.time()
+    for job_id, (started, job) in list(export_jobs.items()):
+        if job.done() and now - started > EXPORT_JOB_TTL:
+            export_jobs.pop(job_id, None)
+
+
+@app.route('/save_json', methods=['POST'])
+def save_json():
+    """
+    Save the current session data to a JSON file.
+
+    Returns:
+        flask.Response: Rendered template with a download link
+    """
+    return start_export("json")
+
+
+@app.route('/save_ndjson', methods=['POST'])
+def save_ndjson():
+    """
+    Save the current session data to a newline-delimited JSON file.
+
+    Returns:
+        flask.Response: Rendered template with a download link
+    """
+    return start_export("ndjson")
+
+
 @app.route('/save_md', methods=['POST'])
 def save_md():
     """
     Save the current session data to a Markdown file.
 
     Returns:
-        flask.Response: Rendered template with success message
+        flask.Response: Rendered template with a download link
     """
-    results = get_entry(TEMP_FILE, "id")
-    cmd_results = get_entry(TEMP_FILE, "command")
-    write_md(results, OUTPUT_DIR)
-    return render_partial(
-        'answer.html',
-        suggestion=session.command_suggestions,
-        results=cmd_results,
-        success="Output saved!"
+    return start_export("md")
+
+
+@app.route('/download/<job_id>', methods=['GET'])
+def download(job_id):
+    """
+    Download the file produced by a background export.
+
+    The job is dropped once it has finished and been answered, so each
+    export can be downloaded once.
+
+    Args:
+        job_id (str): Id of the export job
+
+    Returns:
+        flask.Response: The exported file, or a JSON status while the
+        export is still running or if it failed
+    """
+    entry = export_jobs.get(job_id)
+    if entry is None:
+        return jsonify({'status': 'unknown'}), 404
+    _, job = entry
+    if not job.done():
+        return jsonify({'status': 'pending'}), 202
+
+    export_jobs.pop(job_id, None)
+    try:
+        filename = job.result()
+    except Exception as e:
+        print(f"Error: export {job_id} failed: {e}")
+        return jsonify({'status': 'failed'}), 500
+
+    return send_from_directory(
+        os.path.abspath(OUTPUT_DIR),
+        filename,
+        as_attachment=True
     )
 
 
+@app.route('/metrics/hedge', methods=['GET'])
+def hedge_metrics():
+    """
+    Report how often hedged model requests were sent and won, and the
+    remaining hedge budget of the caller's session.
+
+    Returns:
+        flask.Response: JSON hedging metrics, or enabled=False if hedging is off
+    """
+    stats = hedge_stats(client_key())
+    if stats is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **stats})
+
+
 @app.route('/reset', methods=['POST'])
 def reset():
     """
     Reset the application state.
 
-    Clears the temporary file, executed commands history, and command
-    suggestions from the session.
+    Clears the temporary file, the spooled command outputs, executed
+    commands history, and command suggestions from the session.
 
     Returns:
         flask.Response: Rendered index template
     """
     clean_temp(TEMP_FILE)
+    clean_raw_output(RAW_OUTPUT_DIR)
     session.executed_commands = []
     session.command_suggestions = []
     return render_template('index.html', instruction=False)
@@ -347,10 +603,12 @@ def index():
     """
     Render the main application page.
 
-    Initializes a clean session by clearing the temporary file.
+    Initializes a clean session by clearing the temporary file and the
+    spooled command outputs.
 
     Returns:
         flask.Response: Rendered index template
     """
     clean_temp(TEMP_FILE)
+    clean_raw_output(RAW_OUTPUT_DIR)
     return render_template('index.html', instruction=False)
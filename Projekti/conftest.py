@@ -0,0 +1,70 @@
+"""
+pytest configuration and fixtures. Keeping this file in the project root
+puts the root on sys.path, so tests import the application modules as
+adversary_sim.py does ("from utils.intent_utils import ...").
+
+Run the tests from this directory:
+    python -m pytest -q
+"""
+
+import importlib
+import os
+
+import pytest
+
+from utils.fake_llm_server import start_fake_server
+
+
+@pytest.fixture(scope="session")
+def llm_server():
+    """
+    Fake LLM server shared by the whole session, with AI_BACKEND_URL
+    pointing at it. Returns (server, base_url).
+    """
+    server, base_url = start_fake_server()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AI_BACKEND_URL", base_url)
+        yield server, base_url
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def slow_llm_server():
+    """
+    Fake LLM server that takes 0.5 s per answer. Returns (server, base_url).
+    """
+    server, base_url = start_fake_server(delay=0.5)
+    yield server, base_url
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def ai_utils(llm_server):
+    """
+    The ai_utils module. Its backends are built on import, so it is
+    imported only once AI_BACKEND_URL is set.
+    """
+    return importlib.import_module("utils.ai_utils")
+
+
+@pytest.fixture(scope="session")
+def app_module(ai_utils, tmp_path_factory):
+    """
+    The adversary_sim module, run from a temporary directory. It keeps its
+    session file and outputs relative to the working directory.
+    """
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        yield importlib.import_module("adversary_sim")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    """
+    Flask test client with a clean session file.
+    """
+    app_module.clean_temp(app_module.TEMP_FILE)
+    return app_module.app.test_client()
@@ -64,7 +64,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     
     const form = e.target;
-    if (!['suggest_form', 'execute_form', 'analysis_form', 'save_json', 'save_md'].includes(form.id)) return;
+    if (!['suggest_form', 'execute_form', 'analysis_form', 'save_json', 'save_ndjson', 'save_md'].includes(form.id)) return;
     e.preventDefault();
     
     const formData = new FormData(form)
@@ -0,0 +1,119 @@
+import io
+import json
+import os
+import threading
+
+from utils.cmd_utils import CommandOutput
+
+
+def export(client, app_module):
+    response = client.post("/save_json", data={})
+    assert response.status_code == 200
+    job_id = next(reversed(app_module.export_jobs))
+    app_module.export_jobs[job_id][1].result(timeout=5)
+    return job_id
+
+
+def test_export_job_is_dropped_after_download(client, app_module):
+    job_id = export(client, app_module)
+
+    response = client.get(f"/download/{job_id}")
+    assert response.status_code == 200
+    assert b'"entries"' in response.data
+    response.close()
+
+    assert job_id not in app_module.export_jobs
+    assert client.get(f"/download/{job_id}").status_code == 404
+
+
+def test_finished_export_jobs_expire(client, app_module):
+    old = export(client, app_module)
+    started, job = app_module.export_jobs[old]
+    app_module.export_jobs[old] = (started - app_module.EXPORT_JOB_TTL - 1, job)
+
+    new = export(client, app_module)
+
+    assert old not in app_module.export_jobs
+    assert new in app_module.export_jobs
+
+
+def test_reset_removes_spooled_output(client, app_module):
+    os.makedirs(app_module.RAW_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(app_module.RAW_OUTPUT_DIR, "entry.txt")
+    with open(path, "w") as f:
+        f.write("long scan output")
+
+    assert client.post("/reset").status_code == 200
+    assert not os.path.exists(path)
+
+
+STDOUT = b"port 80 open\n" * 100 + b"late finding\n"
+STDERR = b"warning\n" * 100
+
+
+def run_long_command(client, app_module, monkeypatch, prompts):
+    """
+    Run a command whose stdout and stderr exceed a 200 character limit.
+    """
+    monkeypatch.setattr(app_module, "MAX_OUTPUT_CHARS", 200)
+    monkeypatch.setattr(
+        app_module, "run_command",
+        lambda container, command: CommandOutput(0, io.BytesIO(STDOUT), io.BytesIO(STDERR))
+    )
+    monkeypatch.setattr(
+        app_module, "ask_analysis",
+        lambda prompt, session_key=None: prompts.append(prompt) or "analysis"
+    )
+    app_module.session.executed_commands = []
+
+    response = client.post("/run", data={"action": "run", "cmd_index": "1", "approved_cmd_1": "nmap 127.0.0.1"})
+    assert response.status_code == 200
+
+
+def read_export(app_module, job_id):
+    filename = app_module.export_jobs[job_id][1].result(timeout=5)
+    with open(os.path.join(app_module.OUTPUT_DIR, filename), encoding="utf-8") as f:
+        return json.load(f)["entries"]
+
+
+def test_long_output_is_analysed_with_notice_and_exported_in_full(client, app_module, monkeypatch):
+    prompts = []
+    run_long_command(client, app_module, monkeypatch, prompts)
+
+    assert prompts[0].startswith(STDOUT[:200].decode())
+    assert "[Output truncated: only the first 200 characters" in prompts[0]
+    entry = app_module.get_last_entry(app_module.TEMP_FILE, "command")
+    assert len(entry["stdout"]) == len(entry["stderr"]) == 200
+
+    exported = read_export(app_module, export(client, app_module))[0]
+    assert exported["stdout"] == STDOUT.decode()
+    assert exported["stderr"] == STDERR.decode()
+    assert "stdout_file" not in exported and "stderr_file" not in exported
+
+    monkeypatch.setattr(
+        app_module, "conclusive_analysis",
+        lambda prompt, session_key=None: prompts.append(prompt) or "conclusion"
+    )
+    assert client.post("/analysis").status_code == 200
+    assert "[Output truncated: only the first 200 characters" in prompts[1]
+
+
+def test_reset_does_not_affect_running_export(client, app_module, monkeypatch):
+    run_long_command(client, app_module, monkeypatch, [])
+    release = threading.Event()
+    write_json = app_module.EXPORT_WRITERS["json"]
+
+    def blocked_write_json(*args):
+        release.wait(5)
+        return write_json(*args)
+
+    monkeypatch.setitem(app_module.EXPORT_WRITERS, "json", blocked_write_json)
+    assert client.post("/save_json", data={}).status_code == 200
+    job_id = next(reversed(app_module.export_jobs))
+
+    assert client.post("/reset").status_code == 200
+    release.set()
+
+    entries = read_export(app_module, job_id)
+    assert [entry["stdout"] for entry in entries] == [STDOUT.decode()]
+    assert os.listdir(app_module.SNAPSHOT_DIR) == []
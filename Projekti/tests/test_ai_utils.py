@@ -0,0 +1,55 @@
+import pytest
+
+
+@pytest.fixture
+def hedged(ai_utils, llm_server, slow_llm_server, monkeypatch):
+    """
+    Slow primary backend for "analyze", hedged to the fast fake server
+    after 0.05 s with a budget of one extra request per session.
+    """
+    monkeypatch.setitem(ai_utils.BACKENDS, "analyze", ai_utils.LLMBackend(model="slow", base_url=slow_llm_server[1]))
+    policy = ai_utils.HedgePolicy(
+        kinds=("analyze",),
+        fallbacks={"analyze": ai_utils.LLMBackend(model="fast", base_url=llm_server[1])},
+        budget=1,
+        default_delay=0.05,
+    )
+    monkeypatch.setattr(ai_utils, "HEDGE_POLICY", policy)
+    return policy
+
+
+def test_unhedged_request(ai_utils):
+    assert ai_utils.ask_analysis("PORT 80/tcp open").startswith("- Fake analysis")
+
+
+def test_slow_request_is_hedged(ai_utils, hedged):
+    assert ai_utils.ask_analysis("PORT 80/tcp open", session_key="a")
+
+    stats = hedged.stats("a")
+    assert stats["hedges_sent"] == 1
+    assert stats["hedges_won"] == 1
+    assert stats["budget_remaining"] == 0
+
+
+def test_hedge_budget_is_per_session(ai_utils, hedged):
+    ai_utils.ask_analysis("first", session_key="a")
+    ai_utils.ask_analysis("second", session_key="a")
+    ai_utils.ask_analysis("third", session_key="b")
+
+    stats = hedged.stats()
+    # Session a spent its budget on the first request, b still had its own
+    assert stats["hedges_sent"] == 2
+    assert stats["budget_exhausted"] == 1
+    assert stats["primary_won"] == 1
+    assert hedged.stats("a")["budget_remaining"] == 0
+    assert hedged.stats("b")["budget_remaining"] == 0
+    assert hedged.stats("c")["budget_remaining"] == 1
+
+
+def test_only_recent_sessions_are_tracked(ai_utils):
+    policy = ai_utils.HedgePolicy(budget=1, max_sessions=2)
+    for key in ("a", "b", "c"):
+        assert policy.try_acquire(key)
+    assert not policy.try_acquire("c")
+    # "a" was forgotten, so it starts over
+    assert policy.try_acquire("a")
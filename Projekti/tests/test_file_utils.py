@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from utils import file_utils
+from utils.file_utils import get_entry, get_last_entry, iter_entries, save_analysis, save_result
+
+
+@pytest.fixture
+def temp_file(tmp_path):
+    path = str(tmp_path / "TEMP.json")
+    with open(path, "w") as f:
+        json.dump([], f)
+    return path
+
+
+def test_iter_entries_streams_entries_across_chunks(temp_file, monkeypatch):
+    monkeypatch.setattr(file_utils, "STREAM_CHUNK_SIZE", 16)
+    for i in range(5):
+        save_result(temp_file, f"nmap -p {i} dvwa", "x" * 100 + ", [] }", "", f"analysis {i}")
+    save_analysis(temp_file, "nmap", "final")
+
+    entries = list(iter_entries(temp_file))
+
+    with open(temp_file) as f:
+        assert entries == json.load(f)
+    assert [e["command"] for e in get_entry(temp_file, "command")] == [f"nmap -p {i} dvwa" for i in range(5)]
+
+
+def test_get_last_entry(temp_file):
+    assert get_last_entry(temp_file, "final_analysis") is None
+    save_analysis(temp_file, "nmap", "first")
+    save_result(temp_file, "nmap dvwa", "out", "", "analysis")
+    save_analysis(temp_file, "nmap", "second")
+
+    assert get_last_entry(temp_file, "final_analysis")["final_analysis"] == "second"
+
+
+def test_missing_and_empty_files(temp_file, tmp_path):
+    assert get_entry(str(tmp_path / "missing.json"), "command") is None
+    assert get_last_entry(str(tmp_path / "missing.json"), "command") is None
+    assert get_entry(temp_file, "command") == []
@@ -0,0 +1,46 @@
+import pytest
+
+from utils.intent_utils import extract_ports, match_intent
+
+
+@pytest.mark.parametrize("instruction, command", [
+    ("ping sweep 172.20.0.0", "nmap -sn 172.20.0.0"),
+    ("top ports on dvwa", "nmap -F dvwa"),
+    ("fast port scan dvwa", "nmap -F dvwa"),
+    ("nikto scan http://dvwa:80", "nikto -h dvwa"),
+    ("scan ports 22,80 on dvwa", "nmap -p 22,80 dvwa"),
+    ("service version scan on dvwa port 80", "nmap -sV -p 80 dvwa"),
+    ("default scripts localhost", "nmap -sC localhost"),
+])
+def test_match_intent_maps_stock_phrases(instruction, command):
+    assert match_intent(instruction) == [{"tool": command.split()[0], "command": command}]
+
+
+def test_extract_ports():
+    assert extract_ports("scan port 8080 on dvwa") == "8080"
+    assert extract_ports("ports 1-1000") == "1-1000"
+    assert extract_ports("scan dvwa") is None
+    with pytest.raises(ValueError):
+        extract_ports("scan port 99999 on dvwa")
+
+
+def test_invalid_port_is_left_to_the_model():
+    # Dropping the port would turn this into a broader scan
+    assert match_intent("scan port 99999 on dvwa") is None
+
+
+def test_several_intents_are_left_to_the_model():
+    assert match_intent("ping sweep and nikto scan on dvwa") is None
+    assert match_intent("service versions and default scripts on dvwa") is None
+
+
+@pytest.mark.parametrize("instruction", [
+    "what services does dvwa run?",
+    "which port is dvwa on?",
+    "explain the ports open on dvwa",
+    "top ports on dvwa port 80",
+    "ping sweep dvwa and localhost",
+    "hello",
+])
+def test_questions_and_unsupported_requests_are_left_to_the_model(instruction):
+    assert match_intent(instruction) is None
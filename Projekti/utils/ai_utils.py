@@ -1,31 +1,154 @@
 """
 AI utility functions for cybersecurity command suggestions and analysis.
 
-This module provides functions to interact with OpenAI's API for generating
-security scanning commands and analyzing their outputs.
+This module provides functions to interact with OpenAI's API, or any
+OpenAI-compatible local server, for generating security scanning commands
+and analyzing their outputs. Each prompt type (suggest, analyze, conclude)
+can be routed to its own backend.
 """
 
 from openai import OpenAI
 from dotenv import load_dotenv
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
+import threading
+import time
 
 load_dotenv()
 
+DEFAULT_MODEL = "gpt-4.1-mini"
+PROMPT_KINDS = ("suggest", "analyze", "conclude")
+
 # Try fetching from .env file first
-API_KEY = os.environ.get("OPENAI_API_KEY")
+API_KEY = os.environ.get("AI_API_KEY")
 
 # If not found, try from shell environment
 if not API_KEY or API_KEY == "your_key_here":
   API_KEY = os.environ.get("OPENAI_API_KEY")
 
-# If still not found, raise error
-if not API_KEY:
+
+class LLMBackend:
+    """
+    An OpenAI-compatible model backend.
+
+    Points either at the OpenAI API or at any local HTTP server that speaks
+    the OpenAI protocol, such as a llama.cpp server. Local servers usually
+    only implement chat completions, so the request style can be chosen.
+
+    Attributes:
+        model (str): Model name sent with each request
+        base_url (str): Base URL of the server, None for the OpenAI API
+        api (str): Request style, "responses" or "chat"
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, base_url=None, api_key=None, api=None):
+        """
+        Initialize the backend.
+
+        Args:
+            model (str): Model name sent with each request
+            base_url (str, optional): Base URL of an OpenAI-compatible server,
+                e.g. "http://127.0.0.1:8081/v1". None uses the OpenAI API.
+            api_key (str, optional): API key. The OpenAI key is only used
+                for the OpenAI API, local servers usually ignore the key.
+            api (str, optional): "responses" or "chat". Defaults to
+                "responses" for the OpenAI API and "chat" for local servers.
+        """
+        self.model = model
+        self.base_url = base_url
+        self.api = api or ("chat" if base_url else "responses")
+        self.client = OpenAI(
+            api_key=api_key or (API_KEY if base_url is None else None) or "not-needed",
+            base_url=base_url
+        )
+
+    def __repr__(self):
+        return f"LLMBackend(model={self.model!r}, base_url={self.base_url!r}, api={self.api!r})"
+
+    def complete(self, instructions, prompt, max_tokens):
+        """
+        Send a prompt to the backend and return the generated text.
+
+        Args:
+            instructions (str): System instructions for the model
+            prompt (str): User input
+            max_tokens (int): Maximum tokens for the response
+
+        Returns:
+            str: The generated text
+        """
+        if self.api == "chat":
+            resp = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.0,
+                max_tokens=max_tokens
+            )
+            return resp.choices[0].message.content
+
+        resp = self.client.responses.create(
+            model=self.model,
+            instructions=instructions,
+            input=prompt,
+            temperature=0.0,
+            max_output_tokens=max_tokens
+        )
+        return resp.output_text
+
+
+def backend_from_env(kind):
+    """
+    Build the backend for a prompt type from environment variables.
+
+    Per-prompt variables (e.g. SUGGEST_BACKEND_URL, SUGGEST_MODEL,
+    SUGGEST_BACKEND_API) override the shared AI_BACKEND_URL, AI_MODEL and
+    AI_BACKEND_API defaults.
+
+    Args:
+        kind (str): Prompt type, one of PROMPT_KINDS
+
+    Returns:
+        LLMBackend: The configured backend
+    """
+    prefix = kind.upper()
+
+    def setting(name):
+        return os.environ.get(f"{prefix}_{name}") or os.environ.get(f"AI_{name}")
+
+    return LLMBackend(
+        model=os.environ.get(f"{prefix}_MODEL") or os.environ.get("AI_MODEL") or DEFAULT_MODEL,
+        base_url=setting("BACKEND_URL"),
+        api_key=setting("BACKEND_KEY"),
+        api=setting("BACKEND_API")
+    )
+
+
+BACKENDS = {kind: backend_from_env(kind) for kind in PROMPT_KINDS}
+
+# The API key is only required when some prompt type uses the OpenAI API
+if not API_KEY and any(b.base_url is None for b in BACKENDS.values()):
   raise RuntimeError(
     "Missing API key. Please set AI_API_KEY "
     "in your .env file or OPENAI_API_KEY in your shell environment."
   )
 
-client = OpenAI(api_key=API_KEY)
+
+def set_backend(kind, backend):
+    """
+    Route a prompt type to a different backend.
+
+    Args:
+        kind (str): Prompt type, one of PROMPT_KINDS
+        backend (LLMBackend): Backend that will serve the prompt type
+    """
+    if kind not in PROMPT_KINDS:
+        raise ValueError(f"Unknown prompt type '{kind}'")
+    BACKENDS[kind] = backend
+
 
 SUGGEST_PROMPT = """
 You are a cybersecurity assistant. Translate this user request into a safe command that uses only nmap or nikto against a Docker target container address "dvwa", "localhost", 172.20.0.0 or 127.0.0.1.
@@ -52,82 +175,315 @@ Do not repeat the outputs; summarize them concisely.
 """
 
 
-def ask_model(prompt, max_tokens=400):
+class HedgePolicy:
+    """
+    Opt-in policy for hedging slow model requests.
+
+    If a request has not returned within the observed p95 latency of its
+    prompt type, a duplicate request is sent, possibly to a fallback
+    backend, and the first response wins. The number of extra requests is
+    limited by a budget per client session, identified by a session key.
+    Latencies and metrics are shared by all sessions.
+
+    Attributes:
+        kinds (set): Prompt types that are hedged
+        fallbacks (dict): Prompt type -> backend used for the duplicate request
+        budget (int): Extra requests allowed per session
+        percentile (float): Latency percentile that triggers a hedge
+    """
+
+    def __init__(self, kinds=("suggest", "analyze"), fallbacks=None, budget=10,
+                 percentile=0.95, min_samples=10, window=200, default_delay=3.0,
+                 max_sessions=1000):
+        """
+        Initialize the policy.
+
+        Args:
+            kinds (iterable, optional): Prompt types to hedge.
+            fallbacks (dict, optional): Prompt type -> LLMBackend for hedges.
+                Prompt types without a fallback hedge to their own backend.
+            budget (int, optional): Extra requests allowed per session.
+            percentile (float, optional): Latency percentile that triggers a hedge.
+            min_samples (int, optional): Samples needed before the percentile
+                is trusted. Until then default_delay is used.
+            window (int, optional): Number of recent latencies kept per prompt type.
+            default_delay (float, optional): Hedge delay in seconds before
+                enough samples exist.
+            max_sessions (int, optional): Sessions whose budget is tracked.
+                The least recently active sessions are forgotten first.
+        """
+        self.kinds = set(kinds)
+        self.fallbacks = fallbacks or {}
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.default_delay = default_delay
+        self.max_sessions = max_sessions
+
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._used = OrderedDict()  # session key -> extra requests sent
+        self._stats = {"calls": 0, "hedges_sent": 0, "hedges_won": 0,
+                       "primary_won": 0, "budget_exhausted": 0}
+
+    def record_latency(self, kind, seconds):
+        """
+        Record the latency of a completed primary request.
+        """
+        with self._lock:
+            self._latencies.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_delay(self, kind):
+        """
+        Return how long to wait for the primary request before hedging.
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1, int(self.percentile * len(samples)))
+        return samples[index]
+
+    def try_acquire(self, session_key=None):
+        """
+        Take one extra request from the budget of a session.
+
+        Args:
+            session_key (str, optional): Client session the request belongs to.
+
+        Returns:
+            bool: True if a hedge may be sent.
+        """
+        with self._lock:
+            used = self._used.get(session_key, 0)
+            if used >= self.budget:
+                self._stats["budget_exhausted"] += 1
+                return False
+            self._used[session_key] = used + 1
+            self._used.move_to_end(session_key)
+            while len(self._used) > self.max_sessions:
+                self._used.popitem(last=False)
+            self._stats["hedges_sent"] += 1
+            return True
+
+    def count(self, key):
+        """
+        Increment a counter in the metrics.
+        """
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self, session_key=None):
+        """
+        Return hedging metrics.
+
+        Args:
+            session_key (str, optional): Session whose remaining budget is reported.
+
+        Returns:
+            dict: Counters, remaining budget of the session, hedge win rate
+            and the current hedge delay per prompt type.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["budget_remaining"] = self.budget - self._used.get(session_key, 0)
+        sent = stats["hedges_sent"]
+        stats["hedge_win_rate"] = stats["hedges_won"] / sent if sent else 0.0
+        stats["hedge_delay"] = {kind: self.hedge_delay(kind) for kind in self.kinds}
+        return stats
+
+
+def hedge_policy_from_env():
+    """
+    Build the hedging policy from environment variables.
+
+    Hedging is enabled with AI_HEDGE=1. AI_HEDGE_BUDGET sets the extra
+    request budget per session. AI_HEDGE_MODEL and AI_HEDGE_BACKEND_URL
+    send the duplicate requests to a fallback backend.
+
+    Returns:
+        HedgePolicy: The policy, or None if hedging is disabled
+    """
+    if os.environ.get("AI_HEDGE", "").lower() not in ("1", "true", "yes"):
+        return None
+
+    fallbacks = {}
+    hedge_model = os.environ.get("AI_HEDGE_MODEL")
+    hedge_url = os.environ.get("AI_HEDGE_BACKEND_URL")
+    kinds = ("suggest", "analyze")
+    if hedge_model or hedge_url:
+        for kind in kinds:
+            primary = BACKENDS[kind]
+            fallbacks[kind] = LLMBackend(
+                model=hedge_model or primary.model,
+                base_url=hedge_url or primary.base_url,
+                api_key=os.environ.get("AI_HEDGE_BACKEND_KEY"),
+                api=os.environ.get("AI_HEDGE_BACKEND_API") or (None if hedge_url else primary.api)
+            )
+    return HedgePolicy(
+        kinds=kinds,
+        fallbacks=fallbacks,
+        budget=int(os.environ.get("AI_HEDGE_BUDGET", 10))
+    )
+
+
+HEDGE_POLICY = hedge_policy_from_env()
+
+# Requests run in worker threads so a hedge can race the primary request.
+# A losing request cannot be cancelled and finishes in the background.
+_hedge_executor = ThreadPoolExecutor(max_workers=8)
+
+
+def set_hedge_policy(policy):
+    """
+    Enable hedging with the given policy, or disable it with None.
+    """
+    global HEDGE_POLICY
+    HEDGE_POLICY = policy
+
+
+def hedge_stats(session_key=None):
+    """
+    Return hedging metrics, with the remaining budget of session_key,
+    or None if hedging is disabled.
+    """
+    return HEDGE_POLICY.stats(session_key) if HEDGE_POLICY else None
+
+
+def _hedged_complete(policy, kind, instructions, prompt, max_tokens, session_key=None):
+    """
+    Run a request with hedging and return the first successful response.
+
+    Args:
+        policy (HedgePolicy): The hedging policy
+        kind (str): Prompt type, one of PROMPT_KINDS
+        instructions (str): System instructions for the model
+        prompt (str): User input
+        max_tokens (int): Maximum tokens for the response
+        session_key (str, optional): Client session whose budget pays for a hedge
+
+    Returns:
+        str: The generated text
+
+    Raises:
+        Exception: The last error if every request failed
+    """
+    policy.count("calls")
+    start = time.perf_counter()
+
+    def record(future):
+        if future.exception() is None:
+            policy.record_latency(kind, time.perf_counter() - start)
+
+    primary = _hedge_executor.submit(
+        BACKENDS[kind].complete, instructions, prompt, max_tokens
+    )
+    primary.add_done_callback(record)
+
+    done, _ = wait([primary], timeout=policy.hedge_delay(kind))
+    if done or not policy.try_acquire(session_key):
+        result = primary.result()
+        policy.count("primary_won")
+        return result
+
+    backend = policy.fallbacks.get(kind, BACKENDS[kind])
+    print(f"Hedging slow {kind} request to {backend.model}")
+    hedge = _hedge_executor.submit(backend.complete, instructions, prompt, max_tokens)
+
+    pending = {primary: "primary_won", hedge: "hedges_won"}
+    error = None
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            winner = pending.pop(future)
+            if future.exception() is None:
+                policy.count(winner)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _ask(kind, instructions, prompt, max_tokens, session_key=None):
+    """
+    Send a prompt to the backend configured for the prompt type.
+
+    Requests are hedged when a HedgePolicy is enabled for the prompt type.
+
+    Args:
+        kind (str): Prompt type, one of PROMPT_KINDS
+        instructions (str): System instructions for the model
+        prompt (str): User input
+        max_tokens (int): Maximum tokens for the response
+        session_key (str, optional): Client session whose hedge budget is used
+
+    Returns:
+        str: The generated text
+    """
+    policy = HEDGE_POLICY
+    if policy and kind in policy.kinds:
+        text = _hedged_complete(policy, kind, instructions, prompt, max_tokens, session_key)
+    else:
+        text = BACKENDS[kind].complete(instructions, prompt, max_tokens)
+    print(text)
+    return text
+
+
+def ask_model(prompt, max_tokens=400, session_key=None):
     """
     Request a command suggestion from the AI model.
 
     Args:
         prompt (str): The user's request for a security command.
         max_tokens (int, optional): Maximum tokens for the response. Defaults to 400.
+        session_key (str, optional): Client session whose hedge budget is used.
 
     Returns:
         str: The AI-generated command suggestion, or None if an error occurs.
     """
     try:
-        resp = client.responses.create(
-            model="gpt-4.1-mini",
-            instructions=SUGGEST_PROMPT,
-            input=prompt,
-            temperature=0.0,
-            max_output_tokens=max_tokens
-        )
-        print(resp.output_text)
-        return resp.output_text
+        return _ask("suggest", SUGGEST_PROMPT, prompt, max_tokens, session_key)
 
     except Exception as e:
         print(f"Error generating suggestion: {e}")
         return None
 
 
-def ask_analysis(prompt, max_tokens=400):
+def ask_analysis(prompt, max_tokens=400, session_key=None):
     """
     Request an analysis of command output from the AI model.
 
     Args:
         prompt (str): The command output to be analyzed.
         max_tokens (int, optional): Maximum tokens for the response. Defaults to 400.
+        session_key (str, optional): Client session whose hedge budget is used.
 
     Returns:
         str: The AI-generated analysis, or None if an error occurs.
     """
     try:
-        resp = client.responses.create(
-            model="gpt-4.1-mini",
-            instructions=ANALYZE_PROMPT,
-            input=prompt,
-            temperature=0.0,
-            max_output_tokens=max_tokens
-        )
-        print(resp.output_text)
-        return resp.output_text
+        return _ask("analyze", ANALYZE_PROMPT, prompt, max_tokens, session_key)
 
     except Exception as e:
         print(f"Error generating analysis: {e}")
         return None
 
 
-def conclusive_analysis(prompt_text, max_tokens=1000):
+def conclusive_analysis(prompt_text, max_tokens=1000, session_key=None):
     """
     Request a conclusive analysis of multiple command outputs from the AI model.
 
     Args:
         prompt_text (str): The combined command outputs to be analyzed.
         max_tokens (int, optional): Maximum tokens for the response. Defaults to 1000.
+        session_key (str, optional): Client session whose hedge budget is used.
 
     Returns:
         str: The AI-generated conclusive analysis, or None if an error occurs.
     """
     try:
-        resp = client.responses.create(
-            model="gpt-4.1-mini",
-            instructions=CONCLUDE_PROMPT,
-            input=prompt_text,
-            temperature=0.0,
-            max_output_tokens=max_tokens
-        )
-        print(resp.output_text)
-        return resp.output_text
+        return _ask("conclude", CONCLUDE_PROMPT, prompt_text, max_tokens, session_key)
 
     except Exception as e:
         print(f"Error generating analysis: {e}")
-        return None
\ No newline at end of file
+        return None
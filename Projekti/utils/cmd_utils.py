@@ -8,6 +8,7 @@ This module provides:
 - get_nikto_parser: create a parser for the nikto command
 - safe_command: basic safety checks for commands and targets
 - validate_cmd: checks for duplicates and delegates to allowed_command
+- CommandOutput: command output spooled to temporary files, read lazily
 - run_command: executes a validated command inside a Docker container
 - update_command: update a saved suggestion (1-based index)
 - remove_cmd: remove a saved suggestion (1-based index)
@@ -15,9 +16,13 @@ This module provides:
 
 import shlex
 import argparse
+import codecs
+import shutil
 import subprocess
+import tempfile
+import threading
 import re
-from typing import Dict, List, Optional, Set, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 
 ALLOWED_TOOLS: Set[str] = {"nmap", "nikto"}
 
@@ -34,6 +39,10 @@ ALLOWED_TARGETS: List[str] = [
 
 FORBIDDEN_CHARS: List[str] = [";", "&", "|", "`", "$(", ">", "<"]
 
+# Output kept in memory before it is spilled to a temporary file on disk
+SPOOL_THRESHOLD: int = 1024 * 1024
+STREAM_CHUNK_SIZE: int = 64 * 1024
+
 ALLOWED_FLAGS: Dict[str, Set[str]] = {
     "nmap": {
         "-sT",
@@ -234,28 +243,181 @@ def validate_cmd(command: str, executed_commands: List[str]) -> Tuple[bool, str]
     return True, ""
 
 
-def run_command(EXECUTOR_CONTAINER: str, command: str) -> Optional[subprocess.CompletedProcess]:
+class CommandOutput:
+    """
+    Output of an executed command, spooled to temporary files.
+
+    Output up to SPOOL_THRESHOLD bytes stays in memory, anything larger is
+    spilled to disk. Consumers read it lazily as a stream of text chunks
+    instead of holding the whole output in Python strings.
+
+    Attributes:
+        returncode: Exit code of the command.
+        stdout_file: Spooled binary file holding standard output.
+        stderr_file: Spooled binary file holding standard error.
+    """
+
+    def __init__(self, returncode: int, stdout_file: BinaryIO, stderr_file: BinaryIO):
+        self.returncode = returncode
+        self.stdout_file = stdout_file
+        self.stderr_file = stderr_file
+
+    def _iter_text(self, spool: BinaryIO, chunk_size: int) -> Iterator[str]:
+        spool.seek(0)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = spool.read(chunk_size)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def iter_stdout(self, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yield standard output as decoded text chunks.
+        """
+        return self._iter_text(self.stdout_file, chunk_size)
+
+    def iter_stderr(self, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yield standard error as decoded text chunks.
+        """
+        return self._iter_text(self.stderr_file, chunk_size)
+
+    def _read(self, spool: BinaryIO, limit: Optional[int]) -> Tuple[str, bool]:
+        parts = []
+        size = 0
+        for chunk in self._iter_text(spool, STREAM_CHUNK_SIZE):
+            parts.append(chunk)
+            size += len(chunk)
+            if limit is not None and size > limit:
+                return "".join(parts)[:limit], False
+        return "".join(parts), True
+
+    def read_stdout(self, limit: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Read standard output, at most limit characters.
+
+        Returns:
+            (text, complete) where complete is False if the output was cut
+            at limit.
+        """
+        return self._read(self.stdout_file, limit)
+
+    def read_stderr(self, limit: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Read standard error, at most limit characters.
+
+        Returns:
+            (text, complete) where complete is False if the output was cut
+            at limit.
+        """
+        return self._read(self.stderr_file, limit)
+
+    @property
+    def stdout(self) -> str:
+        """Full standard output as a string. Prefer the streaming readers."""
+        return self.read_stdout()[0]
+
+    @property
+    def stderr(self) -> str:
+        """Full standard error as a string. Prefer the streaming readers."""
+        return self.read_stderr()[0]
+
+    def _save(self, spool: BinaryIO, path: str) -> str:
+        spool.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(spool, f, STREAM_CHUNK_SIZE)
+        return path
+
+    def save_stdout(self, path: str) -> str:
+        """
+        Copy standard output to a file without loading it into memory.
+
+        Args:
+            path: Destination file path.
+
+        Returns:
+            The destination path.
+        """
+        return self._save(self.stdout_file, path)
+
+    def save_stderr(self, path: str) -> str:
+        """
+        Copy standard error to a file without loading it into memory.
+
+        Args:
+            path: Destination file path.
+
+        Returns:
+            The destination path.
+        """
+        return self._save(self.stderr_file, path)
+
+    def close(self) -> None:
+        """
+        Release the spooled files.
+        """
+        self.stdout_file.close()
+        self.stderr_file.close()
+
+
+def _drain(pipe: BinaryIO, spool: BinaryIO) -> None:
+    """
+    Copy a process pipe into a spooled file chunk by chunk.
+    """
+    for data in iter(lambda: pipe.read(STREAM_CHUNK_SIZE), b""):
+        spool.write(data)
+    pipe.close()
+
+
+def run_command(
+    EXECUTOR_CONTAINER: str,
+    command: str,
+    spool_threshold: int = SPOOL_THRESHOLD,
+) -> Optional[CommandOutput]:
     """
     Execute a command inside a Docker executor container.
 
+    Standard output and standard error are streamed into spooled temporary
+    files while the command runs, so verbose scans do not grow the memory
+    of the calling process.
+
     Args:
         EXECUTOR_CONTAINER: Name of the docker container where the command
                             will be executed.
         command: The command string that will be run inside the container.
+        spool_threshold: Bytes of output kept in memory before spilling to disk.
 
     Returns:
-        subprocess.CompletedProcess on success, or None on error.
+        CommandOutput on success, or None on error.
     """
     args = shlex.split(command)
     print(f"Running command: {command} in docker container {EXECUTOR_CONTAINER}")
 
     try:
-        result = subprocess.run(
+        stdout_file = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+        stderr_file = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+        proc = subprocess.Popen(
             ["docker", "exec", EXECUTOR_CONTAINER] + args,
-            capture_output=True,
-            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
         )
-        return result
+        # Drain both pipes at once so neither can fill up and block the process
+        readers = [
+            threading.Thread(target=_drain, args=(proc.stdout, stdout_file)),
+            threading.Thread(target=_drain, args=(proc.stderr, stderr_file)),
+        ]
+        for reader in readers:
+            reader.start()
+        returncode = proc.wait()
+        for reader in readers:
+            reader.join()
+        return CommandOutput(returncode, stdout_file, stderr_file)
     except Exception as e:
         print(f"Error running command: {e}")
         return None
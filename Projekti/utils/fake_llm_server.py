@@ -0,0 +1,182 @@
+"""
+Lightweight fake OpenAI-compatible server for local testing.
+
+Implements just enough of the chat completions and responses endpoints for
+LLMBackend to talk to it, without a real model or network access. Command
+suggestion prompts get a fixed JSON command list, every other prompt gets a
+short canned analysis.
+
+Run it standalone:
+    python -m utils.fake_llm_server --port 8081 --delay 0.2
+
+and point the application at it:
+    AI_BACKEND_URL=http://127.0.0.1:8081/v1
+
+Or start it in-process with start_fake_server().
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_SUGGESTION = '[{"tool": "nmap", "command": "nmap -F dvwa"}]'
+
+
+def fake_reply(instructions, prompt):
+    """
+    Build the canned reply for a prompt.
+
+    Args:
+        instructions (str): System instructions of the request
+        prompt (str): User input of the request
+
+    Returns:
+        str: The reply text
+    """
+    if "JSON array of commands" in (instructions or ""):
+        return FAKE_SUGGESTION
+    return f"- Fake analysis of {len(prompt or '')} characters of input.\n- Severity: Low"
+
+
+def _usage(prompt, text):
+    # Rough token estimate, the real value does not matter here
+    return len(prompt or "") // 4, len(text) // 4
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving /v1/chat/completions and /v1/responses.
+    """
+
+    # Seconds to sleep before answering, set by start_fake_server
+    delay = 0.0
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        model = body.get("model", "fake-model")
+        path = self.path.rstrip("/")
+
+        if path.endswith("/chat/completions"):
+            messages = body.get("messages", [])
+            instructions = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+            prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+            text = fake_reply(instructions, prompt)
+            prompt_tokens, completion_tokens = _usage(prompt, text)
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+        elif path.endswith("/responses"):
+            prompt = body.get("input", "")
+            if not isinstance(prompt, str):
+                prompt = json.dumps(prompt)
+            text = fake_reply(body.get("instructions", ""), prompt)
+            input_tokens, output_tokens = _usage(prompt, text)
+            self._send_json(200, {
+                "id": f"resp_{uuid.uuid4().hex}",
+                "object": "response",
+                "created_at": int(time.time()),
+                "model": model,
+                "status": "completed",
+                "output": [{
+                    "type": "message",
+                    "id": f"msg_{uuid.uuid4().hex}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }],
+                "usage": {
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                },
+            })
+
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+
+def _make_server(host, port, delay):
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {"delay": delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_fake_server(host="127.0.0.1", port=0, delay=0.0):
+    """
+    Start the fake server in a background thread.
+
+    Args:
+        host (str, optional): Address to bind. Defaults to 127.0.0.1.
+        port (int, optional): Port to bind, 0 picks a free port.
+        delay (float, optional): Seconds to wait before each answer.
+
+    Returns:
+        tuple: (server, base_url). Call server.shutdown() to stop it.
+    """
+    server = _make_server(host, port, delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each answer")
+    args = parser.parse_args()
+
+    server = _make_server(args.host, args.port, args.delay)
+    print(f"Fake LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
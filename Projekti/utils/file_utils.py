@@ -4,20 +4,27 @@ File utilities for managing tool outputs, session data, and report generation.
 This module provides functions for:
 - File name generation and conflict resolution
 - JSON parsing and validation
-- Session data persistence
-- Markdown report generation
+- Session data persistence and streamed reading
+- Streaming JSON, NDJSON and Markdown report generation
 """
 
 import os
+import shutil
 import time
 import uuid
 import json
 import re
 import ast
-from mdutils import MdUtils
+import gzip
 
 ALLOWED_TOOLS = {"nmap", "nikto"}
 
+# Entry keys of spooled output files -> the field whose full text they hold
+SPOOLED_FIELDS = {"stdout_file": "stdout", "stderr_file": "stderr"}
+STREAM_CHUNK_SIZE = 64 * 1024
+# Whitespace and commas between the entries of a JSON array
+_ENTRY_SEPARATOR = re.compile(r"[\s,]*")
+
 
 def find_new_file_name(base_name: str) -> str:
     """
@@ -107,54 +114,241 @@ def validateStructure(commands):
     return True
 
 
-def write_json(output, output_dir):
+def _open_output(file_path, compress=False):
     """
-    Write session output to a pretty-printed JSON file.
-    
-    Normalizes various input formats (dict, list, JSON string, or Python
-    literal) into a structured JSON file with session metadata.
-    
+    Open an output file for text writing, optionally gzip-compressed.
+
     Args:
-        output: Data to write. Can be dict, list, JSON string, or Python literal.
-        
+        file_path: Path of the file to open.
+        compress: If True, the file is written through gzip.
+
     Returns:
-        The output filename.
+        A writable text file object.
+    """
+    if compress:
+        return gzip.open(file_path, "wt", encoding="utf-8")
+    return open(file_path, "w", encoding="utf-8")
+
+
+def _output_path(output_dir, filename, compress=False):
+    """
+    Create the output directory and build the final file name and path.
+
+    Args:
+        output_dir: Directory where the file is written.
+        filename: File name without the gzip suffix.
+        compress: If True, '.gz' is appended to the file name.
+
+    Returns:
+        Tuple of (filename, file_path).
+    """
+    if compress:
+        filename = f"{filename}.gz"
+    os.makedirs(output_dir, exist_ok=True)
+    return filename, os.path.join(output_dir, filename)
+
+
+def _normalize_output(output):
     """
-    # Normalize input into a Python object
-    if isinstance(output, (dict, list)):
-        data = output
-    elif isinstance(output, str):
+    Normalize session output into a Python object.
+
+    Accepts a dict, list, JSON string, Python literal or any iterable of
+    entries. Iterables other than strings are passed through untouched so
+    they can be consumed lazily by the writers.
+
+    Args:
+        output: Data to normalize.
+
+    Returns:
+        A dict, list or iterable of entries.
+    """
+    if isinstance(output, str):
         s = output.strip()
         try:
-            data = json.loads(s)  # Valid JSON string
+            return json.loads(s)  # Valid JSON string
         except json.JSONDecodeError:
             try:
-                data = ast.literal_eval(s)  # Python literal like "[{'a': 1}]"
+                return ast.literal_eval(s)  # Python literal like "[{'a': 1}]"
             except Exception:
-                data = {"raw": s}  # Fallback: wrap raw string
+                return {"raw": s}  # Fallback: wrap raw string
+    if output is None:
+        return []
+    return output
+
+
+def _iter_entries(data):
+    """
+    Yield entries one at a time from normalized session output.
+
+    A single dict is treated as one entry.
+    """
+    if isinstance(data, dict):
+        yield data
     else:
-        data = output
+        yield from data
+
+
+def _dump_entry(entry, indent=None):
+    """
+    Serialize a single session entry to a JSON string.
+    """
+    return json.dumps(entry, indent=indent, ensure_ascii=False,
+                      sort_keys=False, default=str)
+
+
+def _iter_file(file_path):
+    """
+    Yield the contents of a text file in chunks.
+    """
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), ""):
+            yield chunk
+
+
+def _spooled_files(entry):
+    """
+    (field, file path) pairs of an entry whose full output is stored in an
+    existing spooled file.
+    """
+    if not isinstance(entry, dict):
+        return []
+    return [
+        (field, entry[key])
+        for key, field in SPOOLED_FIELDS.items()
+        if entry.get(key) and os.path.exists(entry[key])
+    ]
+
+
+def _placeholder(field):
+    # Replaced by the streamed contents of the field's spooled file
+    return f"\x00{field}_file\x00"
+
+
+def _write_entry(f, entry, indent=None, line_prefix=""):
+    """
+    Write a single entry as JSON.
+
+    If the entry refers to spooled output files, the full outputs are
+    streamed from those files into the "stdout" and "stderr" fields instead
+    of the stored previews, and the file references themselves are left out.
+
+    Args:
+        f: Writable text file object.
+        entry: Entry to write.
+        indent: JSON indentation, None for a single line.
+        line_prefix: Prefix added after every newline of the entry.
+    """
+    spooled = _spooled_files(entry)
+    if not spooled:
+        f.write(_dump_entry(entry, indent).replace("\n", "\n" + line_prefix))
+        return
+
+    entry = {k: v for k, v in entry.items() if k not in SPOOLED_FIELDS}
+    for field, _ in spooled:
+        entry[field] = _placeholder(field)
+    text = _dump_entry(entry, indent)
+    # Stream the files in the order their fields appear in the entry
+    spooled.sort(key=lambda item: text.index(_dump_entry(_placeholder(item[0]))))
+
+    for field, file_path in spooled:
+        head, text = text.split(_dump_entry(_placeholder(field)), 1)
+        f.write(head.replace("\n", "\n" + line_prefix))
+        f.write('"')
+        for chunk in _iter_file(file_path):
+            # Escape the chunk as JSON string content without the quotes
+            f.write(_dump_entry(chunk)[1:-1])
+        f.write('"')
+    f.write(text.replace("\n", "\n" + line_prefix))
+
+
+def write_json(output, output_dir, compress=False):
+    """
+    Write session output to a pretty-printed JSON file.
+
+    Normalizes various input formats (dict, list, JSON string, or Python
+    literal) into a structured JSON file with session metadata. Entries
+    are serialized and written one at a time, so the whole document is
+    never held in memory.
+
+    Args:
+        output: Data to write. Can be dict, list, iterable of entries,
+                JSON string, or Python literal.
+        output_dir: Directory where the file is written.
+        compress: If True, the file is gzip-compressed.
+
+    Returns:
+        The output filename.
+    """
+    data = _normalize_output(output)
 
     timestamp = time.time()
-    output_json = {
-        "session_id": str(uuid.uuid4()),
-        "timestamp": timestamp,
-        "entries": data
-    }
-    
-    filename = f"tool_output_{timestamp}.json"
-    os.makedirs(output_dir, exist_ok=True)
-    file_path = os.path.join(output_dir, filename)
-    
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(output_json, f, indent=4, ensure_ascii=False,
-                  sort_keys=False, default=str)
-        f.write("\n")
-    
+    filename, file_path = _output_path(
+        output_dir, f"tool_output_{timestamp}.json", compress
+    )
+
+    with _open_output(file_path, compress) as f:
+        f.write("{\n")
+        f.write(f'    "session_id": "{uuid.uuid4()}",\n')
+        f.write(f'    "timestamp": {json.dumps(timestamp)},\n')
+
+        if not isinstance(data, (dict, list)) and not hasattr(data, "__iter__"):
+            # Scalars are written as they are
+            f.write(f'    "entries": {_dump_entry(data)}\n')
+        elif isinstance(data, dict):
+            f.write('    "entries": ')
+            _write_entry(f, data, indent=4, line_prefix="    ")
+            f.write("\n")
+        else:
+            f.write('    "entries": [')
+            first = True
+            for entry in data:
+                if not first:
+                    f.write(",")
+                first = False
+                # Indent each entry to match the surrounding document
+                f.write("\n        ")
+                _write_entry(f, entry, indent=4, line_prefix="        ")
+            f.write("\n    ]\n" if not first else "]\n")
+        f.write("}\n")
+
+    return filename
+
+
+def write_ndjson(output, output_dir, compress=False):
+    """
+    Write session output as newline-delimited JSON.
+
+    The first line holds the session metadata, every following line is a
+    single entry. Entries are written one at a time.
+
+    Args:
+        output: Data to write. Can be dict, list, iterable of entries,
+                JSON string, or Python literal.
+        output_dir: Directory where the file is written.
+        compress: If True, the file is gzip-compressed.
+
+    Returns:
+        The output filename.
+    """
+    data = _normalize_output(output)
+
+    timestamp = time.time()
+    filename, file_path = _output_path(
+        output_dir, f"tool_output_{timestamp}.ndjson", compress
+    )
+
+    with _open_output(file_path, compress) as f:
+        header = {"session_id": str(uuid.uuid4()), "timestamp": timestamp}
+        f.write(_dump_entry(header) + "\n")
+        for entry in _iter_entries(data):
+            _write_entry(f, entry)
+            f.write("\n")
+
     return filename
 
 
-def save_result(temp_file, command, stdout, stderr, prompt_analysis):
+def save_result(temp_file, command, stdout, stderr, prompt_analysis,
+                stdout_file=None, entry_id=None, stderr_file=None):
     """
     Save command execution results to a temporary session file.
     
@@ -164,18 +358,27 @@ def save_result(temp_file, command, stdout, stderr, prompt_analysis):
     Args:
         temp_file: Path to the temporary JSON file.
         command: The command that was executed.
-        stdout: Standard output from the command.
+        stdout: Standard output from the command, or a preview of it.
         stderr: Standard error from the command.
         prompt_analysis: AI analysis of the command output.
+        stdout_file: Optional path of a file holding the full standard
+                     output. Reports stream the output from this file.
+        entry_id: Optional id for the entry, generated if not given.
+        stderr_file: Optional path of a file holding the full standard
+                     error, streamed into reports like stdout_file.
     """
     entry = {
-        "id": str(uuid.uuid4()),
+        "id": entry_id or str(uuid.uuid4()),
         "timestamp": time.time(),
         "command": command,
         "stdout": stdout,
         "stderr": stderr,
         "prompt_analysis": prompt_analysis
     }
+    if stdout_file:
+        entry["stdout_file"] = stdout_file
+    if stderr_file:
+        entry["stderr_file"] = stderr_file
     
     try:
         # Create file if missing
@@ -195,6 +398,50 @@ def save_result(temp_file, command, stdout, stderr, prompt_analysis):
         print(f"Error: saving output to a temporary file failed! {e}")
 
 
+def iter_entries(temp_file):
+    """
+    Yield the entries of the temporary file one at a time.
+
+    The file is read in chunks and decoded entry by entry, so only the
+    current entry is held in memory, not the whole session.
+
+    Args:
+        temp_file: Path to the temporary JSON file.
+
+    Yields:
+        Session entries in file order. Nothing if the file does not exist.
+    """
+    if not os.path.exists(temp_file):
+        return
+    decoder = json.JSONDecoder()
+    with open(temp_file) as f:
+        buf = f.read(STREAM_CHUNK_SIZE)
+        pos = _ENTRY_SEPARATOR.match(buf).end()
+        if buf[pos:pos + 1] != "[":
+            # Not an array, read it the old way
+            f.seek(0)
+            yield from json.load(f)
+            return
+        pos += 1
+        eof = False
+        while True:
+            pos = _ENTRY_SEPARATOR.match(buf, pos).end()
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos == len(buf):
+                    raise json.JSONDecodeError("Need more data", buf, pos)
+                entry, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The entry continues in the next chunk
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+                continue
+            yield entry
+
+
 def get_entry(temp_file, entry_key):
     """
     Fetch entry/entries that have specified entry_key
@@ -208,10 +455,83 @@ def get_entry(temp_file, entry_key):
     """
     if not os.path.exists(temp_file):
         return None
-    with open(temp_file) as f:
-        all_results = json.load(f)
-        results = [result for result in all_results if entry_key in result]
-        return results
+    return [result for result in iter_entries(temp_file) if entry_key in result]
+
+
+def get_last_entry(temp_file, entry_key):
+    """
+    Fetch the latest entry that has specified entry_key.
+
+    Reads the file as a stream and keeps only the latest match.
+
+    Args:
+        temp_file: Path to the temporary JSON file.
+        entry_key: Dict key that the entry should have
+
+    Returns:
+        The last entry with the entry_key, or None
+    """
+    last = None
+    for result in iter_entries(temp_file):
+        if entry_key in result:
+            last = result
+    return last
+
+
+def snapshot_session(temp_file, raw_dir, snapshot_dir):
+    """
+    Copy the session into snapshot_dir, so it can be read while the live
+    session is cleared or extended.
+
+    The temporary file is copied and the spooled outputs in raw_dir are
+    hard-linked (copied where linking is not possible), so the snapshot
+    costs no memory and little disk space.
+
+    Args:
+        temp_file: Path to the temporary JSON file.
+        raw_dir: Directory holding the spooled output files.
+        snapshot_dir: New directory for the snapshot.
+
+    Returns:
+        The snapshot directory.
+    """
+    os.makedirs(snapshot_dir)
+    if os.path.exists(temp_file):
+        shutil.copyfile(temp_file, os.path.join(snapshot_dir, os.path.basename(temp_file)))
+    if os.path.isdir(raw_dir):
+        for name in os.listdir(raw_dir):
+            src = os.path.join(raw_dir, name)
+            dst = os.path.join(snapshot_dir, name)
+            try:
+                os.link(src, dst)
+            except FileNotFoundError:
+                continue  # Removed by a concurrent cleanup
+            except OSError:
+                shutil.copyfile(src, dst)
+    return snapshot_dir
+
+
+def iter_snapshot_entries(snapshot_dir, temp_file, entry_key=None):
+    """
+    Yield the entries of a session snapshot one at a time.
+
+    Spooled output paths are pointed at the copies in the snapshot.
+
+    Args:
+        snapshot_dir: Directory created by snapshot_session.
+        temp_file: Path of the temporary file the snapshot was taken of.
+        entry_key: Only yield entries with this key, if given.
+
+    Yields:
+        Session entries in file order.
+    """
+    for entry in iter_entries(os.path.join(snapshot_dir, os.path.basename(temp_file))):
+        if entry_key is not None and entry_key not in entry:
+            continue
+        for key in SPOOLED_FIELDS:
+            if entry.get(key):
+                entry[key] = os.path.join(snapshot_dir, os.path.basename(entry[key]))
+        yield entry
 
 
 def save_analysis(temp_file, commands, final_analysis_text):
@@ -258,7 +578,45 @@ def clean_temp(temp_file):
             json.dump([], f)
 
 
-def write_md(results, output_dir):
+def clean_raw_output(raw_dir):
+    """
+    Delete the full command outputs spooled to raw_dir.
+
+    They belong to the entries of the temporary file, so they are removed
+    whenever the temporary file is cleared.
+
+    Args:
+        raw_dir: Directory holding the spooled output files.
+    """
+    if not os.path.isdir(raw_dir):
+        return
+    for name in os.listdir(raw_dir):
+        path = os.path.join(raw_dir, name)
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"Error: removing raw output {path} failed: {e}")
+
+
+def _md_header(f, title, level=1):
+    """
+    Write a Markdown header.
+    """
+    f.write(f"\n\n{'#' * level} {title}\n")
+
+
+def _md_paragraph(f, text, bold=False):
+    """
+    Write a Markdown paragraph, optionally in bold.
+    """
+    text = "" if text is None else str(text)
+    if bold:
+        text = f"**{text}**"
+    f.write(f"\n\n{text}")
+
+
+def write_md(results, output_dir, compress=False):
     """
     Generate a Markdown report from session results.
     
@@ -267,72 +625,62 @@ def write_md(results, output_dir):
     - Command outputs
     - AI analysis
     - Final analysis summary
+
+    Each result is written to disk as soon as it is formatted, so large
+    sessions are never built up in memory.
     
     Args:
-        results: List of result entries from the session.
+        results: List or iterable of result entries from the session.
+        output_dir: Directory where the file is written.
+        compress: If True, the file is gzip-compressed.
         
     Returns:
         The output Markdown filename.
     """
     timestamp = time.time()
-    filename = f"tool_output_{timestamp}"
+    filename, file_path = _output_path(
+        output_dir, f"tool_output_{timestamp}.md", compress
+    )
     print(f"Saving tool output on file '{filename}'...")
-    os.makedirs(output_dir, exist_ok=True)
-    file_path = os.path.join(output_dir, filename)
-    md_file = MdUtils(file_path)
 
-    md_file.new_header(level=1, title="Tool output")
-    md_file.new_paragraph(
-        f"session_id: {str(uuid.uuid4())}",
-        bold_italics_code="b"
-    )
-    md_file.new_paragraph(
-        f"Timestamp: {timestamp}",
-        bold_italics_code="b"
-    )
-    for result in results:
-        if "final_analysis" in result:
-            md_file.new_header(level=1, title='Analysis results')
-            md_file.new_paragraph(
-                f'Based on commands: {result["based_on"]}',
-                bold_italics_code="b"
-            )
-            md_file.new_paragraph(
-                f'Timestamp: {result["timestamp"]}',
-                bold_italics_code="b"
-            )
-            md_file.new_paragraph(
-                f'ID: {result["id"]}',
-                bold_italics_code="b"
-            )
-            md_file.new_header(level=2, title='Analysis output:')
-            md_file.new_paragraph(result["final_analysis"])
-        else:
-            md_file.new_header(level=1, title='Command results')
-            md_file.new_paragraph(
-                f'Command: {result["command"]}',
-                bold_italics_code="b"
-            )
-            md_file.new_paragraph(
-                f'Timestamp: {result["timestamp"]}',
-                bold_italics_code="b"
-            )
-            md_file.new_paragraph(
-                f'ID: {result["id"]}',
-                bold_italics_code="b"
-            )
-            if "stderr" not in result or not result["stderr"]:
-                md_file.new_paragraph('Success!', bold_italics_code="b")
+    with _open_output(file_path, compress) as f:
+        _md_header(f, "Tool output")
+        _md_paragraph(f, f"session_id: {str(uuid.uuid4())}", bold=True)
+        _md_paragraph(f, f"Timestamp: {timestamp}", bold=True)
+
+        for result in results or []:
+            if "final_analysis" in result:
+                _md_header(f, "Analysis results")
+                _md_paragraph(f, f'Based on commands: {result["based_on"]}', bold=True)
+                _md_paragraph(f, f'Timestamp: {result["timestamp"]}', bold=True)
+                _md_paragraph(f, f'ID: {result["id"]}', bold=True)
+                _md_header(f, "Analysis output:", level=2)
+                _md_paragraph(f, result["final_analysis"])
             else:
-                md_file.new_paragraph(
-                    f'{result["stderr"]}',
-                    bold_italics_code="b"
-                )
-            md_file.new_header(level=2, title='Command output:')
-            md_file.new_paragraph(result["stdout"])
-            md_file.new_header(level=2, title='AI analysis:')
-            md_file.new_paragraph(result["prompt_analysis"])
-
-    md_file.create_md_file()
+                _md_header(f, "Command results")
+                _md_paragraph(f, f'Command: {result["command"]}', bold=True)
+                _md_paragraph(f, f'Timestamp: {result["timestamp"]}', bold=True)
+                _md_paragraph(f, f'ID: {result["id"]}', bold=True)
+                spooled = dict(_spooled_files(result))
+                if "stderr" in spooled:
+                    f.write("\n\n**")
+                    for chunk in _iter_file(spooled["stderr"]):
+                        f.write(chunk)
+                    f.write("**")
+                elif "stderr" not in result or not result["stderr"]:
+                    _md_paragraph(f, "Success!", bold=True)
+                else:
+                    _md_paragraph(f, f'{result["stderr"]}', bold=True)
+                _md_header(f, "Command output:", level=2)
+                if "stdout" in spooled:
+                    f.write("\n\n")
+                    for chunk in _iter_file(spooled["stdout"]):
+                        f.write(chunk)
+                else:
+                    _md_paragraph(f, result["stdout"])
+                _md_header(f, "AI analysis:", level=2)
+                _md_paragraph(f, result["prompt_analysis"])
+        f.write("\n")
+
     print("Tool output saved!\n")
-    return filename
\ No newline at end of file
+    return filename
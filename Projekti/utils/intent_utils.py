@@ -0,0 +1,166 @@
+"""
+Rule-based intent matching for common scan instructions.
+
+Many instructions are stock phrases such as "ping sweep", "top ports on
+dvwa" or "nikto scan dvwa". This module maps them straight to validated
+nmap and nikto commands without calling the AI model.
+
+This module provides:
+- extract_target: find an allowed target in an instruction
+- extract_ports: find a port, port list or port range in an instruction
+- match_intent: map an instruction to command suggestions, or None
+
+Anything ambiguous (several intents, an invalid port, ports the matched
+command cannot take) is left to the AI model instead of being guessed.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from utils.cmd_utils import ALLOWED_TARGETS, is_valid_port, safe_command
+
+# Longest targets first so "http://dvwa:80" wins over "dvwa"
+TARGET_PATTERNS = [
+    (target, re.compile(rf"(?<![\w.:/-]){re.escape(target)}(?![\w.:/-])", re.I))
+    for target in sorted(ALLOWED_TARGETS, key=len, reverse=True)
+]
+
+PORTS_PATTERN = re.compile(
+    r"\bports?\s*(?:number|numbers|range)?\s*:?\s*(\d{1,5}(?:\s*[-,]\s*\d{1,5})*)",
+    re.I
+)
+
+# List of (name, pattern, command template). An instruction must match
+# exactly one intent. Templates are filled with the extracted target and
+# ports. Bare words such as "port" or "services" are not enough on their own,
+# questions like "what services does dvwa run?" go to the AI model.
+INTENTS = [
+    (
+        "nikto_scan",
+        re.compile(r"\bnikto\b|\bweb\s*(?:server\s*)?(?:vuln\w*|scan)", re.I),
+        {"tool": "nikto", "command": "nikto -h {target}{ports}", "ports": " -p {ports}"},
+    ),
+    (
+        "ping_sweep",
+        re.compile(r"\bping\s*(?:sweep|scan)\b|\bhost\s*discovery\b|\b(?:is|are)\s+\w+\s+(?:up|alive)\b|\blive\s+hosts?\b", re.I),
+        {"tool": "nmap", "command": "nmap -sn {target}"},
+    ),
+    (
+        "service_versions",
+        re.compile(r"\bservice\s*versions?\b|\bversion\s*(?:detection|scan)\b", re.I),
+        {"tool": "nmap", "command": "nmap -sV{ports} {target}", "ports": " -p {ports}"},
+    ),
+    (
+        "default_scripts",
+        re.compile(r"\bdefault\s*scripts?\b|\bscript\s*scan\b", re.I),
+        {"tool": "nmap", "command": "nmap -sC{ports} {target}", "ports": " -p {ports}"},
+    ),
+    (
+        "top_ports",
+        re.compile(r"\btop\s*ports?\b|\b(?:fast|quick)\s*(?:port\s*)?scan\b|\bcommon\s*ports?\b", re.I),
+        {"tool": "nmap", "command": "nmap -F {target}"},
+    ),
+    (
+        "port_scan",
+        # "fast port scan" and "quick port scan" are top_ports
+        re.compile(r"\bopen\s*ports?\b|(?<!fast )(?<!quick )\bport\s*scan\b|\bscan\s+ports?\b", re.I),
+        {"tool": "nmap", "command": "nmap{ports} {target}", "ports": " -p {ports}"},
+    ),
+]
+
+
+def extract_target(instruction: str) -> Optional[str]:
+    """
+    Find the single allowed target mentioned in an instruction.
+
+    Args:
+        instruction: Natural language instruction.
+
+    Returns:
+        The matched target from ALLOWED_TARGETS, or None if no target or
+        more than one distinct target is mentioned.
+    """
+    found = []
+    remaining = instruction
+    for target, pattern in TARGET_PATTERNS:
+        if pattern.search(remaining):
+            found.append(target)
+            # Blank out the match so "dvwa" does not match inside "http://dvwa:80"
+            remaining = pattern.sub(" ", remaining)
+    if len(found) != 1:
+        return None
+    return found[0]
+
+
+def extract_ports(instruction: str) -> Optional[str]:
+    """
+    Find a port, port list or port range mentioned in an instruction.
+
+    Args:
+        instruction: Natural language instruction.
+
+    Returns:
+        Port specification string usable with -p, or None if no port
+        specification was found.
+
+    Raises:
+        ValueError: If a port specification was found but is not valid.
+    """
+    m = PORTS_PATTERN.search(instruction)
+    if not m:
+        return None
+    ports = re.sub(r"\s+", "", m.group(1))
+    try:
+        return str(is_valid_port(ports))
+    except Exception as e:
+        raise ValueError(str(e)) from e
+
+
+def match_intent(instruction: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Map a recognized instruction directly to command suggestions.
+
+    The generated commands are checked with safe_command, so anything
+    returned here is equivalent to a validated AI suggestion.
+
+    Args:
+        instruction: Natural language instruction.
+
+    Returns:
+        List of suggestion dicts with 'tool' and 'command' keys, or None if
+        the instruction was not recognized, matches several intents or has
+        an invalid port, and should go to the AI model.
+    """
+    if not instruction:
+        return None
+
+    target = extract_target(instruction)
+    if target is None:
+        return None
+    # nmap and nikto both take the bare host, without scheme or port
+    target = target.split("://")[-1].split(":")[0]
+
+    matched = [(name, template) for name, pattern, template in INTENTS if pattern.search(instruction)]
+    if len(matched) != 1:
+        if matched:
+            print(f"Several intents matched ({', '.join(name for name, _ in matched)}), asking the AI model")
+        return None
+    name, template = matched[0]
+
+    try:
+        ports = extract_ports(instruction)
+    except ValueError as e:
+        print(f"Intent '{name}' has an invalid port, asking the AI model: {e}")
+        return None
+    if ports and "ports" not in template:
+        print(f"Intent '{name}' cannot limit ports, asking the AI model")
+        return None
+
+    port_part = template["ports"].format(ports=ports) if ports else ""
+    command = template["command"].format(target=target, ports=port_part)
+    ok, reason = safe_command(command)
+    if not ok:
+        print(f"Intent '{name}' produced an invalid command: {reason}")
+        return None
+    print(f"Matched intent '{name}': {command}")
+    return [{"tool": template["tool"], "command": command}]
@@ -0,0 +1,96 @@
+"""
+pytest fixtures that run the fake OpenAI and ComfyUI servers in-process.
+
+Run the tests from this directory:
+    python -m pytest -q
+"""
+
+import importlib
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from utils import fake_comfy_server, fake_openai_server
+from utils.comfy_api import Comfy
+
+WORKFLOWS_DIR = Path(__file__).resolve().parent / "utils" / "workflows"
+
+
+@pytest.fixture(scope="session")
+def openai_server():
+    """
+    Fake OpenAI server shared by the whole session, with the environment of
+    the OpenAI client pointing at it. Returns (server, base_url).
+    """
+    server, base_url = fake_openai_server.start_fake_server()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("OPENAI_BASE_URL", base_url)
+        mp.setenv("OPENAI_API_KEY", "fake")
+        yield server, base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def openai_state(openai_server):
+    """
+    FakeOpenAIState of the shared server, reset after the test.
+    """
+    state = openai_server[0].state
+    yield state
+    state.batch_delay = 0.0
+    state.fail_every = 0
+    state.rate_limited = 0
+
+
+@pytest.fixture(scope="session")
+def t4(openai_server):
+    """
+    The t4_multiInputHandler module. It creates its OpenAI client on import,
+    so it is imported only once the fake server is running.
+    """
+    return importlib.import_module("t4_multiInputHandler")
+
+
+@pytest.fixture
+def comfy_server():
+    """
+    Fresh fake ComfyUI server. Returns (server, api_url).
+    """
+    server, api_url = fake_comfy_server.start_fake_server(delay=0.05, steps=2)
+    yield server, api_url
+    server.shutdown()
+
+
+@pytest.fixture
+def comfy_dir(tmp_path):
+    """
+    Client base directory with an images folder, the example workflow and
+    an img2img variant whose LoadImage node is "50".
+    """
+    workflows = tmp_path / "workflows"
+    workflows.mkdir()
+    (tmp_path / "images").mkdir()
+    shutil.copy(WORKFLOWS_DIR / "sdxlturbo_example.json", workflows / "sdxlturbo_example.json")
+    workflow = json.loads((WORKFLOWS_DIR / "sdxlturbo_example.json").read_text(encoding="utf-8"))
+    workflow["50"] = {"class_type": "LoadImage", "inputs": {"image": "placeholder.png"}}
+    (workflows / "img2img.json").write_text(json.dumps(workflow), encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture
+def make_comfy(comfy_dir):
+    """
+    Factory for Comfy clients rooted at comfy_dir; closes them after the test.
+    """
+    clients = []
+
+    def make(api_url, workflow="sdxlturbo_example.json", **kwargs):
+        client = Comfy(workflow, api_url=api_url, base_dir=str(comfy_dir), **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
@@ -1,24 +1,47 @@
+import os
 import time
 import streamlit as st
-from utils.comfy_api import Comfy
+from pathlib import Path
+from utils.comfy_api import Comfy, ComfyPool
 from utils.file_util import find_new_file_name
+from utils.image_cache import ImageCache
 from random import randint
 
 WORKFLOW = "sdxlturbo_example.json"
+# Comma-separated ComfyUI URLs, e.g. "http://gpu1:8188,http://gpu2:8188"
+COMFY_URLS = [url.strip() for url in os.getenv("COMFY_URLS", "").split(",") if url.strip()]
+# Same workflow, prompts, resolution and seed give the same image, so reuse it
+IMAGE_CACHE_DIR = Path(__file__).resolve().parent / "image_cache"
+IMAGE_CACHE_MB = int(os.getenv("IMAGE_CACHE_MB", "512"))
 
 @st.cache_resource
 def get_comfy_client(workflow: str):
-    client = Comfy(workflow)
+    cache = ImageCache(IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MB * 1024 * 1024)
+    if len(COMFY_URLS) > 1:
+        client = ComfyPool(workflow, COMFY_URLS, image_cache=cache)
+    elif COMFY_URLS:
+        client = Comfy(workflow, api_url=COMFY_URLS[0], image_cache=cache)
+    else:
+        client = Comfy(workflow, image_cache=cache)
     print("Connected to ComfyUI Client!")
     return client
 
-def generate_image(client, prompt, neg_prompt, width, height, seed):
+def generate_images(client, prompt, neg_prompt, width, height, seeds):
+    """
+    Queue one image per seed and yield (index, PNG bytes, cache hit) as they complete.
+
+    Images are kept in memory for display and download; only the image cache
+    writes them to disk, in the background.
+    """
+    batch = [
+        {"pos_prompt": prompt, "neg_prompt": neg_prompt, "width": width, "height": height, "seed": seed,
+         "in_memory": True, "persist": False}
+        for seed in seeds
+    ]
     try:
-        img = client.get_image(prompt, neg_prompt, width, height, seed)
-        return img
+        yield from client.get_images(batch)
     except Exception as e:
         st.error(f"Error generating image, check terminal output {e}")
-        return None
 
 st.title("ComfyUI API powered image generator")
 
@@ -31,11 +54,12 @@ with col2:
     height = st.number_input("Height (pixels)", min_value=64, max_value=4096, value=512, step=8)
 seed_input = st.number_input("Seed", min_value=0, max_value=999999999, value=0, step=1)
 randomize = st.checkbox("Use random seed instead", value=False)
+count = int(st.number_input("Number of images", min_value=1, max_value=8, value=1, step=1))
 
 if randomize:
-    seed = randint(1, 999999999)
+    seeds = [randint(1, 999999999) for _ in range(count)]
 else:
-    seed = int(seed_input) 
+    seeds = [int(seed_input) + i for i in range(count)]
 
 if st.button("Generate image"):
     start = time.perf_counter()
@@ -43,22 +67,28 @@ if st.button("Generate image"):
         st.warning("No prompt entered!")
         pass
     else:
-        print(f"Random seed set: {seed}")
+        print(f"Seeds set: {seeds}")
         client = get_comfy_client(WORKFLOW)
+        # One slot per image, filled in completion order
+        slots = [st.empty() for _ in seeds]
         with st.spinner("Image generating..."):
-            img = generate_image(client, prompt, neg_prompt, width, height, seed)
-            if img:
-                st.image(img)
-                end = time.perf_counter()
-                elapsed = end - start
-                st.write(f"Time for generation: {elapsed:.6f} seconds")
-                filename = find_new_file_name(f"{prompt[:14]}.png")
-                with open(img, "rb") as file:
-                    st.download_button(
-                        label="Download image",
-                        data=file,
-                        file_name=filename,
-                        mime="image/png",
-                    )
-            else:
-                st.error("Error generating image, check terminal output")
+            for index, img, cached in generate_images(client, prompt, neg_prompt, width, height, seeds):
+                with slots[index].container():
+                    if img:
+                        st.image(img, caption=f"Seed {seeds[index]}")
+                        end = time.perf_counter()
+                        elapsed = end - start
+                        if cached:
+                            st.write(f"Cache hit, loaded in {elapsed:.6f} seconds")
+                        else:
+                            st.write(f"Time for generation: {elapsed:.6f} seconds")
+                        filename = find_new_file_name(f"{prompt[:14]}.png")
+                        st.download_button(
+                            label="Download image",
+                            data=img,
+                            file_name=filename,
+                            mime="image/png",
+                            key=f"download_{index}",
+                        )
+                    else:
+                        st.error("Error generating image, check terminal output")
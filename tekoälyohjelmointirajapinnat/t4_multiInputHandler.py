@@ -1,10 +1,30 @@
 #!/usr/bin/env python3
 import argparse
+import glob
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from openai import OpenAI
 from markitdown import MarkItDown
 import pandas as pd
+import hashlib
+import itertools
+import random
+import re
 import sys
+import threading
 import time
+from utils import extractive
+from utils.near_dup import NearDuplicateIndex
+from utils.profiler import Profiler, format_report
+from utils.file_util import content_hash
+from utils.summary_cache import SummaryCache
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
 
 client = OpenAI()
 
@@ -37,35 +57,165 @@ def extract_text_from_response(resp):
         pass
     return ""
 
-def get_model_overrides(model_name):
+def get_model_overrides(model_name, stage=None):
     """
     Return kwargs to pass to client.responses.create depending on model.
     For gpt-5 variants we set lower reasoning effort and larger max_output_tokens by default.
+    stage is "map" (chunk summaries) or "reduce" (combine/synthesis); map
+    calls are many and simple, so they get the minimal reasoning effort.
     """
     overrides = {}
     if model_name and model_name.startswith("gpt-5"):
-        overrides["reasoning"] = {"effort": "low"}  # avoid huge reasoning token spend
+        # avoid huge reasoning token spend
+        overrides["reasoning"] = {"effort": "minimal" if stage == "map" else "low"}
         # give bigger budget to be safe
         overrides["max_output_tokens"] = 2000
     else:
         overrides["max_output_tokens"] = 600
     return overrides
 
+
+def request_options(model_name, stage=None):
+    """
+    Sampling options for a request: reasoning effort for gpt-5 variants,
+    low temperature for the others.
+    """
+    overrides = get_model_overrides(model_name, stage)
+    if "reasoning" in overrides:
+        return {"reasoning": overrides["reasoning"]}
+    return {"temperature": 0.2}
+
+
+REFUSAL_PATTERN = re.compile(r"^\W*(i'?m sorry|i am sorry|sorry,|i cannot|i can'?t|as an ai)", re.I)
+
+
+def is_acceptable_summary(summary, min_words=5):
+    """
+    Cheap quality check for a chunk summary: not empty, not a refusal and
+    at least min_words words long.
+    """
+    return bool(summary) and len(summary.split()) >= min_words and not REFUSAL_PATTERN.match(summary)
+
+def estimate_tokens(text):
+    """
+    Rough token count (about 4 characters per token), used without tiktoken.
+    Rounds up, so joined pieces never count more than the pieces did.
+    """
+    return max(1, -(-len(text or "") // 4))
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model=None):
+    """
+    Return the tiktoken encoding for a model, or None if tiktoken is missing.
+    """
+    if tiktoken is None:
+        return None
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except (KeyError, TypeError, ValueError):
+                _encoders[model] = tiktoken.get_encoding("o200k_base")
+        return _encoders[model]
+
+
+def count_tokens(text, model=None):
+    """
+    Count model tokens in text (exact with tiktoken, estimated otherwise).
+    """
+    encoder = get_encoder(model)
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text or "", disallowed_special=()))
+
+
+def is_rate_limit_error(e):
+    """
+    True if the exception is an HTTP 429 from the API.
+    """
+    return getattr(e, "status_code", None) == 429 or type(e).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(e):
+    """
+    Seconds the server asked us to wait, from the Retry-After header, or None.
+    """
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------- rate limiting ----------------
+class RateLimiter:
+    """
+    Token-bucket limiter for requests-per-minute and tokens-per-minute limits.
+    Both buckets refill continuously; acquire() blocks until a request fits.
+    A limit of None disables that bucket.
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm) if rpm else 0.0
+        self._tokens = float(tpm) if tpm else 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens=1):
+        if not self.rpm and not self.tpm:
+            return
+        # A single request can never need more than a full bucket
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60.0 / self.rpm)
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60.0 / self.tpm)
+                if wait == 0.0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
 # ---------------- I/O loader ----------------
+def is_url(source):
+    return source.startswith("http://") or source.startswith("https://")
+
+
 def load_source(source):
     """
-    Load text from URL/file. Uses MarkItDown for pdf/docx/html/txt and pandas for CSV.
+    Load text from URL/file with MarkItDown (pdf/docx/html/txt).
     Returns plain text (string) or None on failure.
+    CSV/XLSX tables are streamed through iter_table_chunks instead.
     """
     md = MarkItDown()
 
     try:
-        if source.startswith("http://") or source.startswith("https://"):
+        if is_url(source):
             doc = md.convert_url(source)
             text = getattr(doc, "text_content", str(doc))
-        elif source.endswith(".csv"):
-            df = pd.read_csv(source)
-            text = df.to_markdown(index=False)
         elif source.endswith((".pdf", ".docx", ".xlsx", ".txt")):
             doc = md.convert(source)
             text = getattr(doc, "text_content", str(doc))
@@ -82,157 +232,1334 @@ def load_source(source):
         return None
 
 
+# ---------------- streaming table loader ----------------
+TABLE_EXTENSIONS = (".csv", ".xlsx")
+
+
+def is_table(source):
+    return not is_url(source) and source.lower().endswith(TABLE_EXTENSIONS)
+
+
+def _md_cell(value):
+    if value is None or (isinstance(value, float) and value != value):  # None / NaN
+        return ""
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def _md_row(values):
+    return "| " + " | ".join(_md_cell(v) for v in values) + " |"
+
+
+def _iter_csv_rows(source, batch_rows):
+    """
+    Yield (table_name, header, row) from a CSV, reading batch_rows at a time.
+    An empty file is an empty table.
+    """
+    try:
+        batches = pd.read_csv(source, chunksize=batch_rows)
+    except pd.errors.EmptyDataError:
+        return
+    for df in batches:
+        header = list(df.columns)
+        for row in df.itertuples(index=False, name=None):
+            yield source, header, row
+
+
+def _iter_xlsx_rows(source):
+    """
+    Yield (table_name, header, row) from every sheet of a workbook, using
+    openpyxl's read-only mode so rows are streamed from the file.
+    """
+    import openpyxl
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            for row in rows:
+                if any(v is not None for v in row):
+                    yield f"{source} / sheet {sheet.title}", list(header), row
+    finally:
+        workbook.close()
+
+
+def iter_table_chunks(source, chunk_tokens=2000, model=None, batch_rows=1000):
+    """
+    Stream a CSV or XLSX file as markdown table chunks of at most about
+    chunk_tokens tokens. Each chunk repeats the table header, so it can be
+    summarized on its own. The whole table is never held in memory.
+    """
+    if source.lower().endswith(".csv"):
+        rows = _iter_csv_rows(source, batch_rows)
+    else:
+        rows = _iter_xlsx_rows(source)
+
+    current_table = None
+    lines = []
+    size = 0
+    head_size = 0
+    for table, header, row in rows:
+        if table != current_table:
+            if len(lines) > 2:
+                yield "\n".join(lines)
+            current_table = table
+            head = [f"Table: {table}", "", _md_row(header), _md_row(["---"] * len(header))]
+            head_size = count_tokens("\n".join(head), model)
+            lines, size = list(head), head_size
+        line = _md_row(row)
+        n = count_tokens(line, model)
+        if len(lines) > len(head) and size + n > chunk_tokens:
+            yield "\n".join(lines)
+            lines, size = list(head), head_size
+        lines.append(line)
+        size += n
+    if current_table is not None and len(lines) > len(head):
+        yield "\n".join(lines)
+
+
+def file_hash(path, block_size=1 << 20):
+    """
+    SHA-256 of a file, read in blocks.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
 # ---------------- chunking ----------------
-def chunk_text(text, chunk_size=3000, overlap=200):
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def _hard_split(text, max_tokens, model=None):
+    """
+    Split text that has no usable boundaries into pieces of max_tokens.
+    """
+    encoder = get_encoder(model)
+    if encoder is None:
+        step = max_tokens * 4
+        for start in range(0, len(text), step):
+            piece = text[start:start + step]
+            yield piece, estimate_tokens(piece)
+        return
+    tokens = encoder.encode(text, disallowed_special=())
+    for start in range(0, len(tokens), max_tokens):
+        piece = tokens[start:start + max_tokens]
+        yield encoder.decode(piece), len(piece)
+
+
+def _tail(text, max_tokens, model=None):
+    """
+    The last max_tokens worth of text.
+    """
+    encoder = get_encoder(model)
+    if encoder is None:
+        return text[-max_tokens * 4:]
+    return encoder.decode(encoder.encode(text, disallowed_special=())[-max_tokens:])
+
+
+def split_units(text, max_tokens, model=None):
+    """
+    Yield (unit, tokens, separator) pieces of text, none larger than
+    max_tokens. Paragraphs are preferred, then sentences, then hard splits.
+    separator is the string that joins the unit to the previous one.
+    """
+    for paragraph in PARAGRAPH_SPLIT.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        n = count_tokens(paragraph, model)
+        if n <= max_tokens:
+            yield paragraph, n, "\n\n"
+            continue
+        separator = "\n\n"
+        for sentence in SENTENCE_SPLIT.split(paragraph):
+            n = count_tokens(sentence, model)
+            if n <= max_tokens:
+                yield sentence, n, separator
+            else:
+                for piece, pn in _hard_split(sentence, max_tokens, model):
+                    yield piece, pn, separator
+                    separator = ""
+            separator = " "
+
+
+def _join_units(units):
+    return "".join((sep if i else "") + unit for i, (unit, _, sep) in enumerate(units)).strip()
+
+
+def _sep_tokens(sep, model=None):
+    return count_tokens(sep, model) if sep else 0
+
+
+def _carry_overlap(units, overlap_tokens, room, model=None):
+    """
+    Trailing text of a finished chunk (at most overlap_tokens, and at most
+    room) that is repeated at the start of the next chunk. Whole units are
+    carried first, then the trailing sentences of the unit before them, so
+    a long paragraph still leaves some overlap. If not even one sentence
+    fits, the last tokens of the unit are carried. Returns (units, tokens)
+    where tokens include the separators between the carried units.
+    """
+    limit = min(overlap_tokens, room)
+    carry = []
+    size = 0
+
+    def joined(n):
+        # The separator of the current first unit joins it to the new one
+        return n + (_sep_tokens(carry[0][2], model) if carry else 0)
+
+    def add(item):
+        nonlocal size
+        size += joined(item[1])
+        carry.insert(0, item)
+
+    for unit, n, sep in reversed(units):
+        if size + joined(n) <= limit:
+            add((unit, n, sep))
+            continue
+        for sentence in reversed(SENTENCE_SPLIT.split(unit)):
+            sn = count_tokens(sentence, model)
+            if size + joined(sn) > limit:
+                break
+            add((sentence, sn, " "))
+        if not carry and limit > 0:
+            tail = _tail(unit, limit, model)
+            add((tail, count_tokens(tail, model), ""))
+        break
+    return carry, size
+
+
+def is_content_boundary(unit, tokens, target_tokens):
+    """
+    Content-defined cut point: decided by a hash of the unit itself, with a
+    probability that gives chunks of about target_tokens on average.
+    """
+    digest = hashlib.blake2b(unit.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % 10000 < 10000 * tokens / target_tokens
+
+
+def chunk_text(text, chunk_tokens=2000, overlap_tokens=100, model=None, content_defined=False):
+    """
+    Generator yielding chunks of at most chunk_tokens model tokens.
+    Chunks are packed from whole paragraphs and sentences where possible,
+    and each chunk repeats up to overlap_tokens of trailing text from the
+    previous chunk for context.
+
+    With content_defined=True, chunks are also cut where the content says
+    so (see is_content_boundary) once they hold a quarter of the budget.
+    An edit then only moves the boundaries next to it, which keeps the
+    other chunks, and their cached summaries, unchanged.
+    """
     if not text:
-        return []
-    chunks = []
-    start = 0
-    text_len = len(text)
-    while start < text_len:
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    # Remove any empty-ish chunks
-    chunks = [c.strip() for c in chunks if c and len(c.strip()) > 10]
-    return chunks
+        return
+    min_tokens = chunk_tokens // 4
+    target_tokens = max(1, chunk_tokens // 2)
+    current = []  # (unit, tokens, separator)
+    size = 0
+    fresh = False  # current holds units not yet yielded
+    # Units leave room for the overlap, so even hard splits share some text
+    for unit, n, sep in split_units(text, max(1, chunk_tokens - overlap_tokens), model):
+        sep_n = _sep_tokens(sep, model)
+        if current and size + sep_n + n > chunk_tokens:
+            if fresh:
+                chunk = _join_units(current)
+                if len(chunk) > 10:
+                    yield chunk
+            current, size = _carry_overlap(current, overlap_tokens, chunk_tokens - n - sep_n, model)
+            fresh = False
+        current.append((unit, n, sep))
+        size += n + (sep_n if len(current) > 1 else 0)
+        fresh = True
+        if content_defined and size >= min_tokens and is_content_boundary(unit, n, target_tokens):
+            chunk = _join_units(current)
+            if len(chunk) > 10:
+                yield chunk
+            current, size = _carry_overlap(current, overlap_tokens, overlap_tokens, model)
+            fresh = False
+    if current and fresh:
+        chunk = _join_units(current)
+        if len(chunk) > 10:
+            yield chunk
 
 
 # ---------------- summarization helpers ----------------
-def summarize_chunk(chunk, model="gpt-4.1-nano", max_output_tokens=None):
-    if not chunk:
-        return ""
-    overrides = get_model_overrides(model)
-    if max_output_tokens is None:
-        max_output_tokens = overrides.get("max_output_tokens", 200)
-    prompt = (
-        "Summarize the following text in 3-5 concise sentences. "
-        "Focus on main points and ignore minor details. Use English language\n\n"
-        + chunk
-    )
-    try:
-        response = client.responses.create(
-            model=model,
-            input=prompt,
-            max_output_tokens=max_output_tokens,
-            **({} if model.startswith("gpt-5") else {"temperature": 0.2})
-        )
-        return extract_text_from_response(response).strip()
-    except Exception as e:
-        print(f"[ERROR] summarize_chunk failed: {e}", file=sys.stderr)
-        return ""
+# Bump when prompts change so cached summaries are not reused
+PROMPT_VERSION = "1"
 
+COMBINE_PROMPT = (
+    "Combine these chunk summaries into a single coherent summary (3-6 sentences). "
+    "Keep it concise and mention important points only. Use english language"
+)
+CHUNK_PROMPT = (
+    "Summarize the following text in 3-5 concise sentences. "
+    "Focus on main points and ignore minor details. Use English language\n\n"
+)
+SOURCE_COMBINE_PROMPT = (
+    "Combine these source summaries into a single concise summary. "
+    "Keep the source names, mention contradictions between sources. Use english language"
+)
 
-def summarize_source_text(text, model="gpt-4.1-nano", chunk_size=3000, overlap=200):
-    chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
-    if not chunks:
-        return ""
-    if len(chunks) == 1:
-        # Single chunk - summarize directly
-        return summarize_chunk(chunks[0], model=model, max_output_tokens=300)
-    # Summarize each chunk
-    chunk_summaries = []
-    for i, ch in enumerate(chunks, start=1):
-        s = summarize_chunk(ch, model=model, max_output_tokens=200)
-        if s:
-            chunk_summaries.append((i, s))
+class Summarizer:
+    """
+    Map/reduce summarizer. Chunks are summarized concurrently on a bounded
+    thread pool, every API call goes through a shared rate limiter and 429
+    responses are retried with exponential backoff. Chunk summaries are
+    combined in order by a tree reduction with a configurable fan-in.
+
+    With a SummaryCache, chunk summaries, merges and per-source summaries
+    are stored on disk. Chunking and reduce grouping then become
+    content-defined, so a small edit only re-summarizes the chunks around
+    it and the merges on their path to the root.
+
+    With a NearDuplicateIndex (dedup), near-duplicate chunks across all
+    sources share one summary instead of being summarized again.
+
+    With compress_ratio, each chunk is first shortened locally to its
+    highest-ranked sentences (utils.extractive) before it is sent.
+
+    With a Profiler, load and summarize times, chunk counts and every model
+    call (latency, tokens, retries, concurrency) are recorded.
+
+    Chunk summaries (map) use map_model, merges and the final synthesis
+    (reduce) use reduce_model; both default to model. With fallback_model,
+    chunks whose map summary is empty or fails is_acceptable_summary are
+    summarized again with that (stronger) model.
+    """
+
+    def __init__(self, model="gpt-4.1-nano", chunk_tokens=2000, overlap_tokens=100,
+                 concurrency=4, rpm=None, tpm=None, max_retries=5, fan_in=8, cache=None,
+                 dedup=None, compress_ratio=None, compress_method="textrank", profiler=None,
+                 map_model=None, reduce_model=None, fallback_model=None):
+        self.model = model
+        self.map_model = map_model or model
+        self.reduce_model = reduce_model or model
+        self.fallback_model = fallback_model
+        self.fallback_count = 0
+        self.profiler = profiler
+        self.compress_ratio = compress_ratio
+        self.compress_method = compress_method
+        self.compress_stats = [0, 0]  # tokens before, after
+        self.cache = cache
+        self.dedup = dedup
+        self.dedup_saved = 0
+        self._dedup_futures = {}  # key parts of chunks being summarized -> Future
+        self._dedup_summaries = {}  # key parts of summarized chunks -> summary (this run)
+        self._lock = threading.Lock()  # guards the counters above
+        self.content_defined = cache is not None
+        self.fan_in = max(2, fan_in)
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def call_model(self, prompt, max_output_tokens, model=None, kind="call"):
+        """
+        Send one prompt to the Responses API and return the text.
+        Waits for the rate limiter and retries 429s with backoff.
+        """
+        model = model or self.stage_model(kind)
+        options = request_options(model, "map" if kind == "chunk" else "reduce")
+        profiler = self.profiler
+        input_tokens = count_tokens(prompt, model)
+        api_seconds = 0.0
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            waited = time.perf_counter()
+            self.limiter.acquire(input_tokens + max_output_tokens)
+            started = time.perf_counter()
+            if profiler:
+                profiler.record_limiter_wait(started - waited)
+                profiler.call_started()
+            try:
+                response = client.responses.create(
+                    model=model,
+                    input=prompt,
+                    max_output_tokens=max_output_tokens,
+                    **options
+                )
+            except Exception as e:
+                api_seconds += time.perf_counter() - started
+                if profiler:
+                    profiler.call_ended()
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    if profiler:
+                        profiler.record_call(kind, model, api_seconds, input_tokens, 0, attempt, ok=False)
+                    raise
+                wait = retry_after_seconds(e) or delay * (1 + random.random())
+                print(f"[WARN] Rate limited, retrying in {wait:.1f}s ({attempt + 1}/{self.max_retries})", file=sys.stderr)
+                time.sleep(wait)
+                delay = min(delay * 2, 60.0)
+                continue
+
+            api_seconds += time.perf_counter() - started
+            text = extract_text_from_response(response).strip()
+            if profiler:
+                profiler.call_ended()
+                usage = getattr(response, "usage", None)
+                profiler.record_call(
+                    kind, model, api_seconds,
+                    getattr(usage, "input_tokens", None) or input_tokens,
+                    getattr(usage, "output_tokens", None) or count_tokens(text, model),
+                    attempt, ok=True,
+                )
+            return text
+
+    def stage_model(self, kind):
+        return self.map_model if kind == "chunk" else self.reduce_model
+
+    def cache_key(self, kind, max_output_tokens, key_parts, model=None):
+        return content_hash(kind, PROMPT_VERSION, model or self.stage_model(kind), max_output_tokens, *key_parts)
+
+    def cached_call(self, kind, key_parts, prompt, max_output_tokens, model=None):
+        """
+        call_model() through the summary cache. Keys include the model
+        actually used and PROMPT_VERSION; empty answers are not cached.
+        """
+        model = model or self.stage_model(kind)
+        if self.cache is None:
+            return self.call_model(prompt, max_output_tokens, model=model, kind=kind)
+        key = self.cache_key(kind, max_output_tokens, key_parts, model)
+        cached = self.cache.get(kind, key)
+        if cached is not None:
+            return cached
+        result = self.call_model(prompt, max_output_tokens, model=model, kind=kind)
+        if result:
+            self.cache.put(kind, key, result)
+        return result
+
+    def compress_key(self):
+        # Only added to cache keys when enabled, so uncompressed keys stay valid
+        if not self.compress_ratio:
+            return []
+        return [f"compress={self.compress_method}:{self.compress_ratio}"]
+
+    def chunk_key_parts(self, chunk):
+        return [content_hash(chunk)] + self.compress_key()
+
+    def chunk_request(self, chunk):
+        """
+        Cache key parts and prompt for summarizing chunk.
+        """
+        key_parts = self.chunk_key_parts(chunk)
+        if self.compress_ratio:
+            count = lambda t: count_tokens(t, self.map_model)
+            compressed = extractive.compress_text(chunk, self.compress_ratio, count, self.compress_method)
+            with self._lock:
+                self.compress_stats[0] += count(chunk)
+                self.compress_stats[1] += count(compressed)
+            chunk = compressed
+        return key_parts, CHUNK_PROMPT + chunk
+
+    def summarize_chunk(self, chunk, max_output_tokens=None):
+        if not chunk:
+            return ""
+        overrides = get_model_overrides(self.map_model, "map")
+        if max_output_tokens is None:
+            max_output_tokens = overrides.get("max_output_tokens", 200)
+        try:
+            key_parts, prompt = self.chunk_request(chunk)
+        except Exception as e:
+            print(f"[ERROR] summarize_chunk failed: {e}", file=sys.stderr)
+            return ""
+        try:
+            summary = self.cached_call("chunk", key_parts, prompt, max_output_tokens)
+        except Exception as e:
+            print(f"[ERROR] summarize_chunk failed: {e}", file=sys.stderr)
+            if not self.fallback_model:
+                return ""
+            summary = ""
+        if self.fallback_model and not is_acceptable_summary(summary):
+            try:
+                return self.fallback_chunk(key_parts, prompt, max_output_tokens)
+            except Exception as e:
+                print(f"[ERROR] fallback summarize_chunk failed: {e}", file=sys.stderr)
+        return summary
+
+    def fallback_chunk(self, key_parts, prompt, max_output_tokens):
+        """
+        Summarize a chunk again with fallback_model.
+        """
+        self.count_fallbacks(1)
+        return self.cached_call("chunk", key_parts, prompt, max_output_tokens, model=self.fallback_model)
+
+    def count_fallbacks(self, n):
+        with self._lock:
+            self.fallback_count += n
+
+    def cached_chunk(self, key_parts, max_output_tokens):
+        """
+        Cached summary of a chunk, or None. A map summary that fails the
+        quality check is replaced by the cached fallback summary, if any.
+        """
+        if self.cache is None:
+            return None
+        summary = self.cache.get("chunk", self.cache_key("chunk", max_output_tokens, key_parts))
+        if summary is None or not self.fallback_model or is_acceptable_summary(summary):
+            return summary
+        return self.cache.get("chunk", self.cache_key("chunk", max_output_tokens, key_parts, self.fallback_model))
+
+    def count_dedup_saved(self):
+        with self._lock:
+            self.dedup_saved += 1
+
+    def find_duplicate(self, key, chunk):
+        """
+        Key of an earlier near-duplicate of chunk, or None after indexing
+        chunk under key. Counts every hit as a saved call, so only index
+        chunks that would otherwise be sent.
+        """
+        original = self.dedup.find_or_add(key, chunk)
+        if original is not None:
+            self.count_dedup_saved()
+        return original
+
+    def _shared_summary(self, original, max_output_tokens):
+        """
+        Summary of the indexed chunk with key parts original: waits for it
+        while it is being summarized, afterwards reads it from this run's
+        summaries or the cache.
+        """
+        with self._lock:
+            pending = self._dedup_futures.get(original)
+            summary = self._dedup_summaries.get(original)
+        if pending is not None:
+            # The original is already running in a worker, waiting cannot deadlock
+            return pending.result()
+        if summary is not None:
+            return summary
+        return self.cached_chunk(list(original), max_output_tokens)
+
+    def summarize_unique_chunk(self, chunk, max_output_tokens=None):
+        """
+        summarize_chunk() that reuses the summary of an earlier
+        near-duplicate chunk, possibly from another source. Chunks are
+        indexed by their cache key parts. A duplicate of a chunk still being
+        summarized waits for its result, a duplicate of a finished one reuses
+        the summary kept for the rest of the run (or the cached one). Only
+        duplicates that would otherwise call the model count as saved.
+        """
+        if self.dedup is None:
+            return self.summarize_chunk(chunk, max_output_tokens)
+        key = tuple(self.chunk_key_parts(chunk))
+        cached = self.cached_chunk(list(key), max_output_tokens)
+        if cached is not None:
+            # Indexed so later near-duplicates can find it in the cache
+            self.dedup.find_or_add(key, chunk)
+            return cached
+        with self._lock:
+            pending = self._dedup_futures.get(key)
+            done = self._dedup_summaries.get(key)
+            if pending is None and done is None:
+                # Registered before indexing, so duplicates always find the future
+                future = self._dedup_futures[key] = Future()
+        if done is not None:
+            # The same chunk was summarized earlier in this run
+            self.count_dedup_saved()
+            return done
+        if pending is not None:
+            # The same chunk is being summarized right now
+            self.count_dedup_saved()
+            return pending.result()
+        summary = None
+        try:
+            original = self.dedup.find_or_add(key, chunk)
+            if original is not None and original != key:
+                summary = self._shared_summary(original, max_output_tokens)
+            if summary:
+                self.count_dedup_saved()
+            else:
+                summary = self.summarize_chunk(chunk, max_output_tokens)
+            future.set_result(summary)
+            return summary
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._dedup_futures[key]
+                if summary:
+                    # Summaries are small; kept so later duplicates need no cache
+                    self._dedup_summaries[key] = summary
+
+    def _cached_source(self, digest, summarize, name=None):
+        """
+        Per-source summary cache around summarize(); digest identifies the
+        source content.
+        """
+        started = time.perf_counter()
+        cached = None
+        if self.cache is not None:
+            key = self.source_key(digest)
+            cached = self.cache.get("source", key)
+        if cached is not None:
+            summary = cached
         else:
-            chunk_summaries.append((i, "[no summary returned]"))
-        # slight pause to avoid hammering rate limits (optional)
-        time.sleep(0.1)
-    # Combine chunk summaries
-    combine_prompt = (
-        "Combine these chunk summaries into a single coherent summary (3-6 sentences). "
-        "Keep it concise and mention important points only. Use english language\n\n"
-        + "\n\n".join(f"Chunk {i} summary:\n{cs}" for i, cs in chunk_summaries)
-    )
-    try:
-        overrides = get_model_overrides(model)
-        response = client.responses.create(
-            model=model,
-            input=combine_prompt,
+            summary = summarize()
+            if summary and self.cache is not None:
+                self.cache.put("source", key, summary)
+        if self.profiler and name is not None:
+            self.profiler.record_source(name, time.perf_counter() - started, cached is not None)
+        return summary
+
+    def _models_key(self):
+        # A single model keeps the key format of single-model runs
+        if self.map_model == self.reduce_model and not self.fallback_model:
+            return self.map_model
+        return f"map={self.map_model},reduce={self.reduce_model},fallback={self.fallback_model}"
+
+    def source_key(self, digest):
+        return content_hash(
+            "source", PROMPT_VERSION, self._models_key(), self.chunk_tokens,
+            self.overlap_tokens, self.fan_in, digest, *self.compress_key(),
+        )
+
+    def text_chunks(self, text):
+        return chunk_text(
+            text,
+            chunk_tokens=self.chunk_tokens,
+            overlap_tokens=self.overlap_tokens,
+            model=self.map_model,
+            content_defined=self.content_defined,
+        )
+
+    def _counted(self, name, chunks):
+        if self.profiler is None or name is None:
+            return chunks
+        return self.profiler.count_chunks(name, chunks)
+
+    def summarize_source_text(self, text, name=None):
+        return self._cached_source(
+            content_hash(text),
+            lambda: self.summarize_chunks(self._counted(name, self.text_chunks(text))),
+            name,
+        )
+
+    def summarize_table(self, source):
+        """
+        Summarize a CSV/XLSX file streamed in token-sized markdown chunks.
+        """
+        print(f"[INFO] Streaming table: {source}")
+        return self._cached_source(
+            file_hash(source),
+            lambda: self.summarize_chunks(self._counted(
+                source, iter_table_chunks(source, chunk_tokens=self.chunk_tokens, model=self.map_model)
+            )),
+            source,
+        )
+
+    def map_ordered(self, fn, items):
+        """
+        Like executor.map, but keeps at most 2 * concurrency items in flight,
+        so a long chunk generator is consumed as results come back instead
+        of all at once.
+        """
+        window = deque()
+        for item in items:
+            window.append(self.executor.submit(fn, item))
+            if len(window) >= 2 * self.concurrency:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+    def summarize_chunks(self, chunks):
+        first = next(chunks, None)
+        if first is None:
+            return ""
+        second = next(chunks, None)
+        if second is None:
+            # Single chunk - summarize directly (short sources are deduplicated too)
+            return self.summarize_unique_chunk(first, max_output_tokens=300)
+        chunks = itertools.chain([first, second], chunks)
+        # Summarize chunks concurrently; results come back in chunk order
+        summaries = self.map_ordered(
+            lambda ch: self.summarize_unique_chunk(ch, max_output_tokens=200), chunks
+        )
+        return self.combine_chunk_summaries(summaries)
+
+    def combine_chunk_summaries(self, summaries):
+        """
+        Reduce ordered chunk summaries of one source into a single summary.
+        """
+        chunk_summaries = [
+            f"{self._label('Chunk', i)} summary:\n{s if s else '[no summary returned]'}"
+            for i, s in enumerate(summaries, start=1)
+        ]
+        # Combine chunk summaries
+        overrides = get_model_overrides(self.reduce_model, "reduce")
+        return self.reduce_summaries(
+            chunk_summaries,
+            COMBINE_PROMPT,
             max_output_tokens=overrides.get("max_output_tokens", 400),
-            **({} if model.startswith("gpt-5") else {"temperature": 0.2})
         )
-        return extract_text_from_response(response).strip()
-    except Exception as e:
-        print(f"[ERROR] summarize_source_text combine failed: {e}", file=sys.stderr)
-        return "\n".join(s for _, s in chunk_summaries)
 
+    def _merge(self, parts, instruction, max_output_tokens, force=False):
+        """
+        Merge one group of summaries with a single API call. A group of one
+        is passed through unless force is set.
+        """
+        if len(parts) == 1 and not force:
+            return parts[0]
+        prompt = instruction + "\n\n" + "\n\n".join(parts)
+        try:
+            return self.cached_call(
+                "merge", [instruction] + [content_hash(p) for p in parts], prompt, max_output_tokens
+            )
+        except Exception as e:
+            print(f"[ERROR] merge of {len(parts)} summaries failed: {e}", file=sys.stderr)
+            return "\n".join(parts)
 
-def synthesize_summaries(summaries_with_sources, user_query=None, model="gpt-4.1-nano"):
-    if user_query is None:
-        user_query = "Produce a single concise summary of the documents below. Mention contradictions and list sources with a one-line note. Use english language."
-    prompt_parts = [f"Source: {name}\nSummary: {summary}" for name, summary in summaries_with_sources]
-    big_prompt = user_query + "\n\n" + "\n\n".join(prompt_parts)
-    try:
-        overrides = get_model_overrides(model)
-        response = client.responses.create(
-            model=model,
-            input=big_prompt,
+    def _label(self, name, i):
+        # Positions shift on every insert, so content-defined runs leave them out
+        return name if self.content_defined else f"{name} {i}"
+
+    def _group(self, parts):
+        """
+        Split one reduce level into groups of at most fan_in parts. Groups
+        are positional, or content-defined when caching so that unchanged
+        runs of parts form the same groups (and cache keys) again.
+        """
+        if not self.content_defined:
+            return [parts[i:i + self.fan_in] for i in range(0, len(parts), self.fan_in)]
+        groups = []
+        current = []
+        for part in parts:
+            current.append(part)
+            # Cut on about every fan_in/2-th part, decided by the part's content
+            boundary = int(content_hash(part)[:8], 16) % self.fan_in < 2
+            if len(current) >= self.fan_in or (len(current) >= 2 and boundary):
+                groups.append(current)
+                current = []
+        if current:
+            groups.append(current)
+        return groups
+
+    def reduce_summaries(self, parts, instruction, final_instruction=None, max_output_tokens=400):
+        """
+        Tree reduction: merge parts in groups of fan_in until at most fan_in
+        remain, then merge those with final_instruction. Merges of one level
+        run in parallel, so depth is O(log n) in the number of parts.
+        """
+        level = list(parts)
+        depth = 0
+        while len(level) > self.fan_in:
+            depth += 1
+            groups = self._group(level)
+            print(f"[INFO] Reduce level {depth}: {len(level)} summaries -> {len(groups)}")
+            merged = self.executor.map(
+                lambda group: self._merge(group, instruction, max_output_tokens), groups
+            )
+            level = [f"{self._label('Combined summary', i)}:\n{m}" for i, m in enumerate(merged, start=1)]
+        return self._merge(
+            level,
+            final_instruction or instruction,
+            max_output_tokens,
+            force=final_instruction is not None,
+        )
+
+    def synthesize_summaries(self, summaries_with_sources, user_query=None):
+        if user_query is None:
+            user_query = "Produce a single concise summary of the documents below. Mention contradictions and list sources with a one-line note. Use english language."
+        prompt_parts = [f"Source: {name}\nSummary: {summary}" for name, summary in summaries_with_sources]
+        overrides = get_model_overrides(self.reduce_model, "reduce")
+        return self.reduce_summaries(
+            prompt_parts,
+            SOURCE_COMBINE_PROMPT,
+            final_instruction=user_query,
             max_output_tokens=overrides.get("max_output_tokens", 600),
-            **({} if model.startswith("gpt-5") else {"temperature": 0.2})
         )
-        return extract_text_from_response(response).strip()
-    except Exception as e:
-        print(f"[ERROR] synthesize_summaries failed: {e}", file=sys.stderr)
-        # fallback: return concatenated per-source summaries
-        return "\n\n".join(f"{name}:\n{summary}" for name, summary in summaries_with_sources)
 
 
 # ---------------- orchestration ----------------
-def process_sources(sources, model="gpt-4.1-nano"):
-    loaded = []
-    for s in sources:
-        text = load_source(s)
-        if text:
-            loaded.append((s, text))
-    if not loaded:
-        print("[ERROR] No valid sources loaded. Exiting.", file=sys.stderr)
-        return []
-    results = []
-    for name, text in loaded:
-        print(f"[INFO] Summarizing source: {name}")
-        summary = summarize_source_text(text, model=model)
-        results.append((name, summary))
-    return results
+def timed_load(source):
+    """
+    load_source() that also returns the load time in seconds.
+    """
+    started = time.perf_counter()
+    text = load_source(source)
+    return text, time.perf_counter() - started
 
 
-# ---------------- CLI ----------------
-def main():
-    parser = argparse.ArgumentParser(prog="assignment4", description="Multi-source summarizer")
-    parser.add_argument("sources", nargs="+", help="Files or URLs to summarize")
-    parser.add_argument("-q", "--query", default=None, help="Custom query (default: summarize)")
-    parser.add_argument("-m", "--model", default="gpt-4.1-nano", help="Model to use (e.g. gpt-4.1-nano, gpt-5-nano)")
-    parser.add_argument("-o", "--output", default=None, help="File to save final output")
-    parser.add_argument("--chunk-size", type=int, default=3000, help="Chunk size in characters")
-    parser.add_argument("--overlap", type=int, default=200, help="Chunk overlap in characters")
-    args = parser.parse_args()
+def iter_loaded_sources(sources, load_workers=None, profiler=None):
+    """
+    Load sources in parallel and yield (index, text) as each one is ready.
+    Documents are converted on a process pool (CPU-bound), URLs are fetched
+    on a thread pool (I/O-bound). Tables are streamed later by the
+    summarizer, so they are yielded right away with text None.
+    """
+    with ProcessPoolExecutor(max_workers=load_workers) as doc_pool, \
+            ThreadPoolExecutor(max_workers=load_workers or 8) as url_pool:
+        loading = {}
+        tables = []
+        for i, s in enumerate(sources):
+            if is_table(s):
+                tables.append(i)
+                continue
+            pool = url_pool if is_url(s) else doc_pool
+            loading[pool.submit(timed_load, s)] = i
+
+        for i in tables:
+            yield i, None
+
+        for future in as_completed(loading):
+            i = loading[future]
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                print(f"[ERROR] Failed to load {sources[i]}: {e}", file=sys.stderr)
+                continue
+            if profiler:
+                profiler.record_load(sources[i], seconds, len(text or ""))
+            if text:
+                yield i, text
+
+
+def process_sources(sources, summarizer, load_workers=None):
+    """
+    Summarize each source as soon as it has loaded, so summarization
+    overlaps with loading the rest. Results keep the order of sources.
+    """
+    summaries = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(sources))) as source_pool:
+        for i, text in iter_loaded_sources(sources, load_workers, summarizer.profiler):
+            if text is None:
+                # Tables are streamed straight into the chunk summarizer
+                summaries[i] = source_pool.submit(summarizer.summarize_table, sources[i])
+            else:
+                print(f"[INFO] Summarizing source: {sources[i]}")
+                summaries[i] = source_pool.submit(summarizer.summarize_source_text, text, sources[i])
+
+        if not summaries:
+            print("[ERROR] No valid sources loaded. Exiting.", file=sys.stderr)
+            return []
+        results = []
+        for i in sorted(summaries):
+            try:
+                summary = summaries[i].result()
+            except Exception as e:
+                print(f"[ERROR] Failed to summarize {sources[i]}: {e}", file=sys.stderr)
+                continue
+            if summary:
+                results.append((sources[i], summary))
+        return results
+
+
+# ---------------- offline batch mode ----------------
+BATCH_DONE = ("completed", "failed", "expired", "cancelled")
+
+
+def extract_text_from_body(body):
+    """
+    Text of a raw Responses API JSON body (as found in batch output files).
+    """
+    if body.get("output_text"):
+        return body["output_text"]
+    texts = []
+    for item in body.get("output") or []:
+        for content in item.get("content") or []:
+            if content.get("type") == "output_text" and content.get("text"):
+                texts.append(content["text"])
+    return "".join(texts)
+
+
+def _batch_request(custom_id, prompt, model, max_output_tokens):
+    body = {"model": model, "input": prompt, "max_output_tokens": max_output_tokens}
+    body.update(request_options(model, "map"))
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/responses", "body": body}
+
+
+def _save_state(state, state_path):
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, state_path)
+
+
+def submit_batch(sources, summarizer, state_path, load_workers=None):
+    """
+    Write every chunk request into a JSONL batch-job file, upload it and
+    create a Batch API job. Chunks already in the summary cache are not
+    sent. Like summarize_chunks(), a source of a single chunk is
+    summarized with a larger output budget and not reduced afterwards.
+    Progress is kept in state_path so the job can be resumed.
+    """
+    requests_path = os.path.splitext(state_path)[0] + "_requests.jsonl"
+    state = {
+        "model": summarizer.map_model,
+        "requests_path": requests_path,
+        "batch_id": None,
+        "sources": [],
+    }
+    pending = 0
+    with open(requests_path, "w", encoding="utf-8") as f:
+        for i, text in iter_loaded_sources(sources, load_workers, summarizer.profiler):
+            name = sources[i]
+            if text is None:
+                chunks = iter_table_chunks(name, chunk_tokens=summarizer.chunk_tokens, model=summarizer.map_model)
+                digest = file_hash(name)
+            else:
+                chunks = summarizer.text_chunks(text)
+                digest = content_hash(text)
+            entry = {"index": i, "name": name, "digest": digest, "chunks": []}
+            if summarizer.cache is not None:
+                cached = summarizer.cache.get("source", summarizer.source_key(digest))
+                if cached is not None:
+                    entry["summary"] = cached
+                    state["sources"].append(entry)
+                    continue
+            head = list(itertools.islice(chunks, 2))
+            entry["single"] = len(head) == 1
+            max_output_tokens = 300 if entry["single"] else 200
+            for j, chunk in enumerate(itertools.chain(head, chunks)):
+                key_parts = summarizer.chunk_key_parts(chunk)
+                item = {
+                    "id": f"s{i}-c{j}",
+                    "key_parts": key_parts,
+                    "max_tokens": max_output_tokens,
+                    "summary": summarizer.cached_chunk(key_parts, max_output_tokens),
+                }
+                if item["summary"] is None and summarizer.dedup is not None and not entry["single"]:
+                    # Only pending chunks are indexed, so duplicates share a request
+                    original = summarizer.find_duplicate(item["id"], chunk)
+                    if original is not None:
+                        item["id"] = original
+                        entry["chunks"].append(item)
+                        continue
+                if item["summary"] is None:
+                    _, prompt = summarizer.chunk_request(chunk)
+                    request = _batch_request(item["id"], prompt, summarizer.map_model, max_output_tokens)
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+                    pending += 1
+                entry["chunks"].append(item)
+            state["sources"].append(entry)
+    state["sources"].sort(key=lambda e: e["index"])
+
+    if pending:
+        with open(requests_path, "rb") as f:
+            batch_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        state["batch_id"] = batch.id
+        print(f"[INFO] Submitted batch {batch.id} with {pending} chunk requests")
+    else:
+        print("[INFO] All chunks cached, nothing to submit")
+    _save_state(state, state_path)
+    return state
 
-    summaries = process_sources(args.sources, model=args.model)
 
-    if not summaries:
-        print("[ERROR] No summaries produced.", file=sys.stderr)
-        sys.exit(1)
+def wait_for_batch(batch_id, poll_interval=30):
+    """
+    Poll the Batch API until the job reaches a final status.
+    """
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        done = getattr(counts, "completed", "?")
+        total = getattr(counts, "total", "?")
+        print(f"[INFO] Batch {batch_id}: {batch.status} ({done}/{total})")
+        if batch.status in BATCH_DONE:
+            return batch
+        time.sleep(poll_interval)
+
+
+def _read_requests(requests_path, ids):
+    """
+    Request bodies for the given custom ids, read back from the batch file.
+    """
+    found = {}
+    with open(requests_path, encoding="utf-8") as f:
+        for line in f:
+            request = json.loads(line)
+            if request["custom_id"] in ids:
+                found[request["custom_id"]] = request["body"]
+    return found
+
+
+def finish_batch(state, summarizer, poll_interval=30):
+    """
+    Wait for the batch, collect chunk summaries and resume the reduce
+    steps. Failed requests, and with a fallback model also summaries that
+    fail the quality check, are re-run synchronously. Returns
+    (source, summary) pairs in source order.
+
+    Raises ValueError if state was submitted with another map model than
+    summarizer's, since its results would be cached under the wrong model.
+    """
+    if state.get("model") != summarizer.map_model:
+        raise ValueError(
+            f"batch was submitted with map model {state.get('model')}, not {summarizer.map_model}; "
+            f"resume with --map-model {state.get('model')}"
+        )
+    results = {}
+    if state.get("batch_id"):
+        batch = wait_for_batch(state["batch_id"], poll_interval)
+        if getattr(batch, "output_file_id", None):
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[item["custom_id"]] = extract_text_from_body(response.get("body") or {}).strip()
+
+    rerun = {
+        c["id"] for e in state["sources"] for c in e["chunks"]
+        if c["summary"] is None and (
+            not results.get(c["id"])
+            or (summarizer.fallback_model and not is_acceptable_summary(results[c["id"]]))
+        )
+    }
+    rerun_model = summarizer.fallback_model or summarizer.map_model
 
-    final_output = ""
+    def rerun_chunk(body):
+        try:
+            return summarizer.call_model(body["input"], body["max_output_tokens"], model=rerun_model, kind="chunk")
+        except Exception as e:
+            print(f"[ERROR] re-running batch request failed: {e}", file=sys.stderr)
+            return None
+
+    reruns = {}
+    if rerun:
+        print(f"[WARN] {len(rerun)} batch results missing or rejected, re-running them with {rerun_model}", file=sys.stderr)
+        if summarizer.fallback_model:
+            summarizer.count_fallbacks(len(rerun))
+        bodies = _read_requests(state["requests_path"], rerun)
+        for custom_id, text in zip(bodies, summarizer.map_ordered(rerun_chunk, bodies.values())):
+            reruns[custom_id] = text
+
+    summaries = []
+    for entry in state["sources"]:
+        if "summary" in entry:
+            summaries.append((entry["name"], entry["summary"]))
+            continue
+        chunk_summaries = []
+        for c in entry["chunks"]:
+            if c["summary"] is not None:
+                chunk_summaries.append(c["summary"])
+                continue
+            batch_summary = results.get(c["id"], "")
+            summary = reruns.get(c["id"]) or batch_summary
+            if summarizer.cache is not None:
+                # Each summary is cached under the model that produced it
+                if batch_summary:
+                    summarizer.cache.put("chunk", summarizer.cache_key("chunk", c["max_tokens"], c["key_parts"]), batch_summary)
+                if reruns.get(c["id"]):
+                    summarizer.cache.put(
+                        "chunk", summarizer.cache_key("chunk", c["max_tokens"], c["key_parts"], rerun_model), reruns[c["id"]]
+                    )
+            chunk_summaries.append(summary)
+        if not chunk_summaries:
+            continue
+        if entry.get("single"):
+            summary = chunk_summaries[0]
+        else:
+            print(f"[INFO] Reducing source: {entry['name']}")
+            summary = summarizer.combine_chunk_summaries(chunk_summaries)
+        if summary and summarizer.cache is not None:
+            summarizer.cache.put("source", summarizer.source_key(entry["digest"]), summary)
+        if summary:
+            summaries.append((entry["name"], summary))
+    return summaries
+
+
+def build_final_output(summaries, summarizer, query=None):
     if len(summaries) == 1:
         # Only one source — use its summary (and optionally refine with user query)
         source_name, src_summary = summaries[0]
-        if args.query:
-            final_output = synthesize_summaries([(source_name, src_summary)], user_query=args.query, model=args.model)
+        if query:
+            return summarizer.synthesize_summaries([(source_name, src_summary)], user_query=query)
+        return f"Source: {source_name}\n\nSummary:\n{src_summary}"
+    return summarizer.synthesize_summaries(summaries, user_query=query)
+
+
+# ---------------- directory input and watch mode ----------------
+SOURCE_EXTENSIONS = (".pdf", ".docx", ".xlsx", ".csv", ".txt")
+
+
+def _is_source_file(path):
+    name = os.path.basename(path)
+    # Skip hidden files and Office lock files (~$report.docx)
+    return not name.startswith((".", "~$")) and name.lower().endswith(SOURCE_EXTENSIONS)
+
+
+def expand_sources(sources):
+    """
+    Expand directories (recursively) and glob patterns (** allowed) into
+    the supported files they contain. URLs and plain paths are kept as
+    given. Order is kept and duplicates are dropped.
+    """
+    expanded = []
+    for source in sources:
+        if is_url(source):
+            expanded.append(source)
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                expanded.extend(os.path.join(root, f) for f in sorted(files) if _is_source_file(f))
+        elif any(c in source for c in "*?["):
+            expanded.extend(
+                m for m in sorted(glob.glob(source, recursive=True))
+                if os.path.isfile(m) and _is_source_file(m)
+            )
         else:
-            final_output = f"Source: {source_name}\n\nSummary:\n{src_summary}"
-    else:
-        final_output = synthesize_summaries(summaries, user_query=args.query, model=args.model)
+            expanded.append(source)
+    return list(dict.fromkeys(expanded))
+
 
-    if args.output:
-        with open(args.output, "w", encoding="utf-8") as f:
+def load_manifest(path, config):
+    """
+    Manifest of summarized sources: {path: {hash, mtime_ns, size, summary}}.
+    Entries written with other settings (config) are discarded.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("config") != config:
+        print("[INFO] Summarizer settings changed, ignoring old manifest")
+        return {}
+    return manifest.get("sources", {})
+
+
+def save_manifest(path, config, sources):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "sources": sources}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def scan_sources(paths, manifest):
+    """
+    Compare paths against the manifest. Returns (changed, removed): new or
+    modified sources, and manifest entries no longer among paths. Files
+    are only hashed when their size or mtime changed; URLs are summarized
+    once. Sources without a summary (the last attempt failed) count as
+    changed until one succeeds. Changed entries get a new hash and an empty
+    summary.
+    """
+    changed = []
+    for path in paths:
+        entry = manifest.get(path)
+        if entry is not None and entry["summary"] is None:
+            entry = None  # retry
+        if is_url(path):
+            if entry is None:
+                manifest[path] = {"hash": None, "mtime_ns": None, "size": None, "summary": None}
+                changed.append(path)
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            continue
+        digest = file_hash(path)
+        if entry and entry["hash"] == digest:
+            entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            continue
+        manifest[path] = {"hash": digest, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "summary": None}
+        changed.append(path)
+    current = set(paths)
+    removed = [p for p in manifest if p not in current]
+    return changed, removed
+
+
+def watch(patterns, summarizer, manifest_path, query=None, output=None, interval=10.0, load_workers=None,
+          max_scans=None):
+    """
+    Poll the given files, directories and globs every interval seconds.
+    New or changed files are summarized, per-source summaries are kept in
+    the manifest, and the final output is re-synthesized from all current
+    summaries whenever something changed. Runs until Ctrl+C, or for
+    max_scans scans if given.
+    """
+    config = summarizer.source_key("manifest")
+    manifest = load_manifest(manifest_path, config)
+    first = True
+    scans = 0
+    try:
+        while True:
+            paths = expand_sources(patterns)
+            changed, removed = scan_sources(paths, manifest)
+            for path in removed:
+                print(f"[INFO] Source removed: {path}")
+                del manifest[path]
+            if changed:
+                print(f"[INFO] {len(changed)} new or changed sources")
+                summaries = dict(process_sources(changed, summarizer, load_workers=load_workers))
+                for path in changed:
+                    manifest[path]["summary"] = summaries.get(path)
+            if changed or removed or first:
+                save_manifest(manifest_path, config, manifest)
+                current = [(p, manifest[p]["summary"]) for p in paths if p in manifest and manifest[p]["summary"]]
+                if current:
+                    write_output(build_final_output(current, summarizer, query=query), output)
+                else:
+                    print("[WARN] No summaries yet", file=sys.stderr)
+            first = False
+            scans += 1
+            if max_scans is not None and scans >= max_scans:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("[INFO] Watch stopped")
+
+
+def write_output(final_output, output=None):
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
             f.write(final_output)
-        print(f"[INFO] Final output saved to {args.output}")
+        print(f"[INFO] Final output saved to {output}")
     else:
         print("\n--- Final Output ---\n")
         print(final_output)
 
+
+# ---------------- CLI ----------------
+def main():
+    parser = argparse.ArgumentParser(prog="assignment4", description="Multi-source summarizer")
+    parser.add_argument("sources", nargs="*", help="Files, directories, glob patterns or URLs to summarize")
+    parser.add_argument("-q", "--query", default=None, help="Custom query (default: summarize)")
+    parser.add_argument("-m", "--model", default="gpt-4.1-nano", help="Model to use (e.g. gpt-4.1-nano, gpt-5-nano)")
+    parser.add_argument("-o", "--output", default=None, help="File to save final output")
+    parser.add_argument("--map-model", default=None, help="Model for chunk summaries (default: --model)")
+    parser.add_argument("--reduce-model", default=None, help="Model for combining summaries and the final synthesis (default: --model)")
+    parser.add_argument("--fallback-model", default=None,
+                        help="Stronger model used for chunks whose map summary is empty or fails the quality check")
+    parser.add_argument("--chunk-tokens", type=int, default=2000, help="Chunk size in model tokens")
+    parser.add_argument("--overlap-tokens", type=int, default=100, help="Chunk overlap in model tokens")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent API calls")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute limit")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute limit")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries for rate-limited (429) calls")
+    parser.add_argument("--fan-in", type=int, default=8, help="Summaries merged per reduce call")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the persistent summary cache (enables caching)")
+    parser.add_argument("--dedup", action="store_true", help="Share one summary between near-duplicate chunks of all sources")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8, help="Estimated Jaccard similarity for near-duplicate chunks")
+    parser.add_argument("--compress", type=float, default=None, metavar="RATIO",
+                        help="Extractively shorten chunks to RATIO of their tokens before summarizing (needs numpy)")
+    parser.add_argument("--compress-method", choices=extractive.METHODS, default="textrank", help="Sentence ranking for --compress")
+    parser.add_argument("--profile", nargs="?", const="summarizer_profile.json", default=None, metavar="PATH",
+                        help="Write a JSON throughput report (default path: summarizer_profile.json) and print a summary")
+    parser.add_argument("--batch", action="store_true", help="Summarize chunks through the OpenAI Batch API (offline, cheaper)")
+    parser.add_argument("--batch-state", default="summarizer_batch.json", help="Batch job state file")
+    parser.add_argument("--batch-resume", action="store_true", help="Resume the batch job in --batch-state instead of submitting")
+    parser.add_argument("--batch-poll", type=float, default=30, help="Seconds between batch status polls")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the sources and re-summarize new or changed files")
+    parser.add_argument("--watch-interval", type=float, default=10, help="Seconds between --watch scans")
+    parser.add_argument("--manifest", default="summarizer_manifest.json", help="File hashes and summaries kept by --watch")
+    parser.add_argument("--load-workers", type=int, default=None, help="Parallel document/URL loaders (default: CPU count)")
+    args = parser.parse_args()
+    if not args.sources and not args.batch_resume:
+        parser.error("at least one source is required")
+    if args.watch and (args.batch or args.batch_resume):
+        parser.error("--watch cannot be combined with --batch")
+    if not args.watch:
+        args.sources = expand_sources(args.sources)
+        if not args.sources and not args.batch_resume:
+            parser.error("no supported files found in the given sources")
+    if args.compress is not None:
+        if not 0 < args.compress <= 1:
+            parser.error("--compress must be between 0 and 1")
+        if extractive.np is None:
+            parser.error("--compress requires numpy (pip install numpy)")
+
+    summarizer = Summarizer(
+        model=args.model,
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        max_retries=args.max_retries,
+        fan_in=args.fan_in,
+        cache=SummaryCache(args.cache_dir) if args.cache_dir else None,
+        dedup=NearDuplicateIndex(threshold=args.dedup_threshold) if args.dedup else None,
+        compress_ratio=args.compress,
+        compress_method=args.compress_method,
+        profiler=Profiler(args.concurrency) if args.profile else None,
+        map_model=args.map_model,
+        reduce_model=args.reduce_model,
+        fallback_model=args.fallback_model,
+    )
+    final_output = None
+    try:
+        if args.watch:
+            watch(
+                args.sources,
+                summarizer,
+                args.manifest,
+                query=args.query,
+                output=args.output,
+                interval=args.watch_interval,
+                load_workers=args.load_workers,
+            )
+        elif args.batch_resume:
+            with open(args.batch_state, encoding="utf-8") as f:
+                state = json.load(f)
+            try:
+                summaries = finish_batch(state, summarizer, poll_interval=args.batch_poll)
+            except ValueError as e:
+                print(f"[ERROR] Cannot resume: {e}", file=sys.stderr)
+                sys.exit(1)
+        elif args.batch:
+            state = submit_batch(args.sources, summarizer, args.batch_state, load_workers=args.load_workers)
+            summaries = finish_batch(state, summarizer, poll_interval=args.batch_poll)
+        else:
+            summaries = process_sources(args.sources, summarizer, load_workers=args.load_workers)
+
+        if not args.watch:
+            if not summaries:
+                print("[ERROR] No summaries produced.", file=sys.stderr)
+                sys.exit(1)
+            final_output = build_final_output(summaries, summarizer, query=args.query)
+        if summarizer.cache is not None:
+            stats = summarizer.cache.stats()
+            print(f"[INFO] Summary cache: {stats['hits']} hits, {stats['misses']} misses")
+        if summarizer.dedup is not None:
+            print(f"[INFO] Near-duplicate chunks: {summarizer.dedup_saved} summaries reused "
+                  f"({summarizer.dedup_saved} calls saved)")
+        if summarizer.compress_ratio:
+            before, after = summarizer.compress_stats
+            print(f"[INFO] Extractive compression: {before} -> {after} chunk tokens")
+        if summarizer.fallback_model:
+            print(f"[INFO] Fallback model {summarizer.fallback_model} used for {summarizer.fallback_count} chunks")
+    finally:
+        summarizer.close()
+
+    if final_output is not None:
+        write_output(final_output, args.output)
+
+    if summarizer.profiler:
+        report = summarizer.profiler.write(args.profile, settings={
+            "model": args.model,
+            "map_model": summarizer.map_model,
+            "reduce_model": summarizer.reduce_model,
+            "fallback_model": summarizer.fallback_model,
+            "sources": len(args.sources),
+            "chunk_tokens": args.chunk_tokens,
+            "overlap_tokens": args.overlap_tokens,
+            "concurrency": args.concurrency,
+            "fan_in": args.fan_in,
+            "rpm": args.rpm,
+            "tpm": args.tpm,
+        })
+        print("\n--- Profile ---\n")
+        print(format_report(report))
+        print(f"\n[INFO] Profile saved to {args.profile}")
+
 if __name__ == "__main__":
     main()
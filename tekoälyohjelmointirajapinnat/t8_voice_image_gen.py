@@ -56,6 +56,7 @@ def main():
     listener.start() # Activate keyboard listener
     print("Press shift to record audio for image prompt, ctrl+c to quit:")
 
+    generating = {}  # Generations in progress: future -> prompt
     try:
         while True:
 
@@ -65,14 +66,24 @@ def main():
                 # If a prompt is found in the transcription queue, send to comfy_client
                 if isinstance(prompt, str) and prompt.strip():
                     print(f"Prompt: {prompt}")
-                    comfy_client.get_image(prompt, "lowres, low quality")
+                    # Queue without blocking, so the next recording can be queued meanwhile
+                    generating[comfy_client.submit(prompt, "lowres, low quality")] = prompt
                 else:
                     print("Generating prompt failed, please try again: ")
                 print("Press shift to record audio for image prompt, ctrl+c to quit:")
 
+            # Report finished generations
+            for future in [f for f in generating if f.done()]:
+                prompt = generating.pop(future)
+                try:
+                    print(f"Image ready for '{prompt}': {future.result()}")
+                except Exception as e:
+                    print(f"Generating image for '{prompt}' failed: {e}")
+
             time.sleep(0.01)
     except KeyboardInterrupt:
         print("\nExiting...")
+        comfy_client.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,159 @@
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from utils.image_cache import ImageCache
+
+
+def queue(client, seed=1):
+    client.start_listener()
+    response = client.queue_prompt(client.build_payload("a cat", "", 64, 64, seed))
+    return response["prompt_id"]
+
+
+def test_wait_for_result_uses_ws_completion(comfy_server, make_comfy):
+    _, api_url = comfy_server
+    client = make_comfy(api_url)
+    prompt_id = queue(client)
+
+    outputs = client.wait_for_result(prompt_id, timeout=5)
+
+    assert outputs
+    assert client._listener.connected.is_set()
+
+
+def test_wait_for_result_backs_off_when_history_lags(comfy_server, make_comfy):
+    _, api_url = comfy_server
+    client = make_comfy(api_url)
+    check_history = client._check_history
+    calls = []
+
+    def lagging_history(prompt_id):
+        # /history only lists the prompt 0.5 s after the first lookup
+        calls.append(time.monotonic())
+        if calls[-1] - calls[0] < 0.5:
+            return None
+        return check_history(prompt_id)
+
+    client._check_history = lagging_history
+    prompt_id = queue(client)
+
+    outputs = client.wait_for_result(prompt_id, timeout=5, min_interval=0.05, max_interval=0.2)
+
+    assert outputs
+    # 0.05 + 0.1 + 0.2 + 0.2 ... instead of a busy loop
+    assert len(calls) < 10
+
+
+def test_wait_for_result_times_out_without_history(comfy_server, make_comfy):
+    _, api_url = comfy_server
+    client = make_comfy(api_url)
+    calls = []
+    client._check_history = lambda prompt_id: calls.append(prompt_id)
+    prompt_id = queue(client)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        client.wait_for_result(prompt_id, timeout=1, min_interval=0.1, max_interval=0.4)
+
+    assert time.monotonic() - start < 2
+    assert len(calls) < 10
+
+
+def test_cache_hits_are_copied_out_of_the_cache(comfy_server, make_comfy, comfy_dir):
+    _, api_url = comfy_server
+    cache = ImageCache(comfy_dir / "cache")
+    client = make_comfy(api_url, image_cache=cache)
+
+    generated = client.get_image("a cat", "", 64, 64, seed=7)
+    hit = client.submit("a cat", "", 64, 64, seed=7)
+
+    assert hit.cached
+    path = Path(hit.result())
+    assert path.parent == client.images_dir
+    assert path.read_bytes() == Path(generated).read_bytes()
+    # Evicting the entry does not take the returned file with it
+    cache.max_bytes = 0
+    cache.put_bytes("ff" * 32, [b"x"])
+    assert not cache.contains(client.cache_key("a cat", "", 64, 64, 7))
+    assert path.exists()
+
+
+def test_get_images_reports_cache_hits(comfy_server, make_comfy, comfy_dir):
+    _, api_url = comfy_server
+    client = make_comfy(api_url, image_cache=ImageCache(comfy_dir / "cache"))
+    request = {"pos_prompt": "a cat", "width": 64, "height": 64, "in_memory": True, "persist": False}
+    client.get_image_bytes("a cat", "", 64, 64, seed=1)
+    client.close()  # waits for the background cache write
+
+    results = sorted(client.get_images([dict(request, seed=1), dict(request, seed=2)]))
+
+    assert [(index, cached) for index, _, cached in results] == [(0, True), (1, False)]
+    assert all(data.startswith(b"\x89PNG") for _, data, _ in results)
+
+
+def test_checksums_are_bounded(comfy_server, make_comfy):
+    _, api_url = comfy_server
+    client = make_comfy(api_url)
+    client.CHECKSUM_MEMORY = 2
+
+    paths = [client.get_image("a cat", "", 64, 64, seed=seed) for seed in range(4)]
+
+    assert list(client.checksums) == paths[-2:]
+    for path in paths:
+        # Forgotten checksums are computed from the file
+        assert client.checksum(path) == hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+IMAGE = b"\x89PNG\r\n\x1a\n input image"
+
+
+def test_input_image_is_uploaded_once(comfy_server, make_comfy):
+    server, api_url = comfy_server
+    client = make_comfy(api_url, workflow="img2img.json")
+
+    first = client.get_image("a cat", "", 64, 64, seed=1, images={"50": IMAGE})
+    second = client.get_image("a dog", "", 64, 64, seed=2, images={"50": IMAGE})
+
+    assert first and second
+    assert server.state.upload_count == 1
+
+
+def test_concurrent_uploads_share_one_request(comfy_server, make_comfy):
+    server, api_url = comfy_server
+    client = make_comfy(api_url)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        names = set(pool.map(lambda _: client.upload_image(IMAGE), range(8)))
+
+    assert len(names) == 1
+    assert server.state.upload_count == 1
+
+
+def test_upload_registry_is_checked_against_the_server(comfy_server, make_comfy):
+    server, api_url = comfy_server
+    name = make_comfy(api_url).upload_image(IMAGE)
+
+    # A new client reuses the upload recorded on disk
+    assert make_comfy(api_url).upload_image(IMAGE) == name
+    assert server.state.upload_count == 1
+
+    # ... unless the server no longer has it
+    server.state.inputs.clear()
+    assert make_comfy(api_url).upload_image(IMAGE) == name
+    assert server.state.upload_count == 2
+
+
+def test_lost_input_image_is_uploaded_again(comfy_server, make_comfy):
+    server, api_url = comfy_server
+    client = make_comfy(api_url, workflow="img2img.json")
+    assert client.get_image("a cat", "", 64, 64, seed=1, images={"50": IMAGE})
+
+    # ComfyUI restarted with an empty input folder
+    server.state.inputs.clear()
+
+    assert client.get_image("a cat", "", 64, 64, seed=2, images={"50": IMAGE})
+    assert server.state.upload_count == 2
@@ -0,0 +1,80 @@
+import pytest
+
+from utils import fake_comfy_server
+from utils.comfy_api import ComfyPool
+
+
+@pytest.fixture
+def dead_url():
+    """
+    URL of a fake server that was stopped, so connections are refused.
+    """
+    server, api_url = fake_comfy_server.start_fake_server()
+    server.shutdown()
+    server.server_close()
+    return api_url
+
+
+@pytest.fixture
+def make_pool(comfy_dir):
+    pools = []
+
+    def make(api_urls, **kwargs):
+        pool = ComfyPool("sdxlturbo_example.json", api_urls, base_dir=str(comfy_dir), health_interval=0.1, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_unreachable_backend_is_skipped(comfy_server, dead_url, make_pool):
+    _, live_url = comfy_server
+    pool = make_pool([dead_url, live_url], max_failures=1, cooldown=60)
+
+    future = pool.submit("a cat", "", 64, 64, seed=1)
+
+    assert future.result(timeout=10)
+    assert future.backend == live_url
+    stats = pool.stats()
+    assert not stats[dead_url]["healthy"]
+    assert stats[live_url]["healthy"] and stats[live_url]["completed"] == 1
+
+
+def test_rejected_prompt_is_retried_on_another_backend(comfy_server, make_pool):
+    server, first_url = comfy_server
+    other, second_url = fake_comfy_server.start_fake_server(delay=0.05, steps=2)
+    try:
+        pool = make_pool([first_url, second_url], cooldown=60)
+        # The first backend is busier, so the job goes to the second, which refuses it
+        server.state.queue_info = lambda: {"queue_running": [["x"]], "queue_pending": []}
+        pool.check_health()
+        rejected = []
+        backend = pool.backends[1]
+        queue_prompt = backend.queue_prompt
+
+        def reject_once(workflow):
+            if not rejected:
+                rejected.append(workflow)
+                return None
+            return queue_prompt(workflow)
+
+        backend.queue_prompt = reject_once
+
+        future = pool.submit("a cat", "", 64, 64, seed=1)
+
+        assert future.result(timeout=10)
+        assert rejected
+        assert future.backend == first_url
+    finally:
+        other.shutdown()
+
+
+def test_no_healthy_backend(dead_url, make_pool):
+    pool = make_pool([dead_url], max_failures=1, cooldown=60)
+
+    future = pool.submit("a cat", "", 64, 64, seed=1)
+
+    assert future.result(timeout=5) is None
+    assert future.backend is None
@@ -0,0 +1,43 @@
+import os
+import time
+
+from utils.image_cache import ImageCache
+
+
+def test_put_and_get(tmp_path):
+    cache = ImageCache(tmp_path / "cache")
+    assert cache.get("aa11") is None
+
+    paths = cache.put_bytes("aa11", [b"first", b"second"])
+
+    assert cache.get("aa11") == paths
+    assert [open(p, "rb").read() for p in paths] == [b"first", b"second"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ImageCache(tmp_path / "cache", max_bytes=250)
+    cache.put_bytes("aa11", [b"a" * 100])
+    cache.put_bytes("bb22", [b"b" * 100])
+    cache.get("aa11")  # bb22 is now the oldest
+
+    cache.put_bytes("cc33", [b"c" * 100])
+
+    assert cache.contains("aa11") and cache.contains("cc33")
+    assert not cache.contains("bb22")
+    assert not (tmp_path / "cache" / "bb" / "bb22").exists()
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+def test_recency_survives_restart(tmp_path):
+    cache = ImageCache(tmp_path / "cache")
+    cache.put_bytes("aa11", [b"a" * 100])
+    cache.put_bytes("bb22", [b"b" * 100])
+    old = time.time() - 60
+    os.utime(tmp_path / "cache" / "bb" / "bb22", (old, old))
+
+    reopened = ImageCache(tmp_path / "cache", max_bytes=150)
+
+    assert reopened.contains("aa11")
+    assert not reopened.contains("bb22")
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from utils import profiler as profiler_module
+from utils.profiler import Profiler, format_report
+
+
+class FakeClock:
+    """
+    Stands in for the time module inside utils.profiler only.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(profiler_module, "time", clock)
+    return clock
+
+
+def run_calls(profiler, clock, events):
+    for at, event in events:
+        clock.now = at
+        getattr(profiler, event)()
+
+
+def test_concurrency_utilization_from_call_timings(clock):
+    profiler = Profiler(concurrency=2)
+    # A runs 0-3 s, B runs 1-4 s: 1 s with one call, 2 s with two, 1 s with one
+    run_calls(profiler, clock, [
+        (0.0, "call_started"), (1.0, "call_started"), (3.0, "call_ended"), (4.0, "call_ended"),
+    ])
+    clock.now = 5.0
+
+    concurrency = profiler.report()["concurrency"]
+
+    assert concurrency["limit"] == 2
+    assert concurrency["peak"] == 2
+    assert concurrency["mean_in_flight"] == pytest.approx(6 / 5)
+    assert concurrency["utilization"] == pytest.approx(6 / 10)
+
+
+def test_calls_still_in_flight_count_until_the_report(clock):
+    profiler = Profiler(concurrency=4)
+    run_calls(profiler, clock, [(1.0, "call_started")])
+    clock.now = 3.0
+
+    assert profiler.report()["concurrency"]["mean_in_flight"] == pytest.approx(2 / 3)
+
+
+def test_call_statistics_by_kind(clock):
+    profiler = Profiler(concurrency=1)
+    for seconds in (1.0, 2.0, 3.0, 4.0):
+        profiler.record_call("chunk", "m", seconds, 100, 20, retries=0, ok=True)
+    profiler.record_call("merge", "m", 5.0, 50, 10, retries=2, ok=False)
+    clock.now = 10.0
+
+    calls = profiler.report()["calls"]
+
+    assert calls["count"] == 5
+    assert calls["errors"] == 1
+    assert calls["retries"] == 2
+    assert calls["input_tokens"] == 450
+    chunk = calls["by_kind"]["chunk"]
+    assert chunk["latency"] == {"mean": 2.5, "p50": 3.0, "p95": 4.0, "max": 4.0}
+    assert calls["by_kind"]["merge"]["errors"] == 1
+
+
+def test_report_is_written_and_formatted(clock, tmp_path):
+    profiler = Profiler(concurrency=2)
+    profiler.record_load("a.txt", 0.5, 1200)
+    assert list(profiler.count_chunks("a.txt", iter(["x", "y", "z"]))) == ["x", "y", "z"]
+    profiler.record_source("a.txt", 2.0, cached=False)
+    profiler.record_limiter_wait(0.25)
+    run_calls(profiler, clock, [(0.0, "call_started"), (2.0, "call_ended")])
+    profiler.record_call("chunk", "m", 2.0, 100, 20, retries=1, ok=True)
+    clock.now = 4.0
+
+    report = profiler.write(str(tmp_path / "profile.json"), settings={"concurrency": 2})
+    with open(tmp_path / "profile.json", encoding="utf-8") as f:
+        assert json.load(f) == report
+    assert report["sources"] == [{
+        "name": "a.txt", "load_seconds": 0.5, "chars": 1200, "chunks": 3,
+        "summarize_seconds": 2.0, "cached": False,
+    }]
+
+    text = format_report(report)
+    assert "Wall time 4.00s" in text
+    assert any(line.startswith("a.txt") and line.endswith("no") for line in text.splitlines())
+    assert "Concurrency: limit 2, peak 1, mean in flight 0.50, utilization 25%" in text
+    assert "rate limiter wait 0.25s" in text
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+
+def write_source(path, words):
+    path.write_text(" ".join(f"word{i}." for i in range(words)), encoding="utf-8")
+    return str(path)
+
+
+def make_summarizer(t4, **kwargs):
+    kwargs.setdefault("model", "fake-model")
+    kwargs.setdefault("chunk_tokens", 100)
+    kwargs.setdefault("overlap_tokens", 0)
+    return t4.Summarizer(**kwargs)
+
+
+def resume(t4, state_path, summarizer):
+    with open(state_path, encoding="utf-8") as f:
+        state = json.load(f)
+    return t4.finish_batch(state, summarizer, poll_interval=0.01)
+
+
+def read_requests(state):
+    with open(state["requests_path"], encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_resume_summarizes_every_source(t4, openai_state, tmp_path):
+    openai_state.batch_delay = 0.05
+    sources = [write_source(tmp_path / "long.txt", 400), write_source(tmp_path / "short.txt", 20)]
+    state_path = str(tmp_path / "state.json")
+    summarizer = make_summarizer(t4)
+    try:
+        state = t4.submit_batch(sources, summarizer, state_path, load_workers=1)
+        summaries = resume(t4, state_path, summarizer)
+    finally:
+        summarizer.close()
+
+    assert [name for name, _ in summaries] == sources
+    assert all(summary for _, summary in summaries)
+    assert state["batch_id"]
+
+
+def test_single_chunk_source_is_not_reduced(t4, openai_state, tmp_path):
+    sources = [write_source(tmp_path / "short.txt", 20)]
+    state_path = str(tmp_path / "state.json")
+    summarizer = make_summarizer(t4)
+    try:
+        state = t4.submit_batch(sources, summarizer, state_path, load_workers=1)
+        summaries = resume(t4, state_path, summarizer)
+    finally:
+        summarizer.close()
+
+    # Same budget as summarize_chunks() gives a single chunk
+    assert [r["body"]["max_output_tokens"] for r in read_requests(state)] == [300]
+    summary = summaries[0][1]
+    assert summary.startswith("Fake summary")
+    assert "Chunk 1 summary" not in summary
+
+
+def test_empty_csv_does_not_abort_the_batch(t4, openai_state, tmp_path):
+    empty = tmp_path / "empty.csv"
+    empty.write_text("", encoding="utf-8")
+    sources = [str(empty), write_source(tmp_path / "short.txt", 20)]
+    state_path = str(tmp_path / "state.json")
+    summarizer = make_summarizer(t4)
+    try:
+        t4.submit_batch(sources, summarizer, state_path, load_workers=1)
+        summaries = resume(t4, state_path, summarizer)
+    finally:
+        summarizer.close()
+
+    assert list(t4.iter_table_chunks(str(empty))) == []
+    assert [name for name, _ in summaries] == sources[1:]
+
+
+def test_failed_batch_requests_are_rerun(t4, openai_state, tmp_path):
+    openai_state.fail_every = 2
+    sources = [write_source(tmp_path / "long.txt", 400)]
+    state_path = str(tmp_path / "state.json")
+    summarizer = make_summarizer(t4)
+    try:
+        state = t4.submit_batch(sources, summarizer, state_path, load_workers=1)
+        summaries = resume(t4, state_path, summarizer)
+    finally:
+        summarizer.close()
+
+    assert len(read_requests(state)) > 1
+    assert summaries and "[no summary returned]" not in summaries[0][1]
+
+
+def test_rerun_errors_are_recorded_per_request(t4, openai_state, tmp_path):
+    openai_state.fail_every = 2
+    sources = [write_source(tmp_path / "long.txt", 400)]
+    state_path = str(tmp_path / "state.json")
+    summarizer = make_summarizer(t4)
+
+    def failing_call(prompt, max_output_tokens, model=None, kind="call"):
+        if kind == "chunk":
+            raise RuntimeError("rerun failed")
+        return "Combined summary of the chunks."
+
+    try:
+        t4.submit_batch(sources, summarizer, state_path, load_workers=1)
+        summarizer.call_model = failing_call
+        summaries = resume(t4, state_path, summarizer)
+    finally:
+        summarizer.close()
+
+    assert summaries == [(sources[0], "Combined summary of the chunks.")]
+
+
+def test_resume_refuses_another_map_model(t4, openai_state, tmp_path):
+    sources = [write_source(tmp_path / "short.txt", 20)]
+    state_path = str(tmp_path / "state.json")
+    summarizer = make_summarizer(t4)
+    other = make_summarizer(t4, map_model="other-model")
+    try:
+        t4.submit_batch(sources, summarizer, state_path, load_workers=1)
+        with pytest.raises(ValueError, match="other-model"):
+            resume(t4, state_path, other)
+    finally:
+        summarizer.close()
+        other.close()
@@ -0,0 +1,59 @@
+import pytest
+
+PARAGRAPHS = "\n\n".join(
+    " ".join(f"Sentence {s} of paragraph {p} says something fairly ordinary." for s in range(10))
+    for p in range(6)
+)
+SHORT_PARAGRAPHS = "\n\n".join(
+    " ".join(f"Sentence {s} of paragraph {p} says something fairly ordinary." for s in range(5))
+    for p in range(6)
+)
+# No paragraph or sentence boundaries at all
+UNBROKEN = "".join(f"{i:04d}" for i in range(600))
+
+
+def words(text):
+    return text.split()
+
+
+def overlap(previous, chunk):
+    """
+    Length of the longest end of previous that chunk starts with.
+    """
+    return max((k for k in range(1, len(chunk) + 1) if previous.endswith(chunk[:k])), default=0)
+
+
+@pytest.mark.parametrize("text", [PARAGRAPHS, SHORT_PARAGRAPHS, UNBROKEN])
+@pytest.mark.parametrize("content_defined", [False, True])
+def test_chunks_stay_within_the_token_budget(t4, text, content_defined):
+    chunks = list(t4.chunk_text(text, 120, 20, content_defined=content_defined))
+
+    assert len(chunks) > 1
+    assert all(t4.count_tokens(chunk) <= 120 for chunk in chunks)
+
+
+@pytest.mark.parametrize("text", [PARAGRAPHS, SHORT_PARAGRAPHS])
+def test_chunks_overlap_by_whole_sentences(t4, text):
+    chunks = list(t4.chunk_text(text, 120, 20))
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_sentence = chunk.split(".")[0] + "."
+        assert first_sentence.startswith("Sentence ")
+        assert previous.endswith(first_sentence)
+
+
+def test_hard_splits_overlap_and_cover_the_text(t4):
+    chunks = list(t4.chunk_text(UNBROKEN, 50, 10))
+
+    text = chunks[0]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        shared = overlap(previous, chunk)
+        assert 0 < t4.count_tokens(chunk[:shared]) <= 10
+        text += chunk[shared:]
+    assert text == UNBROKEN
+
+
+def test_no_overlap_partitions_the_text(t4):
+    chunks = list(t4.chunk_text(SHORT_PARAGRAPHS, 120, 0))
+
+    assert " ".join(words(" ".join(chunks))) == " ".join(words(SHORT_PARAGRAPHS))
@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from utils.near_dup import NearDuplicateIndex
+from utils.summary_cache import SummaryCache
+
+TEXT = " ".join(f"Sentence number {i} talks about topic {i % 7}." for i in range(60))
+NEAR_DUPLICATE = TEXT.replace("number 30 ", "number thirty ")
+
+
+@pytest.fixture
+def make_summarizer(t4, tmp_path):
+    summarizers = []
+
+    def make(cache=False):
+        summarizer = t4.Summarizer(
+            model="fake-model",
+            dedup=NearDuplicateIndex(threshold=0.8),
+            cache=SummaryCache(str(tmp_path / "cache")) if cache else None,
+        )
+        summarizer.calls = []
+        call_model = summarizer.call_model
+
+        def counted(prompt, *args, **kwargs):
+            summarizer.calls.append(prompt)
+            return call_model(prompt, *args, **kwargs)
+
+        summarizer.call_model = counted
+        summarizers.append(summarizer)
+        return summarizer
+
+    yield make
+    for summarizer in summarizers:
+        summarizer.close()
+
+
+def test_concurrent_duplicates_share_one_call(make_summarizer):
+    summarizer = make_summarizer()
+    calling = threading.Event()
+    release = threading.Event()
+    call_model = summarizer.call_model
+
+    def slow(*args, **kwargs):
+        calling.set()
+        release.wait(5)
+        return call_model(*args, **kwargs)
+
+    summarizer.call_model = slow
+    results = []
+    threads = [
+        threading.Thread(target=lambda c=c: results.append(summarizer.summarize_unique_chunk(c, 200)))
+        for c in (TEXT, NEAR_DUPLICATE)
+    ]
+    threads[0].start()
+    # The original is indexed and waiting in the model call
+    assert calling.wait(5)
+    # Release the original only once the duplicate is blocked on its future
+    future = next(iter(summarizer._dedup_futures.values()))
+    waiting = threading.Event()
+    result = future.result
+
+    def blocking_result(*args, **kwargs):
+        waiting.set()
+        return result(*args, **kwargs)
+
+    future.result = blocking_result
+    threads[1].start()
+    assert waiting.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(summarizer.calls) == 1
+    assert results[0] == results[1]
+    assert summarizer.dedup_saved == 1
+    assert summarizer._dedup_futures == {}
+
+
+def test_finished_duplicate_is_read_from_the_cache(make_summarizer):
+    summarizer = make_summarizer(cache=True)
+
+    first = summarizer.summarize_unique_chunk(TEXT, 200)
+    second = summarizer.summarize_unique_chunk(NEAR_DUPLICATE, 200)
+
+    assert second == first
+    assert len(summarizer.calls) == 1
+    assert summarizer.dedup_saved == 1
+    assert summarizer._dedup_futures == {}
+
+
+def test_cache_hits_are_not_counted_as_saved(make_summarizer):
+    make_summarizer(cache=True).summarize_unique_chunk(TEXT, 200)
+    summarizer = make_summarizer(cache=True)
+
+    summarizer.summarize_unique_chunk(TEXT, 200)
+    summarizer.summarize_unique_chunk(TEXT, 200)
+
+    assert summarizer.calls == []
+    assert summarizer.dedup_saved == 0
+
+
+def test_finished_duplicate_without_cache_shares_the_summary(make_summarizer):
+    summarizer = make_summarizer()
+
+    first = summarizer.summarize_unique_chunk(TEXT, 200)
+    second = summarizer.summarize_unique_chunk(NEAR_DUPLICATE, 200)
+    third = summarizer.summarize_unique_chunk(TEXT, 200)
+
+    assert first == second == third
+    assert len(summarizer.calls) == 1
+    assert summarizer.dedup_saved == 2
+    assert summarizer._dedup_futures == {}
+
+
+def test_failed_summary_is_not_shared(make_summarizer):
+    summarizer = make_summarizer()
+    call_model = summarizer.call_model
+    summarizer.call_model = lambda *args, **kwargs: ""
+
+    assert summarizer.summarize_unique_chunk(TEXT, 200) == ""
+    summarizer.call_model = call_model
+    assert summarizer.summarize_unique_chunk(NEAR_DUPLICATE, 200)
+
+    assert summarizer.dedup_saved == 0
+
+
+def test_duplicated_single_chunk_sources_share_one_call(make_summarizer):
+    summarizer = make_summarizer()
+
+    first = summarizer.summarize_source_text(TEXT)
+    second = summarizer.summarize_source_text(NEAR_DUPLICATE)
+
+    assert first == second
+    assert len(summarizer.calls) == 1
+    assert summarizer.dedup_saved == 1
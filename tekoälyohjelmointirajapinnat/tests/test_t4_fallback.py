@@ -0,0 +1,79 @@
+import pytest
+
+from utils.summary_cache import SummaryCache
+
+CHUNK = "The quarterly report shows revenue growth in every region except the north."
+
+
+@pytest.fixture
+def make_summarizer(t4, tmp_path):
+    summarizers = []
+
+    def make(**kwargs):
+        summarizer = t4.Summarizer(
+            model="weak-model",
+            fallback_model="strong-model",
+            cache=SummaryCache(str(tmp_path / "cache")),
+            **kwargs,
+        )
+        summarizer.models = []
+        call_model = summarizer.call_model
+
+        def weak_map_model(prompt, max_output_tokens, model=None, kind="call"):
+            summarizer.models.append(model)
+            if model == "weak-model":
+                return "Too short."  # fails is_acceptable_summary
+            return call_model(prompt, max_output_tokens, model=model, kind=kind)
+
+        summarizer.call_model = weak_map_model
+        summarizers.append(summarizer)
+        return summarizer
+
+    yield make
+    for summarizer in summarizers:
+        summarizer.close()
+
+
+def test_unacceptable_summary_is_rerun_on_the_fallback_model(make_summarizer):
+    summarizer = make_summarizer()
+
+    summary = summarizer.summarize_chunk(CHUNK, 200)
+
+    assert summary.startswith("Fake summary")
+    assert summarizer.models == ["weak-model", "strong-model"]
+    assert summarizer.fallback_count == 1
+    # Cached under the fallback model's key, next to the rejected map summary
+    key_parts = summarizer.chunk_key_parts(CHUNK)
+    cache = summarizer.cache
+    assert cache.get("chunk", summarizer.cache_key("chunk", 200, key_parts, "strong-model")) == summary
+    assert cache.get("chunk", summarizer.cache_key("chunk", 200, key_parts)) == "Too short."
+
+
+def test_cached_chunk_prefers_the_fallback_summary(make_summarizer):
+    summary = make_summarizer().summarize_chunk(CHUNK, 200)
+    summarizer = make_summarizer()
+
+    assert summarizer.cached_chunk(summarizer.chunk_key_parts(CHUNK), 200) == summary
+    assert summarizer.summarize_chunk(CHUNK, 200) == summary
+    assert summarizer.models == []
+
+
+def test_acceptable_summary_does_not_use_the_fallback(make_summarizer):
+    summarizer = make_summarizer(map_model="good-model")
+
+    summary = summarizer.summarize_chunk(CHUNK, 200)
+
+    assert summary.startswith("Fake summary")
+    assert summarizer.models == ["good-model"]
+    assert summarizer.fallback_count == 0
+
+
+def test_fallback_model_is_part_of_the_source_key(t4, make_summarizer):
+    with_fallback = make_summarizer()
+    without = t4.Summarizer(model="weak-model")
+    try:
+        assert with_fallback.source_key("digest") != without.source_key("digest")
+        assert "fallback=strong-model" in with_fallback._models_key()
+        assert without._models_key() == "weak-model"
+    finally:
+        without.close()
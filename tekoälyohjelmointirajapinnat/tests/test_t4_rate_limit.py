@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+from openai import RateLimitError
+
+
+def drain(limiter, n, tokens=1):
+    for _ in range(n):
+        limiter.acquire(tokens)
+
+
+def timed(fn, *args):
+    start = time.monotonic()
+    fn(*args)
+    return time.monotonic() - start
+
+
+def test_rpm_limit_throttles_once_the_bucket_is_empty(t4):
+    limiter = t4.RateLimiter(rpm=600)  # one request per 0.1 s
+
+    assert timed(drain, limiter, 600) < 0.5
+    elapsed = timed(drain, limiter, 5)
+
+    assert 0.4 <= elapsed < 1.5
+
+
+def test_rpm_limit_is_shared_between_threads(t4):
+    limiter = t4.RateLimiter(rpm=600)
+    drain(limiter, 600)
+
+    threads = [threading.Thread(target=drain, args=(limiter, 2)) for _ in range(3)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 0.5 <= time.monotonic() - start < 1.5
+
+
+def test_tpm_limit_waits_for_enough_tokens(t4):
+    limiter = t4.RateLimiter(tpm=60000)  # 1000 tokens per second
+
+    assert timed(limiter.acquire, 60000) < 0.1
+    elapsed = timed(limiter.acquire, 300)
+
+    assert 0.25 <= elapsed < 1.0
+
+
+def test_request_larger_than_the_tpm_limit_takes_a_full_bucket(t4):
+    limiter = t4.RateLimiter(tpm=60000)
+
+    # Capped at the bucket size instead of blocking forever
+    assert timed(limiter.acquire, 10 ** 9) < 0.1
+    assert 0.25 <= timed(limiter.acquire, 300) < 1.0
+
+
+def test_no_limits_never_wait(t4):
+    limiter = t4.RateLimiter()
+
+    assert timed(drain, limiter, 10000, 10 ** 6) < 0.5
+
+
+@pytest.fixture
+def summarizer(t4):
+    summarizer = t4.Summarizer(model="fake-model", max_retries=2)
+    yield summarizer
+    summarizer.close()
+
+
+def test_call_model_retries_a_429(summarizer, openai_state, capsys):
+    # More 429s than the OpenAI client retries on its own
+    openai_state.rate_limited = 3
+    before = openai_state.response_count
+
+    text = summarizer.call_model("Some text to summarize.", 50)
+
+    assert text.startswith("Fake summary")
+    assert openai_state.response_count - before == 4
+    assert "Rate limited, retrying" in capsys.readouterr().err
+
+
+def test_call_model_gives_up_after_max_retries(summarizer, openai_state):
+    openai_state.rate_limited = 100
+
+    with pytest.raises(RateLimitError):
+        summarizer.call_model("Some text to summarize.", 50)
@@ -0,0 +1,42 @@
+import json
+
+
+def run_watch(t4, source, manifest_path, fail):
+    summarizer = t4.Summarizer(model="fake-model")
+    if fail:
+        def failing_call(*args, **kwargs):
+            raise RuntimeError("API down")
+        summarizer.call_model = failing_call
+    try:
+        t4.watch([source], summarizer, manifest_path, output=manifest_path + ".md", load_workers=1, max_scans=1)
+    finally:
+        summarizer.close()
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)["sources"]
+
+
+def test_scan_sources_retries_missing_summaries(t4, tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_text("Some text to summarize.", encoding="utf-8")
+    manifest = {}
+
+    changed, removed = t4.scan_sources([str(source)], manifest)
+    assert changed == [str(source)] and removed == []
+
+    # Summarizing failed: the unchanged file is picked up again
+    assert t4.scan_sources([str(source)], manifest)[0] == [str(source)]
+
+    manifest[str(source)]["summary"] = "A summary."
+    assert t4.scan_sources([str(source)], manifest)[0] == []
+
+
+def test_watch_retries_failed_summary(t4, openai_server, tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_text("Some text to summarize in watch mode.", encoding="utf-8")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    entry = run_watch(t4, str(source), manifest_path, fail=True)[str(source)]
+    assert entry["hash"] and entry["summary"] is None
+
+    entry = run_watch(t4, str(source), manifest_path, fail=False)[str(source)]
+    assert entry["summary"]
@@ -1,11 +1,284 @@
 from pathlib import Path
-import json, copy
+import json, hashlib, io, os, tempfile
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.error import URLError, HTTPError
-from .file_util import find_new_file_name
+from .file_util import content_hash, find_new_file_name
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from random import randint
 
+try:
+    import websocket  # websocket-client
+except ImportError:  # optional: fall back to polling /history
+    websocket = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: only needed to decode in-memory images
+    Image = None
+
+
+# Parsed workflow files by (path, mtime); entries are shared and never mutated
+_workflow_cache = {}
+_workflow_cache_lock = threading.Lock()
+
+
+def load_workflow_file(path):
+    """
+    Load a workflow JSON file, reusing the parsed graph while the file is unchanged.
+
+    Args:
+        path (str or Path): Path to the workflow JSON file
+
+    Returns:
+        dict: The workflow graph. It is shared between callers, do not modify it.
+    """
+    key = (str(path), os.stat(path).st_mtime_ns)
+    with _workflow_cache_lock:
+        workflow = _workflow_cache.get(key)
+    if workflow is None:
+        with open(path, "r") as file:
+            workflow = json.load(file)
+        with _workflow_cache_lock:
+            # Forget older versions of the same file
+            for old in [k for k in _workflow_cache if k[0] == key[0]]:
+                del _workflow_cache[old]
+            _workflow_cache[key] = workflow
+    return workflow
+
+# Serializes read-modify-write of upload registry files shared by several clients
+_upload_registry_lock = threading.Lock()
+
+
+def read_image_input(image):
+    """
+    Return the contents and SHA-256 hex digest of an input image.
+
+    Args:
+        image (str, Path or bytes): Path to an image file, or its contents
+
+    Returns:
+        tuple: (bytes, hex digest)
+    """
+    data = bytes(image) if isinstance(image, (bytes, bytearray, memoryview)) else Path(image).read_bytes()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+class WorkflowTemplate():
+    """
+    A workflow graph compiled for fast per-request payloads.
+
+    The template records which node inputs are parameters. build() shallow-copies
+    only the nodes holding parameters and shares every other node with the
+    template; to_json() splices the JSON-encoded parameter values between
+    pre-serialized pieces of the graph, without building a dict at all.
+
+    Attributes:
+        workflow (dict): The source graph, treated as read-only
+        params (dict): Parameter name -> (node_id, input_name, convert)
+        digest (str): SHA-256 of the graph, identifies the workflow in cache keys
+    """
+
+    def __init__(self, workflow: dict, params: dict):
+        """
+        Compile a template.
+
+        Args:
+            workflow (dict): Workflow graph in the ComfyUI API format
+            params (dict): Parameter name -> (node_id, input_name, convert); convert
+                is applied to the value before it is inserted, e.g. str
+
+        Raises:
+            KeyError: If a parameter refers to a node missing from the workflow
+        """
+        self.workflow = workflow
+        self.params = params
+        self.digest = content_hash(json.dumps(workflow, sort_keys=True))
+        self._nodes = {}
+        for name, (node_id, input_name, _) in params.items():
+            self._nodes.setdefault(str(node_id), []).append((name, input_name))
+            if str(node_id) not in workflow:
+                raise KeyError(f"Workflow has no node {node_id} for parameter {name}")
+
+        # Serialize once with unique markers in place of the parameters, then split
+        # the JSON text at the markers
+        marker = f"__param_{uuid.uuid4().hex}_"
+        marked = self.build(**{name: marker + name for name in params}, _convert=False)
+        pieces = json.dumps(marked).split(f'"{marker}')
+        self._segments = [pieces[0].encode("utf-8")]
+        self._order = []
+        for piece in pieces[1:]:
+            name, rest = piece.split('"', 1)
+            self._order.append(name)
+            self._segments.append(rest.encode("utf-8"))
+
+    def build(self, _convert=True, **values):
+        """
+        Return the workflow with parameter values inserted.
+
+        Only nodes holding parameters are copied; other nodes are shared with
+        the template and must not be modified.
+        """
+        workflow = dict(self.workflow)
+        for node_id, inputs in self._nodes.items():
+            node = dict(workflow[node_id])
+            node["inputs"] = dict(node.get("inputs", {}))
+            for name, input_name in inputs:
+                if name in values:
+                    convert = self.params[name][2]
+                    node["inputs"][input_name] = convert(values[name]) if _convert and convert else values[name]
+            workflow[node_id] = node
+        return workflow
+
+    def to_json(self, **values):
+        """
+        Return the workflow with parameter values inserted as UTF-8 JSON bytes.
+
+        Raises:
+            KeyError: If a parameter value is missing
+        """
+        parts = [self._segments[0]]
+        for name, segment in zip(self._order, self._segments[1:]):
+            convert = self.params[name][2]
+            value = convert(values[name]) if convert else values[name]
+            parts.append(json.dumps(value).encode("utf-8"))
+            parts.append(segment)
+        return b"".join(parts)
+
+
+class _PromptWatch():
+    """
+    Completion state of one queued prompt, filled in by the event listener.
+    """
+
+    def __init__(self, on_progress=None):
+        self.done = threading.Event()
+        self.error = None
+        self.on_progress = on_progress
+
+
+class ComfyEventListener(threading.Thread):
+    """
+    Background thread reading ComfyUI's /ws event stream for one client id.
+
+    Prompts queued with the same client id report their progress on this
+    socket. The listener marks a prompt done when its final "executing"
+    message (node None) or "execution_success" arrives, records execution
+    errors, and forwards progress events to per-prompt callbacks. If the
+    socket drops it reconnects in the background; waiters notice through
+    `connected` and fall back to polling meanwhile.
+    """
+
+    # Finished prompt ids remembered for waiters that register late
+    FINISHED_MEMORY = 256
+
+    def __init__(self, ws_url, client_id):
+        super().__init__(daemon=True)
+        self.ws_url = f"{ws_url}?clientId={client_id}"
+        self.connected = threading.Event()
+        self._stopping = threading.Event()
+        self._ws = None
+        self._lock = threading.Lock()
+        self._watches = {}
+        self._finished = OrderedDict()
+
+    def watch(self, prompt_id, on_progress=None):
+        """
+        Register interest in a prompt.
+
+        Args:
+            prompt_id (str): Prompt ID returned by /prompt
+            on_progress (callable, optional): Called as on_progress(event_type, data)
+                for every event of this prompt
+
+        Returns:
+            _PromptWatch: Object whose `done` event is set on completion
+        """
+        watch = _PromptWatch(on_progress)
+        with self._lock:
+            if prompt_id in self._finished:
+                watch.error = self._finished[prompt_id]
+                watch.done.set()
+            else:
+                self._watches[prompt_id] = watch
+        return watch
+
+    def unwatch(self, prompt_id):
+        with self._lock:
+            self._watches.pop(prompt_id, None)
+
+    def stop(self):
+        self._stopping.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _finish(self, prompt_id, error=None):
+        with self._lock:
+            watch = self._watches.pop(prompt_id, None)
+            self._finished[prompt_id] = error
+            while len(self._finished) > self.FINISHED_MEMORY:
+                self._finished.popitem(last=False)
+        if watch is not None:
+            watch.error = error
+            watch.done.set()
+
+    def _dispatch(self, message):
+        event_type = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if prompt_id is None:
+            return
+        with self._lock:
+            watch = self._watches.get(prompt_id)
+        if watch is not None and watch.on_progress is not None:
+            try:
+                watch.on_progress(event_type, data)
+            except Exception as e:
+                print(f"Progress callback failed: {e}")
+
+        if event_type == "executing" and data.get("node") is None:
+            self._finish(prompt_id)
+        elif event_type == "execution_success":
+            self._finish(prompt_id)
+        elif event_type in ("execution_error", "execution_interrupted"):
+            self._finish(prompt_id, data.get("exception_message") or event_type)
+
+    def run(self):
+        delay = 0.5
+        while not self._stopping.is_set():
+            try:
+                self._ws = websocket.create_connection(self.ws_url, timeout=10)
+                self._ws.settimeout(None)
+                self.connected.set()
+                delay = 0.5
+                while not self._stopping.is_set():
+                    frame = self._ws.recv()
+                    # Binary frames are latent previews, only JSON text is used
+                    if isinstance(frame, str) and frame:
+                        self._dispatch(json.loads(frame))
+            except Exception as e:
+                if not self._stopping.is_set() and self.connected.is_set():
+                    print(f"ComfyUI event stream lost, polling until reconnected: {e}")
+            finally:
+                self.connected.clear()
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+            self._stopping.wait(delay)
+            delay = min(delay * 2, 10.0)
+
+
 class Comfy():
     """
     A client for integrating with ComfyUI API to generate images.
@@ -20,9 +293,19 @@ class Comfy():
         pos_node_id (str): Node ID for positive prompt in workflow
         neg_node_id (str): Node ID for negative prompt in workflow
         seed_node_id (str): Node ID for seed parameter in workflow
+        client_id (str): Client ID sent with prompts and used for the /ws event stream
+        session (requests.Session): Pooled HTTP connections to the API
+        checksums (OrderedDict): SHA-256 hex digest of the CHECKSUM_MEMORY most
+            recently saved images, by path; see checksum()
+        image_cache (ImageCache): Cache of finished generations, or None
+        upload_registry_path (Path): JSON file recording which input images each
+            backend already has, by SHA-256
     """
     
-    def __init__(self, workflow_path: str = "/workflows/sdxlturbo_example.json", api_url: str = "http://127.0.0.1:8188", pos_node_id: str = "6", neg_node_id: str = "7", resolution_id: str = "5", seed_node_id: str = "13", base_dir: str = None):
+    # Checksums remembered for saved images; older ones are recomputed on demand
+    CHECKSUM_MEMORY = 1024
+
+    def __init__(self, workflow_path: str = "/workflows/sdxlturbo_example.json", api_url: str = "http://127.0.0.1:8188", pos_node_id: str = "6", neg_node_id: str = "7", resolution_id: str = "5", seed_node_id: str = "13", base_dir: str = None, use_websocket: bool = True, max_workers: int = 8, timeout: float = 20, download_workers: int = 4, image_cache=None):
         """
         Initialize the Comfy API client.
         
@@ -32,6 +315,14 @@ class Comfy():
             pos_node_id (str): Node ID for positive prompt in the workflow
             neg_node_id (str): Node ID for negative prompt in the workflow
             seed_node_id (str): Node ID for seed parameter in the workflow
+            use_websocket (bool): Wait for results on the /ws event stream (needs
+                websocket-client), otherwise poll /history
+            max_workers (int): Prompts tracked concurrently by submit()
+            timeout (float): Seconds one prompt may take; prompts queued behind
+                others of this client get that much more per prompt ahead
+            download_workers (int): Images of one prompt downloaded in parallel
+            image_cache (ImageCache, optional): Return images generated earlier with
+                the same workflow, prompts, resolution and seed from this cache
         """
 
         # Directory where comfy_api.py is located
@@ -43,11 +334,35 @@ class Comfy():
         self.images_dir = self.base_dir / "images"
 
         self.workflow = None
+        self.template = None
+        self._workflow_mtime = None
         self.api_url = api_url
         self.pos_node_id = pos_node_id
         self.neg_node_id = neg_node_id
         self.resolution_id = resolution_id
         self.seed_node_id = seed_node_id
+        self.client_id = uuid.uuid4().hex
+        self.use_websocket = use_websocket and websocket is not None
+        self._listener = None
+        self._lock = threading.Lock()
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._executor = None
+        self._outstanding = 0
+        self.download_workers = download_workers
+        self._download_executor = None
+        self.checksums = OrderedDict()
+        self.image_cache = image_cache
+        self.upload_registry_path = self.base_dir / "uploads.json"
+        self._uploads = None  # SHA-256 -> uploaded name on this backend, loaded lazily
+        self._pending_uploads = {}  # SHA-256 -> Future of the upload
+        self._image_templates = {}
+
+        # Keep-alive connections shared by all requests and worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers + download_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
         # Resolve workflow path
         if workflow_path:
@@ -61,35 +376,72 @@ class Comfy():
 
     def load_workflow(self):
         """
-        Load the workflow JSON file and store it in the workflow attribute.
-        
-        Raises:
-            Exception: If the workflow file cannot be loaded or parsed
+        Load the workflow JSON file and compile it into the template attribute.
+
+        Does nothing while the file is unchanged since the last load. Errors are
+        printed and leave the previous workflow in place.
         """
         try:
-            with open(f'{self.workflow_path}', 'r') as file:
-                workflow=json.load(file)
-
-            self.workflow=workflow
+            mtime = os.stat(self.workflow_path).st_mtime_ns
+            if self.template is not None and mtime == self._workflow_mtime:
+                return
+            workflow = load_workflow_file(self.workflow_path)
+            self.template = WorkflowTemplate(workflow, self._template_params())
+            with self._lock:
+                self._image_templates = {}
+            self.workflow = workflow
+            self._workflow_mtime = mtime
         
         except Exception as e:
             print(f"Error loading workflow file: {e}")
 
+    def _template_params(self, image_nodes=()):
+        params = {
+            "pos_prompt": (self.pos_node_id, "text", None),
+            "neg_prompt": (self.neg_node_id, "text", None),
+            "width": (self.resolution_id, "width", str),
+            "height": (self.resolution_id, "height", str),
+            "seed": (self.seed_node_id, "noise_seed", str),
+        }
+        for node_id in image_nodes:
+            params[f"image:{node_id}"] = (node_id, "image", None)
+        return params
+
+    def _get_template(self, image_nodes=()):
+        """
+        Return the compiled template, with the image inputs of image_nodes as
+        extra parameters.
+        """
+        self.load_workflow()
+        if not image_nodes:
+            return self.template
+        key = tuple(sorted(str(node_id) for node_id in image_nodes))
+        with self._lock:
+            template = self._image_templates.get(key)
+            if template is None:
+                template = WorkflowTemplate(self.workflow, self._template_params(key))
+                self._image_templates[key] = template
+        return template
+
     def queue_prompt(self, workflow):
         """
         Submit a workflow prompt to the ComfyUI API queue.
         
         Args:
-            workflow (dict): The workflow configuration with prompts inserted
+            workflow (dict or bytes): The workflow configuration with prompts
+                inserted, or the same already serialized as JSON bytes
             
         Returns:
             dict: Response containing prompt_id if successful, None otherwise
         """
         try:
-            p = {"prompt": workflow}
-            data = json.dumps(p).encode('utf-8')
+            if isinstance(workflow, bytes):
+                data = b'{"prompt": ' + workflow + b', "client_id": ' + json.dumps(self.client_id).encode('utf-8') + b'}'
+            else:
+                p = {"prompt": workflow, "client_id": self.client_id}
+                data = json.dumps(p).encode('utf-8')
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/prompt", 
                 data=data,
                 headers={'Content-Type': 'application/json'}
@@ -101,34 +453,318 @@ class Comfy():
             print(f"Failed to queue prompt: {e}")
             return None
 
-    def fetch_image(self, response, prompt_id):
+    def _view(self, img, stream=False):
+        params = {"filename": img["filename"], "subfolder": img.get("subfolder", ""), "type": img.get("type", "output")}
+        return self.session.get(f"{self.api_url}/view", params=params, stream=stream, timeout=5)
+
+    def _reserve_file(self, filename):
         """
-        Download and save the generated image from the API response.
-        
+        Create a new file in images_dir and return (path, open binary file).
+        """
+        # Pick the name while holding the lock so parallel downloads never share a file
+        with self._lock:
+            new_filename = find_new_file_name(str(self.images_dir / filename))
+            return new_filename, open(new_filename, "xb")
+
+    def _record_checksum(self, path, digest):
+        with self._lock:
+            self.checksums[path] = digest
+            while len(self.checksums) > self.CHECKSUM_MEMORY:
+                self.checksums.popitem(last=False)
+
+    def checksum(self, path):
+        """
+        Return the SHA-256 hex digest of a saved image.
+
+        Recently saved images use the digest recorded while writing them,
+        older ones are hashed from disk.
+        """
+        with self._lock:
+            digest = self.checksums.get(str(path))
+        if digest is not None:
+            return digest
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _download(self, img, chunk_size=64 * 1024):
+        """
+        Stream one output image to disk and record its SHA-256 checksum.
+
+        Args:
+            img (dict): Image entry of a node output (filename, subfolder, type)
+
+        Returns:
+            str: Path to the saved image file
+        """
+        with self._view(img, stream=True) as image_resp:
+            image_resp.raise_for_status()
+            new_filename, f = self._reserve_file(img["filename"])
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with f:
+                    for chunk in image_resp.iter_content(chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                expected = image_resp.headers.get("Content-Length")
+                if expected is not None and int(expected) != size:
+                    raise IOError(f"incomplete download, got {size} of {expected} bytes")
+            except Exception:
+                Path(new_filename).unlink(missing_ok=True)
+                raise
+        self._record_checksum(new_filename, digest.hexdigest())
+        print(f"Saved {new_filename}")
+        return new_filename
+
+    def _download_bytes(self, img):
+        """
+        Download one output image into memory.
+
+        Returns:
+            bytes: The image file contents
+        """
+        image_resp = self._view(img)
+        image_resp.raise_for_status()
+        data = image_resp.content
+        expected = image_resp.headers.get("Content-Length")
+        if expected is not None and int(expected) != len(data):
+            raise IOError(f"incomplete download, got {len(data)} of {expected} bytes")
+        return data
+
+    def _save_bytes(self, filename, data):
+        """
+        Write downloaded image bytes to images_dir and record the checksum.
+
+        Returns:
+            str: Path to the saved image file, None if writing failed
+        """
+        try:
+            new_filename, f = self._reserve_file(filename)
+            with f:
+                f.write(data)
+        except OSError as e:
+            print(f"Failed to save image {filename}: {e}")
+            return None
+        self._record_checksum(new_filename, hashlib.sha256(data).hexdigest())
+        print(f"Saved {new_filename}")
+        return new_filename
+
+    def _get_download_executor(self):
+        with self._lock:
+            if self._download_executor is None:
+                self._download_executor = ThreadPoolExecutor(max_workers=self.download_workers)
+            return self._download_executor
+
+    def _output_images(self, response):
+        return [
+            img
+            for node_output in (response or {}).values()
+            for img in node_output.get("images", [])
+        ]
+
+    def fetch_image_bytes(self, response, prompt_id, persist=False):
+        """
+        Download every image of the API response into memory in parallel.
+
         Args:
             response (dict): The API response containing image information
             prompt_id (str): The prompt ID for this generation request
-            
+            persist (bool, optional): Also save the images to images_dir on a
+                background thread; the call does not wait for the writes
+
         Returns:
-            str: Path to the saved image file if successful, None otherwise
+            list: Image file contents (bytes) in output order; images that
+            failed to download are left out
         """
+        images = self._output_images(response)
+        if not images:
+            return []
+        executor = self._get_download_executor()
+        downloads = [executor.submit(self._download_bytes, img) for img in images]
 
-        for node_id, node_output in response.items():
-            if "images" in node_output:
-                for img in node_output["images"]:
-                    filename = img["filename"]
-                    subfolder = img["subfolder"]
+        blobs = []
+        for img, download in zip(images, downloads):
+            try:
+                data = download.result()
+            except Exception as e:
+                print(f"Failed to fetch image {img.get('filename')} for prompt {prompt_id}: {e}")
+                continue
+            blobs.append(data)
+            if persist:
+                executor.submit(self._save_bytes, img["filename"], data)
+        return blobs
 
-                    try:
-                        image_resp = requests.get(f"{self.api_url}/view?filename={filename}&subfolder={subfolder}&type=output", timeout=5)
-                        new_filename = find_new_file_name(str(self.images_dir / filename))
-
-                        with open(f"{new_filename}", "wb") as f:
-                            f.write(image_resp.content)
-                        print(f"Saved {new_filename}")
-                        return new_filename
-                    except Exception as e:
-                        print(f"Failed to fetch image: {e}")
+    def fetch_images(self, response, prompt_id):
+        """
+        Download and save every image of the API response in parallel.
+
+        Args:
+            response (dict): The API response containing image information
+            prompt_id (str): The prompt ID for this generation request
+
+        Returns:
+            list: Paths of the saved image files in output order; images that
+            failed to download are left out
+        """
+        images = self._output_images(response)
+        if not images:
+            return []
+        executor = self._get_download_executor()
+        downloads = [executor.submit(self._download, img) for img in images]
+
+        paths = []
+        for img, download in zip(images, downloads):
+            try:
+                paths.append(download.result())
+            except Exception as e:
+                print(f"Failed to fetch image {img.get('filename')} for prompt {prompt_id}: {e}")
+        return paths
+
+    def fetch_image(self, response, prompt_id):
+        """
+        Download the images of the API response and return the first one.
+
+        Returns:
+            str: Path to the first saved image file if successful, None otherwise
+        """
+        paths = self.fetch_images(response, prompt_id)
+        return paths[0] if paths else None
+
+    def _load_uploads(self):
+        with self._lock:
+            if self._uploads is not None:
+                return
+        try:
+            with open(self.upload_registry_path, "r", encoding="utf-8") as f:
+                uploads = json.load(f).get(self.api_url, {})
+        except (OSError, ValueError):
+            uploads = {}
+        # Entries from earlier runs are checked against the server before use
+        with self._lock:
+            if self._uploads is None:
+                self._uploads = {digest: (name, False) for digest, name in uploads.items()}
+
+    def _save_upload(self, digest, name):
+        with _upload_registry_lock:
+            try:
+                with open(self.upload_registry_path, "r", encoding="utf-8") as f:
+                    registry = json.load(f)
+            except (OSError, ValueError):
+                registry = {}
+            registry.setdefault(self.api_url, {})[digest] = name
+            try:
+                self.upload_registry_path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=self.upload_registry_path.parent, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(registry, f, indent=2)
+                os.replace(tmp, self.upload_registry_path)
+            except OSError as e:
+                print(f"Error writing upload registry {self.upload_registry_path}: {e}")
+
+    def _input_exists(self, name):
+        subfolder, _, filename = name.rpartition("/")
+        try:
+            response = self._view({"filename": filename, "subfolder": subfolder, "type": "input"}, stream=True)
+            response.close()
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def upload_image(self, image, filename=None):
+        """
+        Upload an input image to /upload/image, once per backend.
+
+        Images are identified by the SHA-256 of their contents. An image this
+        backend already received, in this run or an earlier one, is not sent
+        again. Concurrent calls for the same image share one upload. When a
+        prompt is rejected because the server lost the image (e.g. it was
+        restarted with an empty input folder), submit() uploads it again.
+
+        Args:
+            image (str, Path or bytes): Path to an image file, or its contents
+            filename (str, optional): Name used for the extension of the stored
+                file; defaults to the image path
+
+        Returns:
+            str: Name to put in the "image" input of a LoadImage node
+
+        Raises:
+            requests.RequestException: If the upload fails
+        """
+        data, digest = read_image_input(image)
+        if filename is None and isinstance(image, (str, Path)):
+            filename = str(image)
+        return self._upload(data, digest, filename)
+
+    def _upload(self, data, digest, filename):
+        self._load_uploads()
+        with self._lock:
+            name, verified = self._uploads.get(digest, (None, False))
+            pending = self._pending_uploads.get(digest)
+            owner = pending is None and not verified
+            if owner:
+                pending = self._pending_uploads[digest] = Future()
+        if verified:
+            return name
+        if not owner:
+            return pending.result()
+
+        try:
+            if name is None or not self._input_exists(name):
+                extension = Path(filename).suffix if filename else ".png"
+                # Content-addressed name, so a repeated upload overwrites the same file
+                response = self.session.post(
+                    f"{self.api_url}/upload/image",
+                    files={"image": (f"{digest[:32]}{extension or '.png'}", data)},
+                    data={"type": "input", "overwrite": "true"},
+                    timeout=30,
+                )
+                response.raise_for_status()
+                result = response.json()
+                name = f"{result['subfolder']}/{result['name']}" if result.get("subfolder") else result["name"]
+                self._save_upload(digest, name)
+                print(f"Uploaded input image {name}")
+            with self._lock:
+                self._uploads[digest] = (name, True)
+            pending.set_result(name)
+            return name
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending_uploads.pop(digest, None)
+
+    def _forget_uploads(self, digests):
+        """
+        Mark uploads as unverified, so their next use checks the server again.
+        """
+        with self._lock:
+            for digest in digests:
+                if digest in self._uploads:
+                    self._uploads[digest] = (self._uploads[digest][0], False)
+
+    def _check_history(self, prompt_id):
+        """
+        Fetch the outputs of a prompt from /history.
+
+        Returns:
+            dict: The outputs section if the prompt is complete, None otherwise
+        """
+        try:
+            response = self.session.get(f"{self.api_url}/history/{prompt_id}", timeout=5)
+            response.raise_for_status()
+            data = response.json()
+
+            if prompt_id in data and "outputs" in data[prompt_id]:
+                return data[prompt_id]["outputs"]
+
+        except requests.RequestException:
+            pass  # network error, try again
         return None
 
     def poll_for_result(self, prompt_id, timeout=20, interval=0.5):
@@ -149,68 +785,600 @@ class Comfy():
         start = time.time()
 
         while True:
-            try:
-                response = requests.get(f"{self.api_url}/history/{prompt_id}", timeout=5)
-                response.raise_for_status()
-                data = response.json()
-
-                if prompt_id in data and "outputs" in data[prompt_id]:
-                    return data[prompt_id]["outputs"]
-                
-            except requests.RequestException:
-                pass  # network error, try again
+            outputs = self._check_history(prompt_id)
+            if outputs is not None:
+                return outputs
 
             if time.time() - start > timeout:
                 raise TimeoutError(f"Prompt {prompt_id} not ready after {timeout} seconds.")
             
             time.sleep(interval)
 
-    def get_image(self, pos_prompt="Portrait of Super Mario and Doom Slayer", neg_prompt="", width=1024, height=1024, seed = randint(1,99999999)):
+    def start_listener(self, connect_timeout=2.0):
         """
-        Generate an image using the provided prompts.
-        
-        This is the main method that orchestrates the entire image generation process:
-        inserts prompts into workflow, queues the request, polls for completion,
-        and fetches the resulting image.
-        
+        Start the /ws event listener if it is not running yet.
+
+        Call this before queueing prompts so no completion message is missed.
+
+        Args:
+            connect_timeout (float, optional): Seconds to wait for the first connection
+
+        Returns:
+            bool: True if the event stream is connected
+        """
+        if not self.use_websocket:
+            return False
+        with self._lock:
+            if self._listener is None:
+                ws_url = self.api_url.replace("https://", "wss://").replace("http://", "ws://") + "/ws"
+                self._listener = ComfyEventListener(ws_url, self.client_id)
+                self._listener.start()
+        return self._listener.connected.wait(connect_timeout)
+
+    def close(self):
+        """
+        Stop the /ws event listener, the worker threads and the HTTP session.
+        """
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            download_executor, self._download_executor = self._download_executor, None
+        if download_executor is not None:
+            # Let background image writes finish
+            download_executor.shutdown(wait=True)
+        self.session.close()
+
+    def wait_for_result(self, prompt_id, timeout=20, on_progress=None, min_interval=0.1, max_interval=2.0):
+        """
+        Wait until a prompt is complete.
+
+        Completion is taken from the /ws event stream when it is connected, so
+        the result is returned as soon as ComfyUI reports it. While the stream
+        is down (or without websocket-client), and when /history lags behind
+        the completion event, /history is polled with an interval growing
+        from min_interval to max_interval.
+
+        Args:
+            prompt_id (str): The prompt ID to wait for
+            timeout (int, optional): Maximum time to wait in seconds. Defaults to 20.
+            on_progress (callable, optional): Called as on_progress(event_type, data)
+                for the prompt's /ws events ("executing", "progress", "executed", ...)
+            min_interval (float, optional): First polling interval in seconds
+            max_interval (float, optional): Longest polling interval in seconds
+
+        Returns:
+            dict: The outputs section of the completed prompt
+
+        Raises:
+            TimeoutError: If the prompt is not ready within the timeout period
+            RuntimeError: If ComfyUI reports an execution error
+        """
+        deadline = time.time() + timeout
+        listener = self._listener
+        watch = listener.watch(prompt_id, on_progress) if listener else None
+        interval = min_interval
+        try:
+            while True:
+                if watch is not None and watch.done.is_set() and watch.error:
+                    raise RuntimeError(f"Prompt {prompt_id} failed: {watch.error}")
+                if watch is not None and listener.connected.is_set() and not watch.done.is_set():
+                    # Wake up now and then to notice a dropped connection
+                    if watch.done.wait(min(0.25, max(0.0, deadline - time.time()))):
+                        continue
+                    interval = min_interval
+                else:
+                    # Also reached once the prompt is reported done but
+                    # /history does not list it yet: back off instead of
+                    # spinning on the already set event.
+                    outputs = self._check_history(prompt_id)
+                    if outputs is not None:
+                        return outputs
+                    time.sleep(min(interval, max(0.0, deadline - time.time())))
+                    interval = min(interval * 2, max_interval)
+
+                if time.time() > deadline:
+                    raise TimeoutError(f"Prompt {prompt_id} not ready after {timeout} seconds.")
+        finally:
+            if listener:
+                listener.unwatch(prompt_id)
+
+    def build_workflow(self, pos_prompt, neg_prompt, width, height, seed, images=None):
+        """
+        Return the workflow with prompts, resolution and seed inserted.
+
+        Only the parameter nodes are copied, the rest is shared with self.workflow.
+
+        Args:
+            images (dict, optional): LoadImage node id -> uploaded image name
+        """
+        images = images or {}
+        values = {f"image:{node_id}": name for node_id, name in images.items()}
+        return self._get_template(images).build(pos_prompt=pos_prompt, neg_prompt=neg_prompt, width=width, height=height, seed=seed, **values)
+
+    def build_payload(self, pos_prompt, neg_prompt, width, height, seed, images=None):
+        """
+        Return the workflow with prompts, resolution and seed inserted as JSON bytes.
+
+        Args:
+            images (dict, optional): LoadImage node id -> uploaded image name
+        """
+        images = images or {}
+        values = {f"image:{node_id}": name for node_id, name in images.items()}
+        return self._get_template(images).to_json(pos_prompt=pos_prompt, neg_prompt=neg_prompt, width=width, height=height, seed=seed, **values)
+
+    def cache_key(self, pos_prompt, neg_prompt, width, height, seed, image_digests=None):
+        """
+        Return the image cache key of a generation.
+
+        Args:
+            image_digests (dict, optional): LoadImage node id -> SHA-256 of the input image
+        """
+        self.load_workflow()
+        inputs = sorted((str(node_id), digest) for node_id, digest in (image_digests or {}).items())
+        return content_hash(self.template.digest, pos_prompt, neg_prompt, int(width), int(height), int(seed), *inputs)
+
+    def is_cached(self, pos_prompt, neg_prompt, width, height, seed, images=None):
+        """
+        Return True if this generation is in the image cache.
+        """
+        if self.image_cache is None or seed is None:
+            return False
+        digests = {node_id: read_image_input(image)[1] for node_id, image in (images or {}).items()}
+        return self.image_cache.contains(self.cache_key(pos_prompt, neg_prompt, width, height, seed, digests))
+
+    def _copy_cached(self, path, filename):
+        """
+        Copy a cached image into images_dir and record its checksum.
+
+        Cache entries can be evicted at any time, so callers get their own copy.
+
+        Returns:
+            str: Path to the copy
+        """
+        new_filename, f = self._reserve_file(filename)
+        digest = hashlib.sha256()
+        try:
+            with f, open(path, "rb") as src:
+                for chunk in iter(lambda: src.read(64 * 1024), b""):
+                    f.write(chunk)
+                    digest.update(chunk)
+        except OSError:
+            Path(new_filename).unlink(missing_ok=True)
+            raise
+        self._record_checksum(new_filename, digest.hexdigest())
+        return new_filename
+
+    def _cached_future(self, key, all_images=False, in_memory=False):
+        """
+        Return a finished Future for a cache hit, or None on a miss.
+
+        Paths point to copies in images_dir, never into the cache.
+        """
+        if self.image_cache is None:
+            return None
+        paths = self.image_cache.get(key)
+        if not paths:
+            return None
+        print(f"Image cache hit: {paths[0]}")
+        paths = paths if all_images else paths[:1]
+        try:
+            if in_memory:
+                results = [Path(path).read_bytes() for path in paths]
+            else:
+                results = [self._copy_cached(path, f"cached_{key[:16]}_{i}.png") for i, path in enumerate(paths)]
+        except OSError:
+            return None  # evicted meanwhile
+        future = Future()
+        future.set_result(results if all_images else results[0])
+        future.cached = True
+        return future
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _track(self, delta):
+        with self._lock:
+            self._outstanding += delta
+            return self._outstanding
+
+    def submit(self, pos_prompt="Portrait of Super Mario and Doom Slayer", neg_prompt="", width=1024, height=1024, seed=None, on_progress=None, all_images=False, in_memory=False, persist=True, images=None):
+        """
+        Queue an image generation and return without waiting for it.
+
+        The prompt is queued on the ComfyUI server right away, so many calls in
+        a row keep the GPU queue full. Completion is tracked on a worker thread.
+
         Args:
             pos_prompt (str): Positive prompt describing what to generate
             neg_prompt (str): Negative prompt describing what to avoid
-            
+            width (int): Image width in pixels
+            height (int): Image height in pixels
+            seed (int, optional): Noise seed, random if not given
+            on_progress (callable, optional): Called as on_progress(event_type, data)
+                for progress events of this generation
+            all_images (bool, optional): Resolve to the paths of all output images
+            in_memory (bool, optional): Resolve to image bytes instead of paths,
+                without waiting for a disk write
+            persist (bool, optional): With in_memory, still save the images to
+                images_dir in the background
+            images (dict, optional): Input images for img2img or ControlNet
+                workflows, LoadImage node id -> path or bytes. Each image is
+                uploaded to the server once, see upload_image().
+
         Returns:
-            str: Path to the generated image file if successful, None otherwise
+            concurrent.futures.Future: Resolves to the path of the generated image
+            file (bytes with in_memory), or None if queueing or fetching failed.
+            With all_images, resolves to a list instead. Its `cached` attribute is
+            True when the result came from the image cache.
         """
-
+        if seed is None:
+            seed = randint(1, 99999999)
         print(f"Received generation call: width: {width}, height: {height}, seed: {seed}")
-        if not self.workflow:
-            self.load_workflow()
+        inputs = {node_id: read_image_input(image) for node_id, image in (images or {}).items()}
+        key = None
+        if self.image_cache is not None:
+            key = self.cache_key(pos_prompt, neg_prompt, width, height, seed, {n: digest for n, (_, digest) in inputs.items()})
+            future = self._cached_future(key, all_images, in_memory)
+            if future is not None:
+                return future
 
-        workflow = copy.deepcopy(self.workflow)
+        def failed():
+            future = Future()
+            future.set_result([] if all_images else None)
+            future.cached = False
+            return future
 
-        # Insert positive and negative prompts into the loaded workflow
-        workflow[f"{self.pos_node_id}"]["inputs"]["text"] = pos_prompt
-        workflow[f"{self.neg_node_id}"]["inputs"]["text"] = neg_prompt
-        workflow[f"{self.resolution_id}"]["inputs"]["width"] = str(width)
-        workflow[f"{self.resolution_id}"]["inputs"]["height"] = str(height)
-        workflow[f"{self.seed_node_id}"]["inputs"]["noise_seed"] = str(seed)
+        def upload_inputs():
+            return {
+                node_id: self._upload(data, digest, images[node_id] if isinstance(images[node_id], (str, Path)) else None)
+                for node_id, (data, digest) in inputs.items()
+            }
 
+        try:
+            uploaded = upload_inputs()
+        except Exception as e:
+            print(f"Failed to upload input image: {e}")
+            return failed()
+        workflow = self.build_payload(pos_prompt, neg_prompt, width, height, seed, uploaded)
+
+        # Listen for events before queueing so the completion is not missed
+        self.start_listener()
         # Queue prompt, get prompt request ID
         prompt_id_json = self.queue_prompt(workflow)
+        node_errors = (prompt_id_json or {}).get("node_errors") or {}
+        rejected = [node_id for node_id in inputs if str(node_id) in node_errors]
+        if rejected and not prompt_id_json.get("prompt_id"):
+            # The server lost input images it had (e.g. restarted with an
+            # empty input folder): upload them again and retry once
+            print(f"ComfyUI rejected input images of nodes {rejected}, uploading them again")
+            self._forget_uploads(inputs[node_id][1] for node_id in rejected)
+            try:
+                uploaded = upload_inputs()
+            except Exception as e:
+                print(f"Failed to upload input image: {e}")
+                return failed()
+            workflow = self.build_payload(pos_prompt, neg_prompt, width, height, seed, uploaded)
+            prompt_id_json = self.queue_prompt(workflow)
+        prompt_id = None
         # Extract prompt id STR from the dict
         try:
             prompt_id=prompt_id_json["prompt_id"]
         except Exception as e:
             print(f"Error fetching prompt id: {e}")
+
+        if not prompt_id:
+            return failed()
+
+        print(f"Prompt in queue: ID: {prompt_id}")
+        # Prompts queued earlier by this client run first
+        timeout = self.timeout * self._track(1)
+
+        def wait():
+            try:
+                result = self.wait_for_result(prompt_id, timeout=timeout, on_progress=on_progress)
+                expected = len(self._output_images(result))
+                if in_memory:
+                    images = self.fetch_image_bytes(result, prompt_id, persist=persist)
+                    if key is not None and images and len(images) == expected:
+                        self._get_download_executor().submit(self.image_cache.put_bytes, key, images)
+                else:
+                    images = self.fetch_images(result, prompt_id)
+                    if key is not None and images and len(images) == expected:
+                        self.image_cache.put(key, images)
+                if all_images:
+                    return images
+                return images[0] if images else None
+            finally:
+                self._track(-1)
+
+        future = self._get_executor().submit(wait)
+        future.cached = False
+        return future
+
+    def get_images(self, batch, on_progress=None):
+        """
+        Generate several images concurrently and yield them as they complete.
+
+        All prompts are queued up front, then results are yielded in completion
+        order.
+
+        Args:
+            batch (iterable): Generation requests, each either a prompt string or a
+                dict of submit() arguments (pos_prompt, neg_prompt, width, height, seed,
+                all_images, in_memory, persist, images)
+            on_progress (callable, optional): Called as on_progress(index, event_type, data)
+
+        Yields:
+            tuple: (index in batch, image path or None; list of paths with all_images,
+            True if the result came from the image cache)
+        """
+        futures = {}
+        for i, request in enumerate(batch):
+            kwargs = {"pos_prompt": request} if isinstance(request, str) else dict(request)
+            if on_progress is not None:
+                kwargs["on_progress"] = lambda event_type, data, i=i: on_progress(i, event_type, data)
+            futures[self.submit(**kwargs)] = i
+
+        for future in as_completed(futures):
+            cached = getattr(future, "cached", False)
+            try:
+                yield futures[future], future.result(), cached
+            except Exception as e:
+                print(f"Image generation failed: {e}")
+                yield futures[future], None, cached
+
+    def get_image(self, pos_prompt="Portrait of Super Mario and Doom Slayer", neg_prompt="", width=1024, height=1024, seed=None, on_progress=None, all_images=False, images=None):
+        """
+        Generate an image using the provided prompts.
         
-        if prompt_id:
-            print(f"Prompt in queue: ID: {prompt_id}")
-
-            result = self.poll_for_result(prompt_id)
-            img = self.fetch_image(result, prompt_id)
-            return img
-                        
-        else: 
-            return None
+        This is the main method that orchestrates the entire image generation process:
+        inserts prompts into workflow, queues the request, waits for completion,
+        and fetches the resulting image.
+        
+        Args:
+            pos_prompt (str): Positive prompt describing what to generate
+            neg_prompt (str): Negative prompt describing what to avoid
+            seed (int, optional): Noise seed, random if not given
+            on_progress (callable, optional): Called as on_progress(event_type, data)
+                for progress events of this generation
+            all_images (bool, optional): Return the paths of all output images
+            images (dict, optional): LoadImage node id -> input image path or bytes
+            
+        Returns:
+            str: Path to the generated image file if successful, None otherwise.
+            With all_images, a list of paths.
+        """
+        return self.submit(pos_prompt, neg_prompt, width, height, seed, on_progress, all_images, images=images).result()
+
+    def get_image_bytes(self, pos_prompt="Portrait of Super Mario and Doom Slayer", neg_prompt="", width=1024, height=1024, seed=None, on_progress=None, decode=False, persist=False, images=None):
+        """
+        Generate an image and return it from memory instead of a file path.
+
+        Args:
+            pos_prompt (str): Positive prompt describing what to generate
+            neg_prompt (str): Negative prompt describing what to avoid
+            seed (int, optional): Noise seed, random if not given
+            on_progress (callable, optional): Called as on_progress(event_type, data)
+                for progress events of this generation
+            decode (bool, optional): Return a PIL image (needs pillow)
+            persist (bool, optional): Also save the image to images_dir in the background
+            images (dict, optional): LoadImage node id -> input image path or bytes
+
+        Returns:
+            bytes or PIL.Image.Image: The generated image if successful, None otherwise.
+            Wrap the bytes in memoryview() to slice them without copying.
+        """
+        if decode and Image is None:
+            raise RuntimeError("pillow is required to decode images")
+        data = self.submit(pos_prompt, neg_prompt, width, height, seed, on_progress, in_memory=True, persist=persist, images=images).result()
+        if data is None or not decode:
+            return data
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+
+class ComfyPool():
+    """
+    Load-balanced client for several ComfyUI backends.
+
+    Each backend gets its own Comfy client, so events, history and image
+    downloads always go to the node that ran the prompt. A monitor thread
+    polls every backend's /queue; the depth it reports plus the jobs
+    dispatched since the last poll is the backend's load, and each job goes
+    to the least-loaded healthy backend. Backends failing max_failures health
+    checks or dispatches in a row are ejected for cooldown seconds, then
+    checked again.
+
+    Attributes:
+        backends (list): Comfy clients, one per api_url
+    """
+
+    def __init__(self, workflow_path: str, api_urls: list, health_interval: float = 2.0, max_failures: int = 2, cooldown: float = 30.0, **comfy_kwargs):
+        """
+        Initialize the pool.
+
+        Args:
+            workflow_path (str): Path to the API-compatible workflow JSON file
+            api_urls (list): Base URLs of the ComfyUI backends
+            health_interval (float): Seconds between /queue polls
+            max_failures (int): Consecutive failures before a backend is ejected
+            cooldown (float): Seconds an ejected backend is left alone
+            **comfy_kwargs: Further Comfy arguments (node ids, base_dir, ...). An
+                image_cache is shared by all backends.
+        """
+        if not api_urls:
+            raise ValueError("ComfyPool needs at least one backend")
+        self.backends = [Comfy(workflow_path, api_url=url, **comfy_kwargs) for url in api_urls]
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = {
+            b.api_url: {"depth": 0, "dispatched": 0, "failures": 0, "ejected_until": 0.0, "completed": 0}
+            for b in self.backends
+        }
+        self._stopping = threading.Event()
+        self.check_health()
+        self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._monitor.start()
+
+    def _record_failure(self, backend, reason):
+        with self._lock:
+            state = self._state[backend.api_url]
+            state["failures"] += 1
+            if state["failures"] >= self.max_failures and state["ejected_until"] <= time.time():
+                state["ejected_until"] = time.time() + self.cooldown
+                print(f"Ejected ComfyUI backend {backend.api_url} for {self.cooldown}s: {reason}")
+
+    def _record_success(self, backend, depth=None):
+        with self._lock:
+            state = self._state[backend.api_url]
+            if state["ejected_until"]:
+                print(f"ComfyUI backend {backend.api_url} is healthy again")
+            state["failures"] = 0
+            state["ejected_until"] = 0.0
+            if depth is not None:
+                state["depth"] = depth
+                state["dispatched"] = 0
+
+    def queue_depth(self, backend):
+        """
+        Return the number of running and pending prompts on a backend.
+
+        Raises:
+            requests.RequestException: If the backend does not answer
+        """
+        response = backend.session.get(f"{backend.api_url}/queue", timeout=2)
+        response.raise_for_status()
+        data = response.json()
+        return len(data.get("queue_running", [])) + len(data.get("queue_pending", []))
+
+    def check_health(self):
+        """
+        Poll /queue on every backend that is not in its cooldown.
+        """
+        now = time.time()
+        for backend in self.backends:
+            with self._lock:
+                if self._state[backend.api_url]["ejected_until"] > now:
+                    continue
+            try:
+                self._record_success(backend, self.queue_depth(backend))
+            except Exception as e:
+                self._record_failure(backend, e)
+
+    def _monitor_loop(self):
+        while not self._stopping.wait(self.health_interval):
+            self.check_health()
+
+    def healthy_backends(self):
+        now = time.time()
+        with self._lock:
+            return [b for b in self.backends if self._state[b.api_url]["ejected_until"] <= now]
+
+    def _pick(self, exclude):
+        """
+        Choose the least-loaded healthy backend and count the dispatch.
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [
+                b for b in self.backends
+                if b.api_url not in exclude and self._state[b.api_url]["ejected_until"] <= now
+            ]
+            if not candidates:
+                return None
+            backend = min(candidates, key=lambda b: self._state[b.api_url]["depth"] + self._state[b.api_url]["dispatched"])
+            self._state[backend.api_url]["dispatched"] += 1
+            return backend
+
+    def submit(self, pos_prompt="Portrait of Super Mario and Doom Slayer", neg_prompt="", width=1024, height=1024, seed=None, on_progress=None, all_images=False, in_memory=False, persist=True, images=None):
+        """
+        Queue an image generation on the least-loaded healthy backend.
+
+        Takes the same arguments as Comfy.submit. If a backend refuses the
+        prompt or an input image upload, the next one is tried. Input images
+        are uploaded to each backend the first time a job using them runs there.
+
+        Returns:
+            concurrent.futures.Future: Resolves like Comfy.submit. Its
+            `backend` attribute is the api_url of the node that ran the prompt.
+        """
+        if seed is None:
+            seed = randint(1, 99999999)
+        # Answer cache hits without touching a backend
+        backend = self.backends[0]
+        if backend.image_cache is not None:
+            digests = {node_id: read_image_input(image)[1] for node_id, image in (images or {}).items()}
+            key = backend.cache_key(pos_prompt, neg_prompt, width, height, seed, digests)
+            future = backend._cached_future(key, all_images, in_memory)
+            if future is not None:
+                future.backend = None
+                return future
+        tried = set()
+        while True:
+            backend = self._pick(tried)
+            if backend is None:
+                print("No healthy ComfyUI backend available")
+                future = Future()
+                future.set_result([] if all_images else None)
+                future.cached = False
+                future.backend = None
+                return future
+            tried.add(backend.api_url)
+            future = backend.submit(pos_prompt, neg_prompt, width, height, seed, on_progress, all_images, in_memory, persist, images)
+            if future.done() and not future.result():
+                # Queueing failed, the prompt never reached this backend
+                self._record_failure(backend, "queueing prompt failed")
+                continue
+            future.backend = backend.api_url
+            future.add_done_callback(lambda f, backend=backend: self._job_done(backend, f))
+            return future
+
+    def _job_done(self, backend, future):
+        if future.exception() is not None:
+            self._record_failure(backend, future.exception())
+        else:
+            with self._lock:
+                self._state[backend.api_url]["completed"] += 1
+
+    def is_cached(self, pos_prompt, neg_prompt, width, height, seed, images=None):
+        """
+        Return True if this generation is in the image cache.
+        """
+        return self.backends[0].is_cached(pos_prompt, neg_prompt, width, height, seed, images)
+
+    def stats(self):
+        """
+        Return per-backend load and health information.
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                url: {**state, "healthy": state["ejected_until"] <= now}
+                for url, state in self._state.items()
+            }
+
+    # Same batching and blocking helpers as a single client, built on submit()
+    get_images = Comfy.get_images
+    get_image = Comfy.get_image
+    get_image_bytes = Comfy.get_image_bytes
+
+    def close(self):
+        """
+        Stop the health monitor and all backend clients.
+        """
+        self._stopping.set()
+        for backend in self.backends:
+            backend.close()
 
 
 '''
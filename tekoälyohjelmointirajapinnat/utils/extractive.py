@@ -0,0 +1,105 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:  # optional: extractive compression is disabled without numpy
+    np = None
+
+METHODS = ("textrank", "tfidf")
+
+_UNIT_SPLIT = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_WORD = re.compile(r"\w+")
+
+
+def split_sentences(text: str) -> list:
+    """
+    Splits text into sentences; blank lines also end a sentence.
+    """
+    return [s.strip() for s in _UNIT_SPLIT.split(text) if s and s.strip()]
+
+
+def _tfidf(sentences):
+    """
+    Returns the L2-normalized TF-IDF matrix (sentences x terms).
+    """
+    vocab = {}
+    rows = []
+    for sentence in sentences:
+        rows.append([vocab.setdefault(w, len(vocab)) for w in _WORD.findall(sentence.lower())])
+    counts = np.zeros((len(sentences), max(1, len(vocab))))
+    for i, row in enumerate(rows):
+        np.add.at(counts[i], row, 1)
+    tf = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1
+    weights = tf * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1, norms)
+
+
+def score_sentences(sentences: list, method: str = "textrank") -> "np.ndarray":
+    """
+    Returns an importance score for every sentence.
+
+    Args:
+        sentences: Sentences of one text
+        method: "textrank" (PageRank over cosine similarity of TF-IDF
+            vectors) or "tfidf" (similarity to the whole text)
+
+    Returns:
+        Array of scores, higher is more important
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    matrix = _tfidf(sentences)
+    if method == "tfidf":
+        centroid = matrix.mean(axis=0)
+        return matrix @ centroid
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    n = len(sentences)
+    # Sentences with no similar sentence link to every other one
+    transition = np.where(row_sums > 0, similarity / np.where(row_sums == 0, 1, row_sums), 1 / n)
+    scores = np.full(n, 1 / n)
+    damping = 0.85
+    for _ in range(50):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def compress_text(text: str, ratio: float, count_tokens, method: str = "textrank") -> str:
+    """
+    Keeps the highest-ranked sentences of text, in their original order,
+    up to ratio of its tokens.
+
+    Args:
+        text: Text to compress
+        ratio: Share of tokens to keep, 0 < ratio <= 1
+        count_tokens: Callable returning the token count of a string
+        method: Sentence ranking method, see score_sentences
+
+    Returns:
+        Compressed text; text itself if it has too few sentences to rank
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for extractive compression")
+    sentences = split_sentences(text)
+    if ratio >= 1 or len(sentences) < 3:
+        return text
+    tokens = [count_tokens(s) for s in sentences]
+    budget = max(1, int(sum(tokens) * ratio))
+
+    keep = set()
+    used = 0
+    for i in np.argsort(-score_sentences(sentences, method), kind="stable"):
+        if not keep or used + tokens[i] <= budget:
+            keep.add(int(i))
+            used += tokens[i]
+        if used >= budget:
+            break
+    return " ".join(sentences[i] for i in sorted(keep))
@@ -0,0 +1,372 @@
+"""
+Lightweight fake ComfyUI server for local testing.
+
+Implements the parts of the ComfyUI API used by utils.comfy_api.Comfy:
+POST /prompt, POST /upload/image, GET /history/{prompt_id}, GET /view,
+GET /queue and the /ws event stream. Prompts run one at a time on a worker thread, like on a
+single GPU, and send the same events as ComfyUI (execution_start,
+executing, progress, executed, execution_success). Every output is a tiny
+solid-color PNG whose color depends on the seed, so results are
+deterministic. Prompts whose LoadImage nodes refer to images that were
+not uploaded are rejected, like on a real server.
+
+Run it standalone:
+    python -m utils.fake_comfy_server --port 8189 --delay 0.5
+
+and point the client at it:
+    Comfy("sdxlturbo_example.json", api_url="http://127.0.0.1:8189")
+
+Or start it in-process with start_fake_server().
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import queue
+import struct
+import threading
+import time
+import uuid
+import zlib
+from urllib.parse import parse_qs, urlparse
+
+from .fake_server import FakeRequestHandler, make_server, serve, start_in_thread
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def make_png(width=8, height=8, color=(255, 0, 0)):
+    """
+    Build a solid-color RGB PNG without any imaging library.
+
+    Args:
+        width (int, optional): Image width in pixels
+        height (int, optional): Image height in pixels
+        color (tuple, optional): RGB color
+
+    Returns:
+        bytes: PNG file contents
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(color) * width  # filter type 0 + pixels
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _ws_frame(payload, opcode=0x1):
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack(">H", length)
+    else:
+        header += bytes([127]) + struct.pack(">Q", length)
+    return header + payload
+
+
+def _read_ws_frame(rfile):
+    """
+    Read one (masked) client frame. Returns (opcode, payload), or
+    (None, b"") when the connection is closed.
+    """
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None, b""
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", rfile.read(8))[0]
+    mask = rfile.read(4) if masked else b"\x00\x00\x00\x00"
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(rfile.read(length)))
+    return opcode, payload
+
+
+class FakeComfyState():
+    """
+    Queue, history, outputs and websocket clients of one fake server.
+    """
+
+    def __init__(self, delay=0.2, steps=4):
+        self.delay = delay
+        self.steps = steps
+        self.ws_enabled = True
+        self.history = {}
+        self.files = {}
+        self.inputs = {}
+        self.upload_count = 0
+        self.pending = []
+        self.running = None
+        self.sockets = {}
+        self.prompt_count = 0
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def send(self, client_id, event_type, data):
+        with self.lock:
+            sockets = list(self.sockets.get(client_id, []))
+        frame = _ws_frame(json.dumps({"type": event_type, "data": data}).encode("utf-8"))
+        for conn, send_lock in sockets:
+            try:
+                with send_lock:
+                    conn.sendall(frame)
+            except OSError:
+                pass
+
+    def drop_websockets(self):
+        """
+        Close every open /ws connection, as if the server restarted them.
+        """
+        with self.lock:
+            sockets = [s for conns in self.sockets.values() for s in conns]
+        for conn, send_lock in sockets:
+            try:
+                with send_lock:
+                    conn.sendall(_ws_frame(b"", opcode=0x8))
+                conn.close()
+            except OSError:
+                pass
+
+    def upload(self, filename, data, subfolder="", overwrite=False):
+        name = f"{subfolder}/{filename}" if subfolder else filename
+        with self.lock:
+            self.upload_count += 1
+            if not overwrite and name in self.inputs and self.inputs[name] != data:
+                # ComfyUI picks a free name instead of replacing the file
+                stem, dot, ext = filename.rpartition(".")
+                i = 1
+                while f"{stem} ({i}){dot}{ext}" in self.inputs:
+                    i += 1
+                filename = f"{stem} ({i}){dot}{ext}"
+                name = f"{subfolder}/{filename}" if subfolder else filename
+            self.inputs[name] = data
+        return {"name": filename, "subfolder": subfolder, "type": "input"}
+
+    def missing_inputs(self, workflow):
+        with self.lock:
+            return {
+                node_id: node["inputs"].get("image")
+                for node_id, node in workflow.items()
+                if node.get("class_type") == "LoadImage" and node.get("inputs", {}).get("image") not in self.inputs
+            }
+
+    def queue_prompt(self, workflow, client_id):
+        prompt_id = str(uuid.uuid4())
+        with self.lock:
+            self.prompt_count += 1
+            number = self.prompt_count
+            self.pending.append(prompt_id)
+        self.jobs.put((number, prompt_id, workflow, client_id))
+        return prompt_id, number
+
+    def _outputs(self, prompt_id, workflow):
+        seed = 0
+        batch = 1
+        save_node = None
+        for node_id, node in workflow.items():
+            inputs = node.get("inputs", {})
+            for key in ("noise_seed", "seed"):
+                if key in inputs:
+                    seed = int(inputs[key])
+            if "batch_size" in inputs:
+                batch = int(inputs["batch_size"])
+            if node.get("class_type") in ("SaveImage", "PreviewImage"):
+                save_node = node_id
+        images = []
+        for i in range(batch):
+            filename = f"ComfyUI_{prompt_id[:8]}_{i:05}_.png"
+            color = tuple((seed >> shift) & 0xFF for shift in (0, 8, 16))
+            with self.lock:
+                self.files[filename] = make_png(color=color[:2] + (i * 40 % 256,))
+            images.append({"filename": filename, "subfolder": "", "type": "output"})
+        return {save_node or "9": {"images": images}}
+
+    def _worker(self):
+        while True:
+            number, prompt_id, workflow, client_id = self.jobs.get()
+            with self.lock:
+                self.pending.remove(prompt_id)
+                self.running = (number, prompt_id)
+            self.send(client_id, "execution_start", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)})
+            for node_id in workflow:
+                self.send(client_id, "executing", {"node": node_id, "display_node": node_id, "prompt_id": prompt_id})
+            for step in range(1, self.steps + 1):
+                time.sleep(self.delay / self.steps)
+                self.send(client_id, "progress", {"value": step, "max": self.steps, "prompt_id": prompt_id, "node": None})
+            outputs = self._outputs(prompt_id, workflow)
+            for node_id, output in outputs.items():
+                self.send(client_id, "executed", {"node": node_id, "display_node": node_id, "output": output, "prompt_id": prompt_id})
+            with self.lock:
+                self.history[prompt_id] = {
+                    "prompt": [number, prompt_id, workflow, {"client_id": client_id}, list(outputs)],
+                    "outputs": outputs,
+                    "status": {"status_str": "success", "completed": True, "messages": []},
+                }
+                self.running = None
+            self.send(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+            self.send(client_id, "execution_success", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)})
+
+    def queue_info(self):
+        with self.lock:
+            running = [[self.running[0], self.running[1]]] if self.running else []
+            pending = [[0, p] for p in self.pending]
+        return {"queue_running": running, "queue_pending": pending}
+
+
+class FakeComfyHandler(FakeRequestHandler):
+    """
+    Request handler for the fake ComfyUI endpoints.
+    state is the server's FakeComfyState.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/")
+
+        if path == "/ws":
+            self._websocket(query.get("clientId", [""])[0])
+        elif path.startswith("/history/"):
+            prompt_id = path.split("/")[-1]
+            with self.state.lock:
+                entry = self.state.history.get(prompt_id)
+            self._send_json(200, {prompt_id: entry} if entry else {})
+        elif path == "/view":
+            filename = query.get("filename", [""])[0]
+            subfolder = query.get("subfolder", [""])[0]
+            with self.state.lock:
+                if query.get("type", ["output"])[0] == "input":
+                    data = self.state.inputs.get(f"{subfolder}/{filename}" if subfolder else filename)
+                else:
+                    data = self.state.files.get(filename)
+            if data is None:
+                self._send_json(404, {"error": "Not found"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif path == "/queue":
+            self._send_json(200, self.state.queue_info())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        data = self._read_body()
+        path = urlparse(self.path).path.rstrip("/")
+
+        if path == "/prompt":
+            try:
+                body = json.loads(data or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": "Invalid JSON"})
+                return
+            if not isinstance(body.get("prompt"), dict):
+                self._send_json(400, {"error": {"type": "no_prompt", "message": "No prompt provided"}})
+                return
+            missing = self.state.missing_inputs(body["prompt"])
+            if missing:
+                self._send_json(400, {
+                    "error": {"type": "prompt_outputs_failed_validation", "message": "Prompt outputs failed validation"},
+                    "node_errors": {
+                        node_id: {"errors": [{"type": "value_not_valid", "message": f"Invalid image file: {image}"}]}
+                        for node_id, image in missing.items()
+                    },
+                })
+                return
+            prompt_id, number = self.state.queue_prompt(body["prompt"], body.get("client_id", ""))
+            self._send_json(200, {"prompt_id": prompt_id, "number": number, "node_errors": {}})
+        elif path == "/upload/image":
+            # multipart/form-data with "image", "type", "subfolder" and "overwrite" fields
+            fields = self._read_multipart(data)
+            if "image" not in fields or not fields["image"][0]:
+                self._send_json(400, {"error": "No image provided"})
+                return
+            filename, content = fields["image"]
+            subfolder = (fields.get("subfolder", (None, b""))[1] or b"").decode("utf-8")
+            overwrite = (fields.get("overwrite", (None, b""))[1] or b"").decode("utf-8").lower() in ("true", "1")
+            self._send_json(200, self.state.upload(filename, content, subfolder, overwrite))
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def _websocket(self, client_id):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not self.state.ws_enabled or not key:
+            self._send_json(404, {"error": "Not found"})
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        entry = (self.connection, threading.Lock())
+        with self.state.lock:
+            self.state.sockets.setdefault(client_id, []).append(entry)
+        self.state.send(client_id, "status", {"status": {"exec_info": {"queue_remaining": 0}}, "sid": client_id})
+        try:
+            while True:
+                opcode, payload = _read_ws_frame(self.rfile)
+                if opcode is None or opcode == 0x8:
+                    break
+                if opcode == 0x9:  # ping
+                    with entry[1]:
+                        self.connection.sendall(_ws_frame(payload, opcode=0xA))
+        except OSError:
+            pass
+        finally:
+            with self.state.lock:
+                self.state.sockets[client_id].remove(entry)
+            self.close_connection = True
+
+
+def _make_server(host, port, delay, steps):
+    return make_server(FakeComfyHandler, FakeComfyState(delay=delay, steps=steps), host, port)
+
+
+def start_fake_server(host="127.0.0.1", port=0, delay=0.2, steps=4):
+    """
+    Start the fake server in a background thread.
+
+    Args:
+        host (str, optional): Address to bind. Defaults to 127.0.0.1.
+        port (int, optional): Port to bind, 0 picks a free port.
+        delay (float, optional): Seconds each prompt takes to "render".
+        steps (int, optional): Progress events sent per prompt.
+
+    Returns:
+        tuple: (server, api_url). server.state is the FakeComfyState;
+        call server.shutdown() to stop it.
+    """
+    server = _make_server(host, port, delay, steps)
+    return server, start_in_thread(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake ComfyUI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8189)
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds each prompt takes")
+    parser.add_argument("--steps", type=int, default=4, help="Progress events per prompt")
+    args = parser.parse_args()
+
+    server = _make_server(args.host, args.port, args.delay, args.steps)
+    serve(server, f"http://{args.host}:{args.port}", "Fake ComfyUI server")
+
+
+if __name__ == "__main__":
+    main()
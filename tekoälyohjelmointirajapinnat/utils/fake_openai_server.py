@@ -0,0 +1,270 @@
+"""
+Local stand-in for the parts of the OpenAI API used by the summarizer.
+
+Serves /v1/responses plus the Files and Batches endpoints, so the normal and
+the --batch mode of t4_multiInputHandler.py can be run without network
+access or cost. Batch jobs are answered with the same canned summaries as
+direct requests and complete after a configurable delay. Responses
+requests can be rejected with 429 to exercise the client's retries.
+
+Run it standalone:
+    python -m utils.fake_openai_server --port 8082 --batch-delay 5
+
+and point the OpenAI client at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8082/v1 OPENAI_API_KEY=fake python t4_multiInputHandler.py --batch ...
+
+Or start it in-process with start_fake_server().
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from .fake_server import FakeRequestHandler, make_server, serve, start_in_thread
+
+
+def fake_summary(prompt):
+    """
+    Canned summary for a prompt. Keeps the tail of the input so combined
+    summaries can still be traced back to their sources.
+    """
+    tail = " ".join(str(prompt).split()[-12:])
+    return f"Fake summary of {len(str(prompt))} characters: ...{tail}"
+
+
+def fake_response(body):
+    """
+    Responses API object answering a request body.
+    """
+    prompt = body.get("input", "")
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt)
+    text = fake_summary(prompt)
+    input_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "fake-model"),
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+class FakeOpenAIState:
+    """
+    Uploaded files, batch jobs and request counts of one server instance.
+    """
+
+    def __init__(self, batch_delay=0.0, fail_every=0):
+        self.batch_delay = batch_delay
+        # Every Nth batch request fails, to exercise the client's fallback
+        self.fail_every = fail_every
+        # The next rate_limited responses requests get a 429 with Retry-After
+        self.rate_limited = 0
+        self.retry_after = 0.01
+        self.response_count = 0
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def count_response(self):
+        """
+        Count a responses request. Returns False if it is rate limited.
+        """
+        with self.lock:
+            self.response_count += 1
+            if self.rate_limited > 0:
+                self.rate_limited -= 1
+                return False
+            return True
+
+    def add_file(self, filename, purpose, data):
+        file_id = f"file-{uuid.uuid4().hex}"
+        info = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file_id] = (info, data)
+        return info
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        with self.lock:
+            _, data = self.files[input_file_id]
+        lines = []
+        failed = 0
+        requests = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+        for n, request in enumerate(requests, start=1):
+            if self.fail_every and n % self.fail_every == 0:
+                failed += 1
+                response = {
+                    "status_code": 500,
+                    "request_id": f"req_{uuid.uuid4().hex}",
+                    "body": {"error": {"message": "Fake failure"}},
+                }
+            else:
+                response = {
+                    "status_code": 200,
+                    "request_id": f"req_{uuid.uuid4().hex}",
+                    "body": fake_response(request.get("body", {})),
+                }
+            lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": request.get("custom_id"),
+                "response": response,
+                "error": None,
+            }))
+        output = self.add_file("batch_output.jsonl", "batch_output", ("\n".join(lines) + "\n").encode("utf-8"))
+
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": endpoint,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "created_at": int(time.time()),
+            "request_counts": {"total": len(requests), "completed": len(requests) - failed, "failed": failed},
+        }
+        with self.lock:
+            self.batches[batch_id] = (time.monotonic(), batch, output["id"])
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id):
+        with self.lock:
+            created, batch, output_file_id = self.batches[batch_id]
+        batch = dict(batch)
+        if time.monotonic() - created < self.batch_delay:
+            batch.update(status="in_progress", output_file_id=None)
+        else:
+            batch.update(status="completed", output_file_id=output_file_id)
+        return batch
+
+
+class FakeOpenAIHandler(FakeRequestHandler):
+    """
+    Request handler for /v1/responses, /v1/files and /v1/batches.
+    state is the server's FakeOpenAIState.
+    """
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        try:
+            if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+                _, data = self.state.files[parts[-2]]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            elif parts[-2] == "files":
+                self._send_json(200, self.state.files[parts[-1]][0])
+            elif parts[-2] == "batches":
+                self._send_json(200, self.state.get_batch(parts[-1]))
+            else:
+                self._not_found()
+        except (KeyError, IndexError):
+            self._not_found()
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        data = self._read_body()
+
+        if path.endswith("/files"):
+            # multipart/form-data with "purpose" and "file" fields
+            fields = self._read_multipart(data)
+            if "file" not in fields:
+                self._send_json(400, {"error": {"message": "Missing file"}})
+                return
+            filename, content = fields["file"]
+            purpose = (fields.get("purpose", (None, b""))[1] or b"").decode("utf-8")
+            self._send_json(200, self.state.add_file(filename or "upload.jsonl", purpose, content))
+            return
+
+        try:
+            body = json.loads(data or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        if path.endswith("/responses"):
+            if not self.state.count_response():
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    headers={"Retry-After": str(self.state.retry_after)},
+                )
+                return
+            self._send_json(200, fake_response(body))
+        elif path.endswith("/batches"):
+            if body.get("input_file_id") not in self.state.files:
+                self._send_json(400, {"error": {"message": "Unknown input_file_id"}})
+                return
+            self._send_json(200, self.state.create_batch(
+                body["input_file_id"],
+                body.get("endpoint", "/v1/responses"),
+                body.get("completion_window", "24h"),
+            ))
+        else:
+            self._not_found()
+
+
+def _make_server(host, port, batch_delay, fail_every):
+    state = FakeOpenAIState(batch_delay=batch_delay, fail_every=fail_every)
+    return make_server(FakeOpenAIHandler, state, host, port)
+
+
+def start_fake_server(host="127.0.0.1", port=0, batch_delay=0.0, fail_every=0):
+    """
+    Start the fake server in a background thread.
+
+    Args:
+        host (str, optional): Address to bind. Defaults to 127.0.0.1.
+        port (int, optional): Port to bind, 0 picks a free port.
+        batch_delay (float, optional): Seconds before a batch job completes.
+        fail_every (int, optional): Fail every Nth batch request, 0 never fails.
+
+    Returns:
+        tuple: (server, base_url). server.state is the FakeOpenAIState;
+        call server.shutdown() to stop it.
+    """
+    server = _make_server(host, port, batch_delay, fail_every)
+    return server, start_in_thread(server) + "/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI Responses/Files/Batches server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--batch-delay", type=float, default=5.0, help="Seconds before a batch job completes")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth batch request")
+    args = parser.parse_args()
+
+    server = _make_server(args.host, args.port, args.batch_delay, args.fail_every)
+    serve(server, f"http://{args.host}:{args.port}/v1", "Fake OpenAI server")
+
+
+if __name__ == "__main__":
+    main()
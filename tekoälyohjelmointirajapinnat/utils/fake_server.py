@@ -0,0 +1,87 @@
+"""
+Scaffolding shared by the fake API servers used for local testing
+(fake_openai_server, fake_comfy_server).
+
+A fake server is a FakeRequestHandler subclass plus a state object that
+holds everything the handlers share. make_server() binds them together;
+start_in_thread() runs the server for tests and serve() runs it from the
+command line.
+"""
+
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Base request handler with JSON and multipart helpers.
+    """
+
+    # Shared server state, set by make_server
+    state = None
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def _read_multipart(self, data):
+        """
+        Parses a multipart/form-data body into {name: (filename, bytes)}.
+        """
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + self.headers.get("Content-Type", "").encode("latin-1") + b"\r\n\r\n" + data
+        )
+        fields = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        return fields
+
+
+def make_server(handler_cls, state, host, port):
+    """
+    Returns a ThreadingHTTPServer whose handlers share state. The state is
+    also available as server.state.
+    """
+    handler = type(f"Configured{handler_cls.__name__}", (handler_cls,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_in_thread(server):
+    """
+    Runs server in a daemon thread and returns its root URL.
+    Call server.shutdown() to stop it.
+    """
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def serve(server, url, name):
+    """
+    Runs server in the foreground until interrupted.
+    """
+    print(f"{name} listening on {url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,6 +1,7 @@
 import io
 import os
 import math
+import hashlib
 from typing import Tuple
 from PIL import Image
 import urllib.request
@@ -59,6 +60,22 @@ def save_binary_file(data: bytes, filename: str) -> bool:
         print(f"Error saving file: {e}")
         return False
 
+def content_hash(*parts) -> str:
+    """
+    Returns a SHA-256 hex digest of the given parts.
+
+    Args:
+        Any number of values (str or other), joined in order
+
+    Returns:
+        str: Hex digest string
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x1f")  # separator so ("ab", "c") != ("a", "bc")
+    return h.hexdigest()
+
 def find_new_file_name(base_name: str) -> str:
     """
     Finds a new filename that doesn't already exist by adding a number to the end of the base name.
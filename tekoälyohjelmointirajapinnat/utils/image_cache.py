@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ImageCache:
+    '''
+    Size-bounded on-disk LRU cache for generated images.
+
+    Every entry is a directory cache_dir/<2 hex>/<key>/ holding the images of
+    one generation as 0.png, 1.png, ... Keys are built by the caller with
+    file_util.content_hash() from everything that determines the output
+    (workflow, prompts, resolution, seed). Entries are written to a temporary directory
+    and renamed into place, so a half-written entry is never returned.
+    Recency is kept in the directory mtimes, so the LRU order survives
+    restarts. When the total size exceeds max_bytes, the least recently used
+    entries are removed.
+    '''
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (paths, size), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _scan(self):
+        found = []
+        for entry in self.cache_dir.glob("*/*"):
+            if not entry.is_dir() or entry.name.endswith(".tmp"):
+                continue
+            files = sorted(entry.glob("*.png"), key=lambda p: int(p.stem) if p.stem.isdigit() else 0)
+            if not files:
+                continue
+            found.append((entry.stat().st_mtime, entry.name, [str(f) for f in files], sum(f.stat().st_size for f in files)))
+        for _, key, paths, size in sorted(found):
+            self._entries[key] = (paths, size)
+            self._size += size
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, (_, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def contains(self, key: str) -> bool:
+        '''
+        Returns True if key is cached, without counting a hit or a miss.
+        '''
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str):
+        '''
+        Returns the list of cached image paths, or None on a miss.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(self._entry_dir(key))
+        except OSError:
+            pass
+        return list(entry[0])
+
+    def put(self, key: str, paths: list):
+        '''
+        Stores copies of the image files under key and returns their cached
+        paths. Errors are printed but never raised; None is returned then.
+        '''
+        def write(path, target):
+            try:
+                os.link(path, target)  # no copy when on the same filesystem
+            except OSError:
+                shutil.copyfile(path, target)
+
+        return self._store(key, paths, write)
+
+    def put_bytes(self, key: str, images: list):
+        '''
+        Like put(), for images held in memory.
+        '''
+        def write(data, target):
+            with open(target, "wb") as f:
+                f.write(data)
+
+        return self._store(key, images, write)
+
+    def _store(self, key: str, items: list, write):
+        entry_dir = self._entry_dir(key)
+        tmp = None
+        try:
+            entry_dir.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(dir=entry_dir.parent, suffix=".tmp"))
+            size = 0
+            for i, item in enumerate(items):
+                target = tmp / f"{i}.png"
+                write(item, target)
+                size += target.stat().st_size
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp, entry_dir)
+        except OSError as e:
+            print(f"Error writing image cache entry {entry_dir}: {e}")
+            if tmp is not None:
+                shutil.rmtree(tmp, ignore_errors=True)
+            return None
+
+        cached = [str(entry_dir / f"{i}.png") for i in range(len(items))]
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (cached, size)
+            self._size += size
+            self._evict()
+        return cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
@@ -0,0 +1,95 @@
+import hashlib
+import random
+import re
+import threading
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """
+    Returns the set of hashed word n-grams of a text.
+
+    Args:
+        text: Input text; case and punctuation are ignored
+        size: Words per shingle
+
+    Returns:
+        Set of 64-bit integers
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+        for g in grams
+    }
+
+
+class NearDuplicateIndex:
+    '''
+    MinHash/LSH index for finding near-duplicate texts.
+
+    Every text gets a MinHash signature of num_perm values over its word
+    shingles. Signatures are split into bands; texts sharing any band are
+    candidates, and a candidate counts as a duplicate when the estimated
+    Jaccard similarity of the signatures reaches threshold.
+    The index is thread-safe, so chunks can be added from worker threads.
+    '''
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(1)  # fixed seed, signatures are comparable across runs
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._buckets = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def signature(self, text: str) -> tuple:
+        hashes = shingles(text, self.shingle_size) or {0}
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._perms
+        )
+
+    def similarity(self, sig_a: tuple, sig_b: tuple) -> float:
+        '''
+        Estimated Jaccard similarity of two signatures.
+        '''
+        return sum(x == y for x, y in zip(sig_a, sig_b)) / self.num_perm
+
+    def _band_keys(self, sig):
+        return [(b, sig[b * self.rows:(b + 1) * self.rows]) for b in range(self.bands)]
+
+    def find_or_add(self, key, text: str):
+        '''
+        Returns the key of an indexed near-duplicate of text, or adds text
+        under key and returns None.
+        '''
+        sig = self.signature(text)
+        band_keys = self._band_keys(sig)
+        with self._lock:
+            seen = set()
+            for band_key in band_keys:
+                for other in self._buckets.get(band_key, ()):
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    if self.similarity(sig, self._signatures[other]) >= self.threshold:
+                        return other
+            self._signatures[key] = sig
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, []).append(key)
+        return None
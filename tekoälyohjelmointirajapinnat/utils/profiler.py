@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _latency_stats(values: list) -> dict:
+    return {
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": _percentile(values, 0.50),
+        "p95": _percentile(values, 0.95),
+        "max": max(values, default=0.0),
+    }
+
+
+class Profiler:
+    '''
+    Collects throughput metrics of one summarizer run.
+
+    Records per-source load and summarize times and chunk counts, every
+    model call with its latency, token usage and retries, time spent
+    waiting for the rate limiter, and how many calls were in flight over
+    time. All methods are thread-safe.
+    '''
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.started = time.perf_counter()
+        self.sources = {}
+        self.calls = []
+        self.limiter_wait = 0.0
+        self._in_flight = 0
+        self._peak = 0
+        self._busy_area = 0.0  # integral of in-flight calls over time
+        self._last_change = self.started
+        self._lock = threading.Lock()
+
+    def _source(self, name: str) -> dict:
+        return self.sources.setdefault(name, {
+            "load_seconds": None,
+            "chars": None,
+            "chunks": 0,
+            "summarize_seconds": None,
+            "cached": False,
+        })
+
+    def record_load(self, name: str, seconds: float, chars: int) -> None:
+        with self._lock:
+            source = self._source(name)
+            source["load_seconds"] = seconds
+            source["chars"] = chars
+
+    def record_source(self, name: str, seconds: float, cached: bool) -> None:
+        with self._lock:
+            source = self._source(name)
+            source["summarize_seconds"] = seconds
+            source["cached"] = cached
+
+    def count_chunks(self, name: str, chunks):
+        '''
+        Passes chunks through, counting them for source name.
+        '''
+        for chunk in chunks:
+            with self._lock:
+                self._source(name)["chunks"] += 1
+            yield chunk
+
+    def record_limiter_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.limiter_wait += seconds
+
+    def _track(self, delta: int) -> None:
+        now = time.perf_counter()
+        self._busy_area += self._in_flight * (now - self._last_change)
+        self._last_change = now
+        self._in_flight += delta
+        self._peak = max(self._peak, self._in_flight)
+
+    def call_started(self) -> None:
+        with self._lock:
+            self._track(1)
+
+    def call_ended(self) -> None:
+        with self._lock:
+            self._track(-1)
+
+    def record_call(self, kind: str, model: str, seconds: float, input_tokens: int,
+                    output_tokens: int, retries: int, ok: bool) -> None:
+        '''
+        Records one logical call; seconds is the time spent in API requests,
+        without rate limiter waits and retry backoff.
+        '''
+        with self._lock:
+            self.calls.append({
+                "kind": kind,
+                "model": model,
+                "seconds": seconds,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "retries": retries,
+                "ok": ok,
+            })
+
+    def _call_stats(self, calls: list) -> dict:
+        return {
+            "count": len(calls),
+            "errors": sum(not c["ok"] for c in calls),
+            "retries": sum(c["retries"] for c in calls),
+            "input_tokens": sum(c["input_tokens"] for c in calls),
+            "output_tokens": sum(c["output_tokens"] for c in calls),
+            "latency": _latency_stats([c["seconds"] for c in calls]),
+        }
+
+    def report(self, settings: dict = None) -> dict:
+        '''
+        Returns the collected metrics as a JSON-serializable dict.
+        '''
+        with self._lock:
+            self._track(0)
+            wall = time.perf_counter() - self.started
+            calls = list(self.calls)
+            kinds = sorted({c["kind"] for c in calls})
+            return {
+                "wall_seconds": wall,
+                "settings": settings or {},
+                "sources": [{"name": name, **data} for name, data in self.sources.items()],
+                "calls": {
+                    **self._call_stats(calls),
+                    "by_kind": {k: self._call_stats([c for c in calls if c["kind"] == k]) for k in kinds},
+                },
+                "limiter_wait_seconds": self.limiter_wait,
+                "concurrency": {
+                    "limit": self.concurrency,
+                    "peak": self._peak,
+                    "mean_in_flight": self._busy_area / wall if wall else 0.0,
+                    "utilization": self._busy_area / (wall * self.concurrency) if wall else 0.0,
+                },
+                "call_log": calls,
+            }
+
+    def write(self, path: str, settings: dict = None) -> dict:
+        '''
+        Writes the report as JSON and returns it.
+        '''
+        report = self.report(settings)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def format_report(report: dict) -> str:
+    '''
+    Returns a plain-text summary table of a report.
+    '''
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    lines = [f"Wall time {report['wall_seconds']:.2f}s", ""]
+    lines.append(f"{'source':<40} {'load s':>8} {'chunks':>7} {'summ. s':>8}  cached")
+    for s in report["sources"]:
+        name = s["name"] if len(s["name"]) <= 40 else "..." + s["name"][-37:]
+        lines.append(
+            f"{name:<40} {seconds(s['load_seconds']):>8} {s['chunks']:>7} "
+            f"{seconds(s['summarize_seconds']):>8}  {'yes' if s['cached'] else 'no'}"
+        )
+    lines.append("")
+    lines.append(f"{'calls':<8} {'count':>6} {'errors':>6} {'retries':>7} {'in tok':>9} {'out tok':>8} "
+                 f"{'mean s':>7} {'p50 s':>7} {'p95 s':>7} {'max s':>7}")
+    rows = list(report["calls"]["by_kind"].items()) + [("total", report["calls"])]
+    for kind, c in rows:
+        lat = c["latency"]
+        lines.append(
+            f"{kind:<8} {c['count']:>6} {c['errors']:>6} {c['retries']:>7} {c['input_tokens']:>9} "
+            f"{c['output_tokens']:>8} {lat['mean']:>7.2f} {lat['p50']:>7.2f} {lat['p95']:>7.2f} {lat['max']:>7.2f}"
+        )
+    cc = report["concurrency"]
+    lines.append("")
+    lines.append(
+        f"Concurrency: limit {cc['limit']}, peak {cc['peak']}, mean in flight {cc['mean_in_flight']:.2f}, "
+        f"utilization {cc['utilization']:.0%}; rate limiter wait {report['limiter_wait_seconds']:.2f}s"
+    )
+    return "\n".join(lines)
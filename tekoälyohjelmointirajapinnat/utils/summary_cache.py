@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+class SummaryCache:
+    '''
+    Persistent on-disk cache for summaries.
+
+    Entries are stored as small JSON files under cache_dir/<kind>/<2 hex>/<key>.json.
+    Keys are built by the caller with file_util.content_hash() from the
+    content hash, model and prompt version, so any change in those gives a
+    new key.
+    Writes are atomic, so concurrent workers and interrupted runs never leave
+    a half-written entry behind.
+    '''
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.cache_dir / kind / key[:2] / f"{key}.json"
+
+    def get(self, kind: str, key: str):
+        '''
+        Returns the cached value, or None on a miss.
+        '''
+        path = self._path(kind, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, kind: str, key: str, value) -> None:
+        '''
+        Stores a value. Errors are printed but never raised.
+        '''
+        path = self._path(kind, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error writing cache entry {path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}